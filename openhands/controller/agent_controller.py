@@ -1,5 +1,8 @@
 from sre_parse import State
 
+from openhands.controller.checkpoint import DEFAULT_CHECKPOINT_INTERVAL, StateCheckpointer
+from openhands.utils.async_utils import call_async_from_sync, call_sync_from_async
+
 
 class AgentController:
     id: str
@@ -15,6 +18,8 @@ class AgentController:
     _pending_action_info: tuple[Action, float] | None = None
     _close: bool = False
     _cached_first_usage_message: MessageAction | None = None
+    _checkpointer: StateCheckpointer | None = None
+    _replaying: bool = False
 
     def __init__(
         self,
@@ -35,6 +40,7 @@ class AgentController:
         status_callback: Callable | None = None,
         replay_events: list[Event] | None = None,
         security_analyzer: 'SecurityAnalyzer | None' = None,
+        checkpoint_interval: int | None = DEFAULT_CHECKPOINT_INTERVAL,
         ):
             self.id = sid or event_stream.id
             self.user_id = user_id
@@ -50,6 +56,17 @@ class AgentController:
                 self.event_stream.subscribe(
                     EventStreamSubscriber.AGENT_CONTROLLER, self.on_event, self.id
                 )
+            self._checkpointer = None
+            restored = False
+            if file_store is not None and not self.is_delegate:
+                self._checkpointer = StateCheckpointer(
+                    self.id, file_store, user_id, checkpoint_interval
+                )
+                if initial_state is None:
+                    # Resumes from the latest checkpoint instead of the whole
+                    # history.
+                    initial_state = self._checkpointer.restore(self.event_stream)
+                    restored = initial_state is not None
             self.state_tracker = StateTracker(sid, file_store, user_id)
 
             self.set_initial_state(
@@ -76,6 +93,11 @@ class AgentController:
 
             self.security_analyzer = security_analyzer
 
+            if restored:
+                # Events after the checkpoint go through the handlers of live
+                # events, without stepping the agent again.
+                call_async_from_sync(self._replay_events, None)
+
             self._add_system_message()
 
 
@@ -102,12 +124,11 @@ class AgentController:
         
 
     def _add_system_message(self):
-        for event in self.event_stream.search_events(start_id=self.state.start_id):
-            if isinstance(event, MessageAction) and event.source == EventSource.USER:
-                return
-
-            if isinstance(event, SystemMessageAction):
-                return
+        start_id = self.state.start_id
+        if self.event_stream.find_event_ids(
+            action=ActionType.MESSAGE, source=EventSource.USER, start_id=start_id
+        ) or self.event_stream.find_event_ids(action=ActionType.SYSTEM, start_id=start_id):
+            return
 
         system_message = self.agent.get_system_message()
         if system_message and system_message.content:
@@ -123,6 +144,8 @@ class AgentController:
             await self.set_agent_state_to(AgentState.STOPPED)
 
         self.state_tracker.close(self.event_stream) # LOOK 为啥要关闭，会单独起进程来监控吗？
+        if self._checkpointer is not None:
+            await call_sync_from_async(self._checkpointer.flush, self.state)
 
         if not self.is_delegate:
             self.event_stream.unsubscribe(EventStreamSubscriber.AGENT_CONTROLLER, self.id) # LOOK
@@ -267,15 +290,37 @@ class AgentController:
 
         asyncio.get_event_loop().run_until_complete(self._on_event(event))            
 
-    async def _on_event(self, event: Event) -> None:
+    def _add_history(self, event: Event) -> bool:
+        """Adds an event to the state's history; returns False if it is hidden."""
         if hasattr(event, 'hidden') and event.hidden:
-            return
+            return False
         self.state_tracker.add_history(event)
+        return True
+
+    async def _apply_event(self, event: Event) -> bool:
+        """Adds an event to the history and handles it; False if it is hidden."""
+        if not self._add_history(event):
+            return False
 
         if isinstance(event, Action):
             await self._handle_action(event)
         elif isinstance(event, Observation):
             await self._handle_observation(event)
+        if self._checkpointer is not None:
+            await self._checkpointer.on_event_applied(self.state, event.id)
+        return True
+
+    async def _replay_events(self) -> None:
+        assert self._checkpointer is not None
+        self._replaying = True
+        try:
+            await self._checkpointer.replay(self.event_stream, self._apply_event)
+        finally:
+            self._replaying = False
+
+    async def _on_event(self, event: Event) -> None:
+        if not await self._apply_event(event):
+            return
 
         should_step = self.should_step(event)    
         if should_step:
@@ -301,10 +346,11 @@ class AgentController:
             await self.start_delegate(action)
             assert self.delegate is not None
             if 'task' in action.inputs:
-                self.event_stream.add_event(
-                    MessageAction(content='TASK: ' + action.inputs['task']),
-                    EventSource.USER,
-                )
+                if not self._replaying:
+                    self.event_stream.add_event(
+                        MessageAction(content='TASK: ' + action.inputs['task']),
+                        EventSource.USER,
+                    )
                 await self.delegate.set_agent_state_to(AgentState.RUNNING)  
                 return
         elif isinstance(action, AgentFinishAction):
@@ -358,7 +404,9 @@ class AgentController:
             recall_action = RecallAction(query=action.content, recall_type=recall_type)
             self._pending_action = recall_action
 
-            self.event_stream.add_event(recall_action, EventSource.USER) # LOOK _on_event没有RecallAction这种Action处理?
+            # A replayed message's recall action is already in the stream.
+            if not self._replaying:
+                self.event_stream.add_event(recall_action, EventSource.USER) # LOOK _on_event没有RecallAction这种Action处理?
 
             if self.get_agent_state() != AgentState.RUNNING:
                 await self.set_agent_state_to(AgentState.RUNNING)
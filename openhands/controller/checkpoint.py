@@ -0,0 +1,251 @@
+import base64
+import copy
+import pickle
+from collections.abc import MutableSequence
+from dataclasses import dataclass
+from typing import Any, Awaitable, Callable, Iterable, Iterator
+
+from openhands.core.logger import openhands_logger as logger
+from openhands.events.event import Event
+from openhands.events.event_store import EventStore
+from openhands.storage.files import FileStore
+from openhands.storage.locations import get_conversation_state_checkpoint_filename
+from openhands.utils.async_utils import call_sync_from_async
+
+DEFAULT_CHECKPOINT_INTERVAL = 100
+
+# Events a LazyHistory reads at a time while it is iterated.
+_HISTORY_READ_BATCH = 100
+
+
+@dataclass
+class StateCheckpoint:
+    state: Any
+    # Id of the last event applied to `state`, or -1 if none was.
+    last_event_id: int
+    # Ids of the events in `state.history`, which is saved empty; None if the
+    # history was saved with the state.
+    history_ids: list[int] | None = None
+
+
+class LazyHistory(MutableSequence):
+    """A restored `State.history` that reads its events when they are used.
+
+    Holds the ids of the events and reads only the ones that are accessed,
+    so resuming does not read the whole history up front; e.g. looking at
+    the last few events reads only those. Events added later are kept as
+    they are. Pickles as a plain list.
+    """
+
+    def __init__(self, event_store: EventStore, ids: Iterable[int]):
+        self._event_store = event_store
+        self._ids = list(ids)
+        self._events: list[Event | None] = [None] * len(self._ids)
+
+    @property
+    def ids(self) -> list[int]:
+        return list(self._ids)
+
+    def __len__(self) -> int:
+        return len(self._ids)
+
+    def __getitem__(self, index):
+        if isinstance(index, slice):
+            positions = range(len(self._ids))[index]
+            self._read(positions)
+            return [self._events[i] for i in positions]
+        position = range(len(self._ids))[index]
+        self._read((position,))
+        return self._events[position]
+
+    def __setitem__(self, index, value) -> None:
+        if isinstance(index, slice):
+            value = list(value)
+            self._ids[index] = [event.id for event in value]
+        else:
+            self._ids[index] = value.id
+        self._events[index] = value
+
+    def __delitem__(self, index) -> None:
+        del self._ids[index]
+        del self._events[index]
+
+    def insert(self, index: int, value: Event) -> None:
+        self._ids.insert(index, value.id)
+        self._events.insert(index, value)
+
+    def __iter__(self) -> Iterator[Event]:
+        for start in range(0, len(self._ids), _HISTORY_READ_BATCH):
+            yield from self[start : start + _HISTORY_READ_BATCH]
+
+    def __eq__(self, other: object) -> bool:
+        if not isinstance(other, (list, LazyHistory)):
+            return NotImplemented
+        return list(self) == list(other)
+
+    def __repr__(self) -> str:
+        return f'LazyHistory({len(self._ids)} events)'
+
+    def __reduce__(self):
+        return list, (list(self),)
+
+    def _read(self, positions: Iterable[int]) -> None:
+        missing: dict[int, list[int]] = {}
+        for position in positions:
+            if self._events[position] is None:
+                missing.setdefault(self._ids[position], []).append(position)
+        if not missing:
+            return
+        # Neighbouring events share cache pages, so one search reads them.
+        for event in self._event_store.search_events(
+            start_id=min(missing), end_id=max(missing)
+        ):
+            for position in missing.pop(event.id, ()):
+                self._events[position] = event
+        for id, id_positions in missing.items():
+            event = self._event_store.get_event(id)
+            for position in id_positions:
+                self._events[position] = event
+
+
+class StateCheckpointer:
+    """Saves the controller State together with the last event applied to it.
+
+    A checkpoint is written through the FileStore once `interval` events
+    have been applied since the previous one, so resuming a conversation
+    only reads the events after the latest checkpoint instead of its whole
+    history. With `interval` None, checkpoints are only written by `save`
+    and `flush`.
+
+    The state's `history` is saved as the ids of its events, and `restore`
+    gives it back as a LazyHistory that reads the events when they are used.
+    """
+
+    sid: str
+    file_store: FileStore
+    user_id: str | None
+    interval: int | None
+
+    def __init__(
+        self,
+        sid: str,
+        file_store: FileStore,
+        user_id: str | None = None,
+        interval: int | None = DEFAULT_CHECKPOINT_INTERVAL,
+    ):
+        if interval is not None and interval < 1:
+            raise ValueError(f'interval must be positive: {interval}')
+        self.sid = sid
+        self.file_store = file_store
+        self.user_id = user_id
+        self.interval = interval
+        self._saved_id = -1
+        self._applied_id = -1
+        self._restored_id = -1
+        self._writing = False
+
+    def load(self) -> StateCheckpoint | None:
+        """Returns the latest checkpoint, or None if there is no usable one."""
+        try:
+            encoded = self.file_store.read(self._get_filename())
+        except FileNotFoundError:
+            return None
+        try:
+            checkpoint = pickle.loads(base64.b64decode(encoded))
+        except Exception as e:
+            # E.g. written by a version whose State no longer unpickles.
+            logger.warning(f'Ignoring unreadable state checkpoint of {self.sid}: {e}')
+            return None
+        if not isinstance(checkpoint, StateCheckpoint):
+            logger.warning(f'Ignoring invalid state checkpoint of {self.sid}')
+            return None
+        self._saved_id = self._applied_id = checkpoint.last_event_id
+        return checkpoint
+
+    def save(self, state: Any, last_event_id: int) -> None:
+        self._write(_encode(state, last_event_id), last_event_id)
+
+    async def on_event_applied(self, state: Any, event_id: int) -> bool:
+        """Records that an event was applied; returns whether it saved.
+
+        The checkpoint is pickled on the event loop, while the state cannot
+        change, and only the write runs on the executor. A failed save is
+        logged and retried with the next event.
+        """
+        self._applied_id = max(self._applied_id, event_id)
+        if self.interval is None or self._applied_id - self._saved_id < self.interval:
+            return False
+        if self._writing:
+            # Saved with a later event once the write in progress is done.
+            return False
+        last_event_id = self._applied_id
+        self._writing = True
+        try:
+            encoded = _encode(state, last_event_id)
+            await call_sync_from_async(self._write, encoded, last_event_id)
+        except Exception as e:
+            logger.error(f'Failed to save the state checkpoint of {self.sid}: {e}')
+            return False
+        finally:
+            self._writing = False
+        return True
+
+    def flush(self, state: Any) -> None:
+        """Saves a checkpoint if events were applied since the last one."""
+        if self._applied_id > self._saved_id:
+            self.save(state, self._applied_id)
+
+    def restore(self, event_store: EventStore) -> Any | None:
+        """Returns the checkpointed state, with a LazyHistory as its history.
+
+        The events after the checkpoint still have to be applied with
+        `replay`. Returns None if there is no checkpoint, and the caller
+        builds the state from the whole history as before.
+        """
+        checkpoint = self.load()
+        if checkpoint is None:
+            return None
+        state = checkpoint.state
+        if checkpoint.history_ids is not None:
+            state.history = LazyHistory(event_store, checkpoint.history_ids)
+        self._restored_id = checkpoint.last_event_id
+        return state
+
+    async def replay(
+        self, event_store: EventStore, apply: Callable[[Event], Awaitable[Any]]
+    ) -> None:
+        """Applies each event after the restored checkpoint with `apply(event)`."""
+        end_id = event_store.get_latest_event_id()
+        for event in event_store.search_events(
+            start_id=self._restored_id + 1, end_id=end_id
+        ):
+            await apply(event)
+        self._applied_id = max(self._applied_id, end_id)
+
+    def _write(self, encoded: str, last_event_id: int) -> None:
+        self.file_store.write(self._get_filename(), encoded)
+        self._saved_id = max(self._saved_id, last_event_id)
+        self._applied_id = max(self._applied_id, last_event_id)
+
+    def _get_filename(self) -> str:
+        return get_conversation_state_checkpoint_filename(self.sid, self.user_id)
+
+
+def _encode(state: Any, last_event_id: int) -> str:
+    history = getattr(state, 'history', None)
+    if isinstance(history, LazyHistory):
+        history_ids = history.ids
+    elif history:
+        history_ids = [event.id for event in history]
+    else:
+        return _pickle(StateCheckpoint(state, last_event_id))
+    if any(id == Event.INVALID_ID for id in history_ids):
+        # Events that were never stored can only be saved with the state.
+        return _pickle(StateCheckpoint(state, last_event_id))
+    snapshot = copy.copy(state)
+    snapshot.history = []
+    return _pickle(StateCheckpoint(snapshot, last_event_id, history_ids))
+
+
+def _pickle(checkpoint: StateCheckpoint) -> str:
+    return base64.b64encode(pickle.dumps(checkpoint)).decode('ascii')
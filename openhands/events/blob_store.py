@@ -0,0 +1,201 @@
+import hashlib
+import inspect
+import threading
+from typing import Any
+
+from openhands.events.event import Event
+from openhands.storage.compression import compress_text
+from openhands.storage.files import FileStore
+
+# A good `blob_threshold` for EventStream: string fields at least this long
+# are moved out of the event JSON.
+DEFAULT_BLOB_THRESHOLD = 256 * 1024
+
+BLOB_REF_KEY = '$blob'
+_NESTED_FIELDS = ('args', 'extras')
+
+
+class BlobStore:
+    """Content-addressed store of large strings, one file per SHA-256 digest."""
+
+    file_store: FileStore
+    directory: str
+    compression: str | None
+
+    def __init__(
+        self, file_store: FileStore, directory: str, compression: str | None = None
+    ):
+        self.file_store = file_store
+        self.directory = directory
+        self.compression = compression
+        self._written: set[str] = set()
+
+    def put(self, text: str) -> str:
+        digest = hashlib.sha256(text.encode('utf-8')).hexdigest()
+        if digest not in self._written:
+            contents = text
+            if self.compression is not None:
+                contents = compress_text(text, self.compression, threshold=0)
+            self.file_store.write(self._get_path(digest), contents)
+            self._written.add(digest)
+        return digest
+
+    def get(self, digest: str) -> str:
+        return self.file_store.read(self._get_path(digest))
+
+    def _get_path(self, digest: str) -> str:
+        return f'{self.directory}{digest}'
+
+
+def offload_large_fields(
+    data: dict[str, Any], blob_store: BlobStore, threshold: int
+) -> int:
+    """Replaces long strings in an event dict with blob references, in place.
+
+    Returns the number of characters moved to the blob store.
+    """
+    offloaded = 0
+    for container, key in _iter_string_fields(data):
+        value = container[key]
+        if len(value) >= threshold:
+            container[key] = {BLOB_REF_KEY: blob_store.put(value), 'size': len(value)}
+            offloaded += len(value)
+    return offloaded
+
+
+class PendingBlob:
+    """A blob field of an event that is loaded on first access."""
+
+    __slots__ = ('blob_store', 'digest', 'size')
+
+    def __init__(self, blob_store: BlobStore, digest: str, size: int):
+        self.blob_store = blob_store
+        self.digest = digest
+        self.size = size
+
+    def load(self) -> str:
+        return self.blob_store.get(self.digest)
+
+    def __reduce__(self):
+        # Pickled and deep-copied as the text itself, so a pickled event does
+        # not depend on the blob store.
+        return str, (self.load(),)
+
+
+def pop_blob_refs(
+    data: dict[str, Any], blob_store: BlobStore
+) -> list[tuple[dict[str, Any], str, PendingBlob]]:
+    """Replaces blob references in an event dict with empty strings, in place.
+
+    Returns the container, key and pending blob of every replaced field.
+    """
+    pending = []
+    for container, key in list(_iter_blob_ref_fields(data)):
+        ref = container[key]
+        pending.append(
+            (container, key, PendingBlob(blob_store, ref[BLOB_REF_KEY], ref.get('size', 0)))
+        )
+        container[key] = ''
+    return pending
+
+
+def attach_blob_refs(
+    event: Event, pending: list[tuple[dict[str, Any], str, PendingBlob]]
+) -> bool:
+    """Makes the fields of `event` load their pending blobs on first access.
+
+    The event keeps its class: a data descriptor is installed on the class
+    for each such field, which behaves like a plain attribute otherwise.
+    Returns False, leaving the event unchanged, if a field cannot be made
+    lazy, e.g. because it is a property or the event was built with a
+    different attribute name for it.
+    """
+    cls = type(event)
+    attributes = getattr(event, '__dict__', None)
+    if attributes is None:
+        return False
+    for _, key, _ in pending:
+        if attributes.get(key) != '' or not _install_lazy_field(cls, key):
+            return False
+    for _, key, blob in pending:
+        attributes[key] = blob
+    return True
+
+
+def resolve_blob_refs(data: dict[str, Any], blob_store: BlobStore) -> int:
+    """Replaces blob references in an event dict with their contents, in place.
+
+    Returns the number of characters loaded from the blob store.
+    """
+    loaded: dict[str, str] = {}
+    size = 0
+    for container, key in list(_iter_blob_ref_fields(data)):
+        digest = container[key][BLOB_REF_KEY]
+        if digest not in loaded:
+            loaded[digest] = blob_store.get(digest)
+        container[key] = loaded[digest]
+        size += len(loaded[digest])
+    return size
+
+
+_MISSING = object()
+_install_lock = threading.Lock()
+
+
+class _LazyBlobField:
+    """Data descriptor that swaps a PendingBlob for its text on first access."""
+
+    def __init__(self, name: str, default: Any):
+        self.name = name
+        self.default = default
+
+    def __get__(self, obj: Any, objtype: type | None = None) -> Any:
+        value = self.default if obj is None else obj.__dict__.get(self.name, self.default)
+        if value is _MISSING:
+            raise AttributeError(self.name)
+        if type(value) is PendingBlob:
+            value = obj.__dict__[self.name] = value.load()
+        return value
+
+    def __set__(self, obj: Any, value: Any) -> None:
+        obj.__dict__[self.name] = value
+
+    def __delete__(self, obj: Any) -> None:
+        try:
+            del obj.__dict__[self.name]
+        except KeyError:
+            raise AttributeError(self.name) from None
+
+
+def _install_lazy_field(cls: type, name: str) -> bool:
+    with _install_lock:
+        existing = inspect.getattr_static(cls, name, _MISSING)
+        if isinstance(existing, _LazyBlobField):
+            return True
+        if hasattr(type(existing), '__get__'):
+            # A property, method or other descriptor of the class.
+            return False
+        # Class attributes are defaults, e.g. of dataclass fields.
+        setattr(cls, name, _LazyBlobField(name, existing))
+        return True
+
+
+def _iter_string_fields(data: dict[str, Any]):
+    if isinstance(data.get('content'), str):
+        yield data, 'content'
+    for key in _NESTED_FIELDS:
+        values = data.get(key)
+        if isinstance(values, dict):
+            for name, value in values.items():
+                if isinstance(value, str):
+                    yield values, name
+
+
+def _iter_blob_ref_fields(data: dict[str, Any]):
+    containers = [data] + [
+        data[key] for key in _NESTED_FIELDS if isinstance(data.get(key), dict)
+    ]
+    for container in containers:
+        for key, value in container.items():
+            if isinstance(value, dict) and BLOB_REF_KEY in value:
+                yield container, key
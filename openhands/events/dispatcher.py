@@ -0,0 +1,273 @@
+import asyncio
+import os
+import threading
+from collections import deque
+from concurrent.futures import ThreadPoolExecutor
+from typing import Any, Callable, Iterable
+
+# How many events a worker delivers to one callback before yielding the thread
+# to other callbacks, so a busy subscriber cannot starve the rest.
+MAX_EVENTS_PER_RUN = 64
+
+
+class CallbackQueue:
+    """Serial queue of events for a single subscriber callback.
+
+    At most one delivery run per queue is active at any time, which keeps
+    events in order for the callback while callbacks of other subscribers run
+    concurrently on the shared pool.
+    """
+
+    callback: Callable[[Any], Any]
+    on_error: Callable[[Exception], None]
+    is_async: bool
+
+    def __init__(
+        self,
+        dispatcher: 'EventDispatcher',
+        callback: Callable[[Any], Any],
+        on_error: Callable[[Exception], None],
+    ):
+        self.dispatcher = dispatcher
+        self.callback = callback
+        self.on_error = on_error
+        self.is_async = asyncio.iscoroutinefunction(callback)
+        self._events: deque = deque()
+        self._lock = threading.Lock()
+        self._idle = threading.Condition(self._lock)
+        self._running = False
+        self._closed = False
+        # Thread running the callback, so close() from the callback itself
+        # does not wait for its own return.
+        self._delivery_thread: int | None = None
+
+    def put(self, event: Any) -> None:
+        self.put_many((event,))
+
+    def put_many(self, events: Iterable[Any]) -> None:
+        with self._lock:
+            if self._closed:
+                return
+            self._events.extend(events)
+            if self._running or not self._events:
+                return
+            self._running = True
+        self.dispatcher._schedule(self)
+
+    def close(self) -> None:
+        """Stops taking events and waits until the queued ones are delivered.
+
+        Called from a callback on the dispatcher, it does not wait; the events
+        are delivered after the callback returns.
+        """
+        with self._lock:
+            if self._closed:
+                return
+            self._closed = True
+            # Lingering batches are delivered right away.
+            schedule = bool(self._events) and not self._running
+            if schedule:
+                self._running = True
+        if schedule:
+            self.dispatcher._schedule(self)
+        with self._lock:
+            if self._delivery_thread == threading.get_ident():
+                return
+            if self.is_async and self.dispatcher._on_loop_thread():
+                return
+            self._idle.wait_for(lambda: not self._running)
+
+    def _next_item(self) -> tuple[bool, Any]:
+        with self._lock:
+            if not self._events:
+                self._stop_running()
+                return False, None
+            self._delivery_thread = threading.get_ident()
+            return True, self._events.popleft()
+
+    def _stop_running(self) -> None:
+        self._running = False
+        self._delivery_thread = None
+        self._idle.notify_all()
+
+    def _drain(self) -> None:
+        for _ in range(MAX_EVENTS_PER_RUN):
+            has_item, item = self._next_item()
+            if not has_item:
+                return
+            try:
+                self.callback(item)
+            except Exception as e:
+                self.on_error(e)
+        # Still running; give other callbacks a turn before continuing.
+        self.dispatcher._schedule(self)
+
+    async def _drain_async(self) -> None:
+        while True:
+            has_item, item = self._next_item()
+            if not has_item:
+                return
+            try:
+                await self.callback(item)
+            except Exception as e:
+                self.on_error(e)
+
+
+class BatchCallbackQueue(CallbackQueue):
+    """Delivers lists of up to `max_batch_size` events to the callback.
+
+    An idle queue waits up to `max_linger` seconds after the first event for
+    more to arrive before delivering, unless a full batch is ready earlier.
+    Events that arrive while the callback runs make up the next batch.
+    """
+
+    max_batch_size: int
+    max_linger: float
+
+    def __init__(
+        self,
+        dispatcher: 'EventDispatcher',
+        callback: Callable[[list[Any]], Any],
+        on_error: Callable[[Exception], None],
+        max_batch_size: int,
+        max_linger: float,
+    ):
+        super().__init__(dispatcher, callback, on_error)
+        self.max_batch_size = max_batch_size
+        self.max_linger = max_linger
+        self._lingering = False
+
+    def put_many(self, events: Iterable[Any]) -> None:
+        with self._lock:
+            if self._closed:
+                return
+            self._events.extend(events)
+            if self._running or not self._events:
+                return
+            if len(self._events) < self.max_batch_size and self.max_linger > 0:
+                if not self._lingering:
+                    self._lingering = True
+                    self.dispatcher._schedule_later(self.max_linger, self._linger_expired)
+                return
+            self._running = True
+        self.dispatcher._schedule(self)
+
+    def _linger_expired(self) -> None:
+        with self._lock:
+            self._lingering = False
+            if self._running or self._closed or not self._events:
+                return
+            self._running = True
+        self.dispatcher._schedule(self)
+
+    def _next_item(self) -> tuple[bool, Any]:
+        with self._lock:
+            if not self._events:
+                self._stop_running()
+                return False, None
+            self._delivery_thread = threading.get_ident()
+            count = min(len(self._events), self.max_batch_size)
+            return True, [self._events.popleft() for _ in range(count)]
+
+
+class EventDispatcher:
+    """Runs subscriber callbacks for any number of event streams.
+
+    Sync callbacks run on one bounded thread pool whose threads are started
+    on demand. Each worker thread has its own event loop, so callbacks can
+    keep using `asyncio.get_event_loop().run_until_complete`. Coroutine
+    callbacks run on a single shared event loop thread instead of taking up
+    a worker.
+
+    The pool has `max_workers` threads, by default min(64, 4 * CPU count),
+    shared by every stream using this dispatcher. A callback that blocks holds
+    a worker until it returns, so once that many callbacks block, the other
+    subscribers wait. Streams with subscribers that block for long should be
+    given their own dispatcher.
+    """
+
+    def __init__(self, max_workers: int | None = None):
+        if max_workers is None:
+            max_workers = min(64, (os.cpu_count() or 1) * 4)
+        self._pool = ThreadPoolExecutor(
+            max_workers=max_workers,
+            thread_name_prefix='event-dispatcher',
+            initializer=self._init_worker_loop,
+        )
+        self._loop: asyncio.AbstractEventLoop | None = None
+        self._loop_thread: threading.Thread | None = None
+        self._loop_lock = threading.Lock()
+
+    @staticmethod
+    def _init_worker_loop() -> None:
+        asyncio.set_event_loop(asyncio.new_event_loop())
+
+    def register(
+        self,
+        callback: Callable[[Any], Any],
+        on_error: Callable[[Exception], None],
+    ) -> CallbackQueue:
+        return CallbackQueue(self, callback, on_error)
+
+    def register_batch(
+        self,
+        callback: Callable[[list[Any]], Any],
+        on_error: Callable[[Exception], None],
+        max_batch_size: int,
+        max_linger: float,
+    ) -> BatchCallbackQueue:
+        return BatchCallbackQueue(self, callback, on_error, max_batch_size, max_linger)
+
+    def _schedule(self, callback_queue: CallbackQueue) -> None:
+        if callback_queue.is_async:
+            asyncio.run_coroutine_threadsafe(
+                callback_queue._drain_async(), self._get_loop()
+            )
+        else:
+            self._pool.submit(callback_queue._drain)
+
+    def _schedule_later(self, delay: float, callback: Callable[[], None]) -> None:
+        # The shared loop doubles as the timer for lingering batches.
+        loop = self._get_loop()
+        loop.call_soon_threadsafe(loop.call_later, delay, callback)
+
+    def _on_loop_thread(self) -> bool:
+        return (
+            self._loop_thread is not None
+            and self._loop_thread.ident == threading.get_ident()
+        )
+
+    def _get_loop(self) -> asyncio.AbstractEventLoop:
+        with self._loop_lock:
+            if self._loop is None:
+                self._loop = asyncio.new_event_loop()
+                self._loop_thread = threading.Thread(
+                    target=self._loop.run_forever,
+                    name='event-dispatcher-loop',
+                    daemon=True,
+                )
+                self._loop_thread.start()
+            return self._loop
+
+    def shutdown(self) -> None:
+        self._pool.shutdown(wait=True)
+        with self._loop_lock:
+            if self._loop is not None:
+                self._loop.call_soon_threadsafe(self._loop.stop)
+                if self._loop_thread is not None:
+                    self._loop_thread.join()
+                self._loop.close()
+                self._loop = None
+
+
+_default_dispatcher: EventDispatcher | None = None
+_default_dispatcher_lock = threading.Lock()
+
+
+def get_event_dispatcher() -> EventDispatcher:
+    """Returns the dispatcher shared by every EventStream in the process."""
+    global _default_dispatcher
+    with _default_dispatcher_lock:
+        if _default_dispatcher is None:
+            _default_dispatcher = EventDispatcher()
+        return _default_dispatcher
@@ -0,0 +1,76 @@
+import threading
+from collections import OrderedDict
+
+from openhands.events.event import Event
+
+DEFAULT_EVENT_CACHE_MAX_BYTES = 64 * 1024 * 1024
+
+
+class EventCache:
+    """Bounded LRU cache of deserialized events, keyed by (sid, event id).
+
+    Entries are charged the size of their serialized JSON, and the least
+    recently used events are evicted once `max_bytes` is exceeded. Events are
+    returned as the cached objects, not copies, so callers must not mutate
+    them.
+    """
+
+    max_bytes: int
+    hits: int
+    misses: int
+
+    def __init__(self, max_bytes: int = DEFAULT_EVENT_CACHE_MAX_BYTES):
+        self.max_bytes = max_bytes
+        self.hits = 0
+        self.misses = 0
+        self._entries: OrderedDict[tuple[str, int], tuple[Event, int]] = OrderedDict()
+        self._size_bytes = 0
+        self._lock = threading.Lock()
+
+    def get(self, sid: str, id: int) -> Event | None:
+        with self._lock:
+            entry = self._entries.get((sid, id))
+            if entry is None:
+                self.misses += 1
+                return None
+            self._entries.move_to_end((sid, id))
+            self.hits += 1
+            return entry[0]
+
+    def put(self, sid: str, id: int, event: Event, size_bytes: int) -> None:
+        if size_bytes > self.max_bytes:
+            return
+        with self._lock:
+            previous = self._entries.pop((sid, id), None)
+            if previous is not None:
+                self._size_bytes -= previous[1]
+            self._entries[(sid, id)] = (event, size_bytes)
+            self._size_bytes += size_bytes
+            while self._size_bytes > self.max_bytes:
+                _, (_, evicted_size) = self._entries.popitem(last=False)
+                self._size_bytes -= evicted_size
+
+    def invalidate(self, sid: str, id: int | None = None) -> None:
+        """Drops one event, or every event of the conversation if id is None."""
+        with self._lock:
+            if id is not None:
+                keys = [(sid, id)] if (sid, id) in self._entries else []
+            else:
+                keys = [key for key in self._entries if key[0] == sid]
+            for key in keys:
+                self._size_bytes -= self._entries.pop(key)[1]
+
+    @property
+    def size_bytes(self) -> int:
+        return self._size_bytes
+
+    def __len__(self) -> int:
+        return len(self._entries)
+
+
+_default_event_cache = EventCache()
+
+
+def get_event_cache() -> EventCache:
+    """Returns the cache shared by every EventStore in the process."""
+    return _default_event_cache
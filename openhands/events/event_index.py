@@ -0,0 +1,105 @@
+import bisect
+import json
+from enum import Enum
+from typing import Any
+
+INDEXED_FIELDS = ('action', 'observation', 'source', 'cause')
+# Events per persisted index segment.
+EVENT_INDEX_SEGMENT_SIZE = 250
+
+
+def _key(field_name: str, value: Any) -> str:
+    if isinstance(value, Enum):
+        value = value.value
+    return f'{field_name}:{value}'
+
+
+class EventIndex:
+    """Sorted id lists of events by action/observation type, source and cause.
+
+    `next_id` is the id of the first event that has not been indexed yet, so
+    a persisted index can be caught up from there. An index is persisted as
+    segments of EVENT_INDEX_SEGMENT_SIZE events, see `slice` and `merge`.
+    """
+
+    next_id: int
+
+    def __init__(self, next_id: int = 0, postings: dict[str, list[int]] | None = None):
+        self.next_id = next_id
+        self._postings: dict[str, list[int]] = postings or {}
+
+    def add(self, id: int, data: dict[str, Any]) -> None:
+        for field_name in INDEXED_FIELDS:
+            value = data.get(field_name)
+            if value is None:
+                continue
+            self._add_id(_key(field_name, value), id)
+        self.next_id = max(self.next_id, id + 1)
+
+    def merge(self, other: 'EventIndex') -> None:
+        """Adds every id indexed by `other`, e.g. a loaded segment."""
+        for key, ids in other._postings.items():
+            for id in ids:
+                self._add_id(key, id)
+        self.next_id = max(self.next_id, other.next_id)
+
+    def slice(self, start_id: int, end_id: int) -> 'EventIndex':
+        """Returns the index of the events in [start_id, end_id) only."""
+        postings = {}
+        for key, ids in self._postings.items():
+            lo = bisect.bisect_left(ids, start_id)
+            hi = bisect.bisect_left(ids, end_id, lo)
+            if lo < hi:
+                postings[key] = ids[lo:hi]
+        return EventIndex(end_id, postings)
+
+    def _add_id(self, key: str, id: int) -> None:
+        ids = self._postings.setdefault(key, [])
+        if not ids or ids[-1] < id:
+            ids.append(id)
+            return
+        # Re-indexing an event, e.g. while catching up, must not duplicate it.
+        pos = bisect.bisect_left(ids, id)
+        if ids[pos] != id:
+            ids.insert(pos, id)
+
+    def find(
+        self,
+        action: str | None = None,
+        observation: str | None = None,
+        source: str | None = None,
+        cause: int | None = None,
+        start_id: int = 0,
+        end_id: int | None = None,
+    ) -> list[int]:
+        """Returns the sorted ids matching every given criterion in [start_id, end_id]."""
+        criteria = {
+            'action': action,
+            'observation': observation,
+            'source': source,
+            'cause': cause,
+        }
+        lists = [
+            self._postings.get(_key(field_name, value), [])
+            for field_name, value in criteria.items()
+            if value is not None
+        ]
+        if not lists:
+            raise ValueError('At least one criterion is required')
+        lists.sort(key=len)
+        smallest = lists[0]
+        lo = bisect.bisect_left(smallest, start_id)
+        hi = len(smallest) if end_id is None else bisect.bisect_right(smallest, end_id)
+        candidates = smallest[lo:hi]
+        for other in lists[1:]:
+            members = set(other)
+            candidates = [id for id in candidates if id in members]
+        return candidates
+
+    def to_json(self) -> str:
+        return json.dumps({'next_id': self.next_id, 'postings': self._postings})
+
+    @classmethod
+    def from_json(cls, contents: str) -> 'EventIndex':
+        data = json.loads(contents)
+        return cls(int(data['next_id']), data['postings'])
@@ -1,37 +1,573 @@
+import bisect
+import json
+from dataclasses import dataclass, field
+from typing import Iterable
+
+from openhands.core.logger import openhands_logger as logger
+from openhands.events.blob_store import (
+    BlobStore,
+    attach_blob_refs,
+    pop_blob_refs,
+    resolve_blob_refs,
+)
+from openhands.events.event import Event
+from openhands.events.event_cache import EventCache, get_event_cache
+from openhands.events.event_index import EVENT_INDEX_SEGMENT_SIZE, EventIndex
+from openhands.events.text_index import TEXT_INDEX_SEGMENT_SIZE, TextIndexSegment, tokenize
+from openhands.events.event_store_abc import EventStoreABC
+from openhands.events.serialization.event import event_from_dict
+from openhands.storage.compaction import compact_events, get_page_ranges
+from openhands.storage.compression import decompress_value
 from openhands.storage.files import FileStore
+from openhands.storage.locations import (
+    get_conversation_event_filename,
+    get_conversation_blobs_dir,
+    get_conversation_event_index_dir,
+    get_conversation_events_dir,
+    get_conversation_events_manifest_filename,
+    get_conversation_text_index_dir,
+    get_conversion_dir,
+)
+
+
+@dataclass(frozen=True)
+class _CachePage:
+    events: list[dict] | None
+    start: int
+    end: int
+    # Approximate serialized size of one event, for the event cache.
+    event_size: int = 0
+
+    def covers(self, global_index: int) -> bool:
+        return self.start <= global_index < self.end
+
+    def get_data(self, global_index: int) -> dict | None:
+        # A page that was never written has no events; the caller falls back
+        # to the per-event file.
+        if not self.events:
+            return None
+        return decompress_value(self.events[global_index - self.start])
+
+
+_DUMMY_PAGE = _CachePage(None, 1, -1)
+
+# The events manifest is rewritten every this many events, so at most this
+# many events were added after the one it records.
+EVENTS_MANIFEST_INTERVAL = 25
 
+# Events per page written by `EventStore.compact`.
+DEFAULT_COMPACTION_PAGE_SIZE = 250
+
+
+@dataclass
 class EventStore(EventStoreABC):
     sid: str
     file_store: FileStore
     user_id: str | None
     cache_size: int = 25
+    # Keyword-only, so the positional order of the other fields is unchanged.
+    event_cache: EventCache | None = field(
+        default_factory=get_event_cache, kw_only=True
+    )
     _cur_id: int | None = None
+    _manifest_id: int = 0
+    _event_index: EventIndex | None = None
+    _text_segments: dict[int, TextIndexSegment] = field(default_factory=dict)
+    _blob_store: BlobStore | None = None
+    # (start, end) of the stored pages, sorted, without pages that another
+    # page contains. Loaded from the event_cache listing on first use.
+    _page_table: list[tuple[int, int]] | None = None
 
     @property
     def cur_id(self) -> int:
         if self._cur_id is None:
-            self._cur_id = self._calculate_cur_id()
+            self._cur_id = self._load_cur_id()
         return self._cur_id
 
     @cur_id.setter
     def cur_id(self, value: int) -> None:
-        self._cur_id = value   
+        self._cur_id = value
+
+    def search_events(
+        self,
+        start_id: int = 0,
+        end_id: int | None = None,
+        reverse: bool = False,
+        limit: int | None = None,
+    ) -> Iterable[Event]:
+        """Lazily yields events from start_id to end_id (inclusive).
+
+        Events are read a cache page at a time where a page exists, so only
+        the tail that has not filled a page yet is read event by event.
+        Events may be shared with other readers through the event cache and
+        must not be mutated.
+        """
+        if end_id is None:
+            end_id = self.cur_id - 1
+        else:
+            end_id = min(end_id, self.cur_id - 1)
+        if reverse:
+            indexes = range(end_id, start_id - 1, -1)
+        else:
+            indexes = range(start_id, end_id + 1)
+
+        cache_page = _DUMMY_PAGE
+        refreshed = False
+        num_results = 0
+        for index in indexes:
+            if limit is not None and num_results >= limit:
+                return
+            event = self._get_cached_event(index)
+            if event is None:
+                if not cache_page.covers(index):
+                    cache_page = self._load_cache_page_for_index(index)
+                event = self._get_event_from_page(cache_page, index)
+            if event is None:
+                try:
+                    event = self._get_event_from_file(index)
+                except FileNotFoundError:
+                    # Possibly compacted into a page since the table was read.
+                    cache_page = self._load_cache_page_for_index(
+                        index, refresh=not refreshed
+                    )
+                    refreshed = True
+                    event = self._get_event_from_page(cache_page, index)
+                    if event is None:
+                        continue
+            yield event
+            num_results += 1
+
+    def find_event_ids(
+        self,
+        action: str | None = None,
+        observation: str | None = None,
+        source: str | None = None,
+        cause: int | None = None,
+        start_id: int = 0,
+        end_id: int | None = None,
+    ) -> list[int]:
+        """Returns the sorted ids of events matching every given criterion.
+
+        Uses the event index, so no events are read to answer the query.
+        """
+        return self._get_event_index().find(
+            action=action,
+            observation=observation,
+            source=source,
+            cause=cause,
+            start_id=start_id,
+            end_id=end_id,
+        )
+
+    def find_events(
+        self,
+        action: str | None = None,
+        observation: str | None = None,
+        source: str | None = None,
+        cause: int | None = None,
+        start_id: int = 0,
+        end_id: int | None = None,
+        reverse: bool = False,
+        limit: int | None = None,
+    ) -> Iterable[Event]:
+        """Lazily yields the events matching every given criterion."""
+        ids = self.find_event_ids(action, observation, source, cause, start_id, end_id)
+        if reverse:
+            ids.reverse()
+        if limit is not None:
+            ids = ids[:limit]
+        for id in ids:
+            try:
+                yield self.get_event(id)
+            except FileNotFoundError:
+                continue
+
+    def find_text_ids(
+        self, query: str, start_id: int = 0, end_id: int | None = None
+    ) -> list[int]:
+        """Returns the sorted ids of events containing every word of `query`.
+
+        Words are matched whole and case-insensitively against the content,
+        message, args and extras of each event.
+        """
+        tokens = tokenize(query)
+        if not tokens:
+            return []
+        if end_id is None:
+            end_id = self.cur_id - 1
+        else:
+            end_id = min(end_id, self.cur_id - 1)
+        first = start_id - start_id % TEXT_INDEX_SEGMENT_SIZE
+        ids: list[int] = []
+        for segment_start in range(first, end_id + 1, TEXT_INDEX_SEGMENT_SIZE):
+            segment = self._get_text_segment(segment_start)
+            ids.extend(id for id in segment.find(tokens) if start_id <= id <= end_id)
+        return ids
+
+    def search_text(
+        self,
+        query: str,
+        start_id: int = 0,
+        end_id: int | None = None,
+        reverse: bool = False,
+        limit: int | None = None,
+    ) -> Iterable[Event]:
+        """Lazily yields the events containing every word of `query`."""
+        ids = self.find_text_ids(query, start_id, end_id)
+        if reverse:
+            ids.reverse()
+        if limit is not None:
+            ids = ids[:limit]
+        for id in ids:
+            try:
+                yield self.get_event(id)
+            except FileNotFoundError:
+                continue
+
+    def get_event(self, id: int) -> Event:
+        """Returns an event. It may be shared through the event cache, so it
+        must not be mutated.
+        """
+        event = self._get_cached_event(id)
+        if event is not None:
+            return event
+        try:
+            return self._get_event_from_file(id)
+        except FileNotFoundError:
+            cache_page = self._load_cache_page_for_index(id)
+            event = self._get_event_from_page(cache_page, id)
+            if event is None:
+                cache_page = self._load_cache_page_for_index(id, refresh=True)
+                event = self._get_event_from_page(cache_page, id)
+            if event is None:
+                raise
+            return event
+
+    def get_latest_event(self) -> Event:
+        return self.get_event(self.cur_id - 1)
+
+    def get_latest_event_id(self) -> int:
+        return self.cur_id - 1
+
+    def _get_event_from_file(self, id: int) -> Event:
+        filename = self._get_filename_for_id(id, self.user_id)
+        content = self.file_store.read(filename)
+        event, blob_size = self._event_from_dict(json.loads(content))
+        self._cache_event(id, event, len(content) + blob_size)
+        return event
+
+    def _get_event_from_page(self, cache_page: _CachePage, id: int) -> Event | None:
+        data = cache_page.get_data(id)
+        if data is None:
+            return None
+        event, blob_size = self._event_from_dict(data)
+        self._cache_event(id, event, cache_page.event_size + blob_size)
+        return event
+
+    def _event_from_dict(self, data: dict) -> tuple[Event, int]:
+        """Returns the event and the size of the blobs of its fields.
+
+        Blob fields are loaded when they are first accessed, so paging through
+        events does not read their blobs. Their full size is returned anyway,
+        to be charged to the event cache.
+        """
+        pending = pop_blob_refs(data, self._get_blob_store())
+        event = event_from_dict(data)
+        if pending and not attach_blob_refs(event, pending):
+            for container, key, blob in pending:
+                container[key] = blob.load()
+            event = event_from_dict(data)
+        return event, sum(blob.size for _, _, blob in pending)
+
+    def _get_blob_store(self) -> BlobStore:
+        if self._blob_store is None:
+            self._blob_store = BlobStore(
+                self.file_store, get_conversation_blobs_dir(self.sid, self.user_id)
+            )
+        return self._blob_store
+
+    def _get_cached_event(self, id: int) -> Event | None:
+        if self.event_cache is None:
+            return None
+        return self.event_cache.get(self.sid, id)
+
+    def _cache_event(self, id: int, event: Event, size_bytes: int) -> None:
+        if self.event_cache is not None:
+            self.event_cache.put(self.sid, id, event, size_bytes)
+
+    def _load_cache_page(self, start: int, end: int) -> _CachePage:
+        cache_filename = self._get_filename_for_cache(start, end)
+        try:
+            # Parsed from bytes, which skips decoding the page to text first.
+            content = self.file_store.read_bytes(cache_filename)
+            events = json.loads(content)
+        except FileNotFoundError:
+            return _CachePage(None, start, end)
+        return _CachePage(events, start, end, len(content) // max(len(events), 1))
+
+    def _load_cache_page_for_index(
+        self, index: int, refresh: bool = False
+    ) -> _CachePage:
+        """Loads the page holding an event, or an empty page if there is none.
+
+        Pages are found through the page table, so compacted pages of any
+        size are used. Pages the stream wrote after the table was loaded are
+        aligned to `cache_size`. With `refresh`, the table is reloaded first,
+        for when another store may have compacted the events meanwhile.
+        Reloading lists the pages, so callers do it at most once per call.
+        """
+        page_range = self._find_page_range(index, refresh)
+        if page_range is not None:
+            # Empty if superseded by a larger page since the table was loaded.
+            return self._load_cache_page(*page_range)
+        start = index - index % self.cache_size
+        return self._load_cache_page(start, start + self.cache_size)
+
+    def _find_page_range(
+        self, index: int, refresh: bool = False
+    ) -> tuple[int, int] | None:
+        page_table = self._get_page_table(refresh)
+        # Starts and ends both increase, since contained pages were dropped.
+        i = bisect.bisect_right(page_table, index, key=lambda r: r[0]) - 1
+        if i >= 0 and index < page_table[i][1]:
+            return page_table[i]
+        return None
+
+    def _get_page_table(self, refresh: bool = False) -> list[tuple[int, int]]:
+        if self._page_table is None or refresh:
+            page_table: list[tuple[int, int]] = []
+            ranges = get_page_ranges(
+                self.file_store, get_conversion_dir(self.sid, self.user_id)
+            )
+            for start, end in sorted(ranges, key=lambda r: (r[0], -r[1])):
+                if not page_table or end > page_table[-1][1]:
+                    page_table.append((start, end))
+            self._page_table = page_table
+        return self._page_table
+
+    def compact(
+        self,
+        page_size: int = DEFAULT_COMPACTION_PAGE_SIZE,
+        include_tail: bool = False,
+    ) -> int:
+        """Merges stored events into pages of `page_size` events.
+
+        The per-event files and smaller pages that a new page covers are
+        deleted once it is written, so the conversation stays readable while
+        this runs. Only events in full `cache_size` ranges are compacted,
+        unless `include_tail`, for a conversation that no longer grows.
+        Returns the number of files deleted.
+        """
+        end_id = self.cur_id
+        if not include_tail:
+            end_id -= end_id % self.cache_size
+        removed = compact_events(
+            self.file_store,
+            get_conversion_dir(self.sid, self.user_id),
+            page_size,
+            end_id,
+        )
+        # Cached events stay valid: compaction only moves them between files.
+        self._get_page_table(refresh=True)
+        return removed
+
+    def delete(self) -> None:
+        """Deletes the conversation directory and forgets the cached events."""
+        self.file_store.delete(get_conversion_dir(self.sid, self.user_id))
+        if self.event_cache is not None:
+            self.event_cache.invalidate(self.sid)
+        self._cur_id = None
+        self._manifest_id = 0
+        self._event_index = None
+        self._text_segments.clear()
+        self._page_table = None
+
+    def _get_event_index(self) -> EventIndex:
+        if self._event_index is None:
+            self._event_index = self._load_event_index()
+        # Events added since the last query, e.g. by another store.
+        self._catch_up_event_index(self._event_index)
+        return self._event_index
+
+    def _load_event_index(self) -> EventIndex:
+        """Loads the index from its persisted segments."""
+        cur_id = self.cur_id
+        event_index = EventIndex()
+        for start in range(0, cur_id - EVENT_INDEX_SEGMENT_SIZE + 1, EVENT_INDEX_SEGMENT_SIZE):
+            filename = self._get_filename_for_event_index_segment(start)
+            try:
+                segment = EventIndex.from_json(self.file_store.read(filename))
+            except FileNotFoundError:
+                break
+            except (ValueError, TypeError, KeyError):
+                logger.warning(f'Invalid event index segment {filename}')
+                break
+            event_index.merge(segment)
+        return event_index
+
+    def _catch_up_event_index(self, event_index: EventIndex) -> None:
+        """Indexes the events from `event_index.next_id` up to `cur_id`.
+
+        Full segments that are missing, e.g. because no index was loaded
+        while their events were added, are persisted as they are rebuilt.
+        """
+        cur_id = self.cur_id
+        if event_index.next_id >= cur_id:
+            return
+        for id, data in self._iter_event_dicts(event_index.next_id, cur_id):
+            event_index.add(id, data)
+            if (id + 1) % EVENT_INDEX_SEGMENT_SIZE == 0:
+                self.file_store.write(*self._get_event_index_segment_write(event_index, id + 1))
+        # Missing events are not looked for again.
+        event_index.next_id = cur_id
+
+    def _get_event_index_segment_write(
+        self, event_index: EventIndex, end: int
+    ) -> tuple[str, str]:
+        start = end - EVENT_INDEX_SEGMENT_SIZE
+        segment = event_index.slice(start, end)
+        return self._get_filename_for_event_index_segment(start), segment.to_json()
+
+    def _get_filename_for_event_index_segment(self, start: int) -> str:
+        end = start + EVENT_INDEX_SEGMENT_SIZE
+        return f'{get_conversation_event_index_dir(self.sid, self.user_id)}{start}-{end}.json'
+
+    def _get_text_segment(self, start: int) -> TextIndexSegment:
+        end = start + TEXT_INDEX_SEGMENT_SIZE
+        filename = self._get_filename_for_text_segment(start, end)
+        segment = self._text_segments.get(start)
+        if segment is None:
+            try:
+                segment = TextIndexSegment.from_json(self.file_store.read(filename))
+            except FileNotFoundError:
+                # Not indexed while the events were added: build it from the
+                # events, and persist it once all of its events exist.
+                segment = TextIndexSegment(start, end)
+            self._text_segments[start] = segment
+        # A cached tail segment only indexes the events added since.
+        end_id = min(end, self.cur_id)
+        if segment.next_id < end_id:
+            for id, data in self._iter_event_dicts(segment.next_id, end_id):
+                # Indexed with the text of offloaded fields, like the stream
+                # does before offloading them.
+                resolve_blob_refs(data, self._get_blob_store())
+                segment.add(id, data)
+            segment.next_id = end_id
+            if end_id == end:
+                self.file_store.write(filename, segment.to_json())
+        return segment
+
+    def _get_filename_for_text_segment(self, start: int, end: int) -> str:
+        return f'{get_conversation_text_index_dir(self.sid, self.user_id)}{start}-{end}.json'
+
+    def _iter_event_dicts(self, start_id: int, end_id: int) -> Iterable[tuple[int, dict]]:
+        """Yields the raw dicts of events in [start_id, end_id), page by page."""
+        cache_page = _DUMMY_PAGE
+        refreshed = False
+        for index in range(start_id, end_id):
+            if not cache_page.covers(index):
+                cache_page = self._load_cache_page_for_index(index)
+            if cache_page.events:
+                yield index, cache_page.get_data(index)
+                continue
+            try:
+                content = self.file_store.read(self._get_filename_for_id(index, self.user_id))
+            except FileNotFoundError:
+                cache_page = self._load_cache_page_for_index(
+                    index, refresh=not refreshed
+                )
+                refreshed = True
+                if cache_page.events:
+                    yield index, cache_page.get_data(index)
+                continue
+            yield index, json.loads(content)
+
+    def _load_cur_id(self) -> int:
+        manifest_id = self._read_manifest()
+        if manifest_id is not None:
+            self._manifest_id = manifest_id
+            cur_id = self._probe_cur_id(manifest_id)
+            if cur_id is not None:
+                return cur_id
+            logger.debug(f'Stale events manifest for session {self.sid}: {manifest_id}')
+            self._manifest_id = 0
+        cur_id = self._calculate_cur_id()
+        self._write_manifest(cur_id)
+        return cur_id
 
     def _calculate_cur_id(self) -> int:
+        # Events up to the last page exist in pages, so only the event files
+        # after it are listed.
+        page_table = self._get_page_table(refresh=True)
+        cur_id = page_table[-1][1] if page_table else 0
         events = []
         try:
             events_dir = get_conversation_events_dir(self.sid, self.user_id)
-            events = self.file_store.list(events_dir)
+            events = self.file_store.list(events_dir, min_id=cur_id)
         except FileNotFoundError:
             logger.debug(f'No events found for session {self.sid} at {events_dir}')
 
-        if not events:
-            return 0
-
-        max_id = -1
         for event_str in events:
-            id = self._get_id_from_filename(event_str)
-            if id >= max_id:
-                max_id = id
-        return max_id + 1
+            cur_id = max(cur_id, self._get_id_from_filename(event_str) + 1)
+        return cur_id
+
+    def _read_manifest(self) -> int | None:
+        filename = get_conversation_events_manifest_filename(self.sid, self.user_id)
+        try:
+            manifest = json.loads(self.file_store.read(filename))
+            return int(manifest['cur_id'])
+        except FileNotFoundError:
+            return None
+        except (ValueError, TypeError, KeyError):
+            logger.warning(f'Invalid events manifest for session {self.sid}')
+            return None
+
+    def _probe_cur_id(self, manifest_id: int) -> int | None:
+        """Returns cur_id found from the manifest, or None if it is stale.
 
+        The manifest is trusted if the last event it covers exists. The events
+        added since it was written, at most EVENTS_MANIFEST_INTERVAL, are
+        found by probing the ids after it one by one.
+        """
+        if manifest_id > 0 and not self._event_exists(manifest_id - 1):
+            return None
+        cur_id = manifest_id
+        while self._event_exists(cur_id):
+            cur_id += 1
+            if cur_id - manifest_id > EVENTS_MANIFEST_INTERVAL:
+                return None
+        self._write_manifest(cur_id)
+        return cur_id
+
+    def _event_exists(self, id: int) -> bool:
+        if self.file_store.exists(self._get_filename_for_id(id, self.user_id)):
+            return True
+        # Its file may have been compacted into a page.
+        return bool(self._load_cache_page_for_index(id).events)
+
+    def _write_manifest(self, cur_id: int) -> None:
+        manifest_write = self._get_manifest_write(cur_id)
+        if manifest_write is not None:
+            self.file_store.write(*manifest_write)
+
+    def _get_manifest_write(self, cur_id: int) -> tuple[str, str] | None:
+        """Returns the write that records `cur_id`, unless a newer one was made."""
+        if cur_id <= self._manifest_id:
+            return None
+        self._manifest_id = cur_id
+        filename = get_conversation_events_manifest_filename(self.sid, self.user_id)
+        return filename, json.dumps({'cur_id': cur_id})
+
+    def _get_filename_for_id(self, id: int, user_id: str | None) -> str:
+        return get_conversation_event_filename(self.sid, id, user_id)
+
+    def _get_filename_for_cache(self, start: int, end: int) -> str:
+        return f'{get_conversion_dir(self.sid, self.user_id)}event_cache/{start}-{end}.json'
+
+    @staticmethod
+    def _get_id_from_filename(filename: str) -> int:
+        try:
+            return int(filename.split('/')[-1].split('.')[0])
+        except ValueError:
+            logger.warning(f'get id from filename ({filename}) failed.')
+            return -1
@@ -0,0 +1,76 @@
+import re
+from typing import Any, Iterable
+
+SECRET_PLACEHOLDER = '<secret_hidden>'
+
+
+class SecretMasker:
+    """Replaces every occurrence of a set of secrets in a single pass.
+
+    All secrets are compiled into one alternation, longest first so that a
+    secret containing another one is hidden as a whole. The pattern is only
+    rebuilt when the set of secrets actually changes. A lone secret skips the
+    regex engine, since `str.replace` searches for a single needle faster.
+    """
+
+    _secrets: frozenset[str]
+    _pattern: re.Pattern[str] | None
+    _single_secret: str | None
+
+    def __init__(self, secrets: Iterable[str] = ()):
+        self._secrets = frozenset()
+        self._pattern = None
+        self._single_secret = None
+        self.set_secrets(secrets)
+
+    def set_secrets(self, secrets: Iterable[str]) -> None:
+        new_secrets = frozenset(secret for secret in secrets if secret)
+        if new_secrets == self._secrets:
+            return
+        self._secrets = new_secrets
+        self._single_secret = None
+        if not new_secrets:
+            self._pattern = None
+            return
+        if len(new_secrets) == 1:
+            (self._single_secret,) = new_secrets
+        ordered = sorted(new_secrets, key=lambda secret: (-len(secret), secret))
+        self._pattern = re.compile('|'.join(re.escape(secret) for secret in ordered))
+
+    @property
+    def has_secrets(self) -> bool:
+        return self._pattern is not None
+
+    def contains_secret(self, value: Any) -> bool:
+        if self._pattern is None:
+            return False
+        if isinstance(value, str):
+            if self._single_secret is not None:
+                return self._single_secret in value
+            return self._pattern.search(value) is not None
+        if isinstance(value, dict):
+            return any(self.contains_secret(item) for item in value.values())
+        if isinstance(value, list):
+            return any(self.contains_secret(item) for item in value)
+        return False
+
+    def mask_text(self, text: str) -> str:
+        if self._pattern is None:
+            return text
+        if self._single_secret is not None:
+            return text.replace(self._single_secret, SECRET_PLACEHOLDER)
+        return self._pattern.sub(SECRET_PLACEHOLDER, text)
+
+    def mask(self, value: Any) -> Any:
+        """Mask strings inside `value`, updating nested dicts and lists in place."""
+        if self._pattern is None:
+            return value
+        if isinstance(value, str):
+            return self.mask_text(value)
+        if isinstance(value, dict):
+            for key, item in value.items():
+                value[key] = self.mask(item)
+        elif isinstance(value, list):
+            for i, item in enumerate(value):
+                value[i] = self.mask(item)
+        return value
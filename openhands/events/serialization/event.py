@@ -1,6 +1,9 @@
-from dataclasses import asdict
+import copy
+from dataclasses import fields, is_dataclass
 from datetime import datetime
 from enum import Enum
+from functools import cache
+from typing import Any
 from webbrowser import get
 
 from pydantic import BaseModel
@@ -19,6 +22,9 @@ TOP_KEYS = [
     'llm_metrics',
 ]
 
+# Values of these types are immutable, so they can be shared instead of copied.
+_ATOMIC_TYPES = frozenset({type(None), bool, int, float, complex, str, bytes})
+
 UNDERSCORE_KEYS = [
     'id',
     'timestamp',
@@ -70,8 +76,35 @@ def event_from_dict(data: dict[str, Any]) -> 'Event':
 
 
 
+@cache
+def _get_field_plan(cls: type) -> tuple[str, ...]:
+    return tuple(f.name for f in fields(cls) if f.name not in TOP_KEYS)
+
+
+def _copy_value(value: Any) -> Any:
+    # Same result as dataclasses.asdict for a single value, without deep
+    # copying the atomic values that make up almost every event field.
+    if type(value) in _ATOMIC_TYPES or isinstance(value, Enum):
+        return value
+    if is_dataclass(value) and not isinstance(value, type):
+        return {f.name: _copy_value(getattr(value, f.name)) for f in fields(value)}
+    if isinstance(value, tuple) and hasattr(value, '_fields'):
+        return type(value)(*[_copy_value(v) for v in value])
+    if isinstance(value, (list, tuple)):
+        return type(value)(_copy_value(v) for v in value)
+    if isinstance(value, dict):
+        return type(value)(
+            (_copy_value(k), _copy_value(v)) for k, v in value.items()
+        )
+    return copy.deepcopy(value)
+
+
+def _fields_to_dict(event: 'Event') -> dict[str, Any]:
+    return {name: _copy_value(getattr(event, name)) for name in _get_field_plan(type(event))}
+
+
 def event_to_dict(event: 'Event') -> dict: # LOOK: Event的attr键是怎么从属性转过来的？recall_type
-    props = asdict(event)
+    props = _fields_to_dict(event)
 
     d = {}
     for key in TOP_KEYS:
@@ -92,7 +125,6 @@ def event_to_dict(event: 'Event') -> dict: # LOOK: Event的attr键是怎么从
             d['tool_call_metadata'] = d['tool_call_metadata'].model_dump() # LOOK: model_dump什么时候能用？
         if key == 'llm_metrics' and 'llm_metrics' in d:
             d['llm_metrics'] = d['llm_metrics'].get()
-        props.pop(key, None)
 
     if 'security_risk' in props and props['security_risk'] is None:
         props.pop('security_risk')
@@ -1,18 +1,59 @@
-import asyncio
 import threading
 import queue
-from typing import Any, Callable
+from collections import deque
+from contextlib import contextmanager
+from typing import Any, Callable, Iterable, Iterator
 import json
 from datetime import datetime
-from functools import partial
-from concurrent.futures import ThreadPoolExecutor
 
-from openhands.storage.locations import get_conversation_events_dir
+from openhands.core.logger import openhands_logger as logger
+from openhands.storage.locations import (
+    get_conversation_blobs_dir,
+    get_conversation_events_dir,
+)
+from openhands.storage.compression import DEFAULT_COMPRESSION_THRESHOLD, compress_text
 from openhands.storage.files import FileStore
-from openhands.events.event_store import EventStore
+from openhands.storage.write_behind import WriteBehindFileStore
+from openhands.events.dispatcher import (
+    CallbackQueue,
+    EventDispatcher,
+    get_event_dispatcher,
+)
+from openhands.events.blob_store import BlobStore, offload_large_fields
+from openhands.events.event import Event, EventSource
+from openhands.events.event_index import EVENT_INDEX_SEGMENT_SIZE, EventIndex
+from openhands.events.event_store import EVENTS_MANIFEST_INTERVAL, EventStore
+from openhands.events.secret_masker import SecretMasker
+from openhands.events.serialization.event import event_from_dict, event_to_dict
+from openhands.events.text_index import (
+    TEXT_INDEX_SEGMENT_SIZE,
+    TextIndexSegment,
+    get_event_tokens,
+)
+from openhands.utils.shutdown_listener import (
+    add_shutdown_listener,
+    remove_shutdown_listener,
+    should_continue,
+)
 from enum import Enum
 
 
+TOP_LEVEL_PROTECTED_FIELDS = {
+    'timestamp',
+    'id',
+    'source',
+    'cause',
+    'action',
+    'observation',
+    'message',
+}
+
+# Put on the queue to wake the queue thread up when the stream shuts down.
+_STOP_QUEUE = object()
+# Upper bound on the events handed to the callback queues in one go.
+_MAX_EVENTS_PER_DRAIN = 100
+
+
 class EventStreamSubscriber(str, Enum):
     AGENT_CONTROLLER = 'agent_controller'
     RESOLVER = 'openhands_resolver'
@@ -24,39 +65,84 @@ class EventStreamSubscriber(str, Enum):
 
 class EventStream(EventStore):
     secrets: dict[str, str] # LOOK: 有啥
+    _secret_masker: SecretMasker
     _subscribers: dict[str, dict[str, Callable]]
     _lock: threading.Lock # LOOK: 线程锁？
-    _queue: queue.Queue[Event]
+    _state_changed: threading.Condition
+    _uncommitted: deque[int]
+    _unwritten: int
+    _queue: queue.SimpleQueue[Event]
     _queue_thread: threading.Thread
-    _queue_loop: asyncio.AbstractEventLoop | None
-    _thread_pools: dict[str, dict[str, ThreadPoolExecutor]]
-    _thread_loops: dict[str, dict[str, asyncio.AbstractEventLoop]]
-    _write_page_cache: list[dict]
-
-    def __init__(self, sid: str, file_store: FileStore, user_id: str | None = None):
+    _dispatcher: EventDispatcher
+    _callback_queues: dict[str, dict[str, CallbackQueue]]
+    _delivery_order: tuple[CallbackQueue, ...]
+    _write_page_cache: list[str]
+    _write_behind: WriteBehindFileStore | None
+    _text_index_enabled: bool
+    _text_segment: TextIndexSegment | None
+    compression: str | None
+    compression_threshold: int
+    blob_threshold: int | None
+    compaction_page_size: int | None
+    _compaction_thread: threading.Thread | None
+
+    def __init__(
+        self,
+        sid: str,
+        file_store: FileStore,
+        user_id: str | None = None,
+        write_behind: bool = False,
+        max_pending_writes: int = 1000,
+        dispatcher: EventDispatcher | None = None,
+        text_index: bool = False,
+        compression: str | None = None,
+        compression_threshold: int = DEFAULT_COMPRESSION_THRESHOLD,
+        blob_threshold: int | None = None,
+        compaction_page_size: int | None = None,
+    ):
         super().__init__(sid, file_store, user_id)
-        self._stop_flag = threading.Event()
-        self._queue: queue.Queue[Event] = queue.Queue()
-        self._thread_pools = {} # LOOK
-        self._thread_loops = {} # LOOK
-        self._queue_loop = None
-        self._queue_thread = threading.Thread(target=self._run_queue_loop)
-        self._queue_thread.daemon = True
-        self._queue_thread.start()
+        self._write_behind = None
+        if write_behind:
+            self._write_behind = WriteBehindFileStore(
+                file_store, max_pending_writes=max_pending_writes
+            )
+            self.file_store = self._write_behind
+        # SimpleQueue.put is reentrant, so the stop marker can be put from a
+        # signal handler that interrupted another put.
+        self._queue: queue.SimpleQueue[Event] = queue.SimpleQueue()
+        self._dispatcher = dispatcher or get_event_dispatcher()
+        self._callback_queues = {}
+        self._delivery_order = ()
         self._subscribers = {}
+        self._subscribers_lock = threading.Lock()
         self._lock = threading.Lock()
+        self._state_changed = threading.Condition(self._lock)
+        # Ids of the events being added, and how many are not written yet.
+        self._uncommitted = deque()
+        self._unwritten = 0
+        self._shutdown_listener_id = add_shutdown_listener(self._stop_queue)
+        self._queue_thread = threading.Thread(target=self._process_queue)
+        self._queue_thread.daemon = True
+        self._queue_thread.start()
         self.secrets = {}
+        self._secret_masker = SecretMasker()
         self._write_page_cache = []
-
-    def _init_thread_loop(self, subscriber_id: str, callback_id: str) -> None:
-        loop = asyncio.new_event_loop()
-        asyncio.set_event_loop(loop)
-        if subscriber_id not in self._thread_loops:
-            self._thread_loops[subscriber_id] = {}
-        self._thread_loops[subscriber_id][callback_id] = loop
+        self._text_index_enabled = text_index
+        self._text_segment = None
+        self.compression = compression
+        self.compression_threshold = compression_threshold
+        self.blob_threshold = blob_threshold
+        self.compaction_page_size = compaction_page_size
+        self._compaction_thread = None
+        self._blob_store = BlobStore(
+            self.file_store,
+            get_conversation_blobs_dir(self.sid, self.user_id),
+            compression,
+        )
 
     def close(self) -> None:
-        self._stop_flag.set()
+        remove_shutdown_listener(self._shutdown_listener_id)
+        self._stop_queue()
         if self._queue_thread.is_alive():
             self._queue_thread.join()
 
@@ -67,7 +153,22 @@ class EventStream(EventStore):
                 self._clean_up_subscriber(subscriber_id, callback_id)
 
         while not self._queue.empty():
-            self._queue.get()        
+            self._queue.get()
+
+        with self._lock:
+            self._state_changed.wait_for(lambda: self._unwritten == 0)
+            cur_id = self.cur_id
+        self._write_manifest(cur_id)
+
+        if self._compaction_thread is not None:
+            self._compaction_thread.join()
+        if self._write_behind is not None:
+            self._write_behind.close()
+
+    def flush(self) -> None:
+        """Waits until every added event has been written to the file store."""
+        if self._write_behind is not None:
+            self._write_behind.flush()
 
     def _clean_up_subscriber(self, subscriber_id: str, callback_id: str) -> None:
         if subscriber_id not in self._subscribers:
@@ -76,35 +177,12 @@ class EventStream(EventStore):
         if callback_id not in self._subscribers[subscriber_id]:
             logger.warning(f'Callback not found during cleanup: {callback_id}')
             return
-        if (
-            subscriber_id in self._thread_loops
-            and callback_id in self._thread_loops[subscriber_id]
-        ):
-            loop = self._thread_loops[subscriber_id][callback_id]   
-            current_task = asyncio.current_task(loop)
-            pending = [
-                task for task in asyncio.all_tasks(loop) if task is not current_task
-            ]     
-            for task in pending:
-                task.cancel()
-            try:
-                loop.stop()
-                loop.close()
-            except Exception as e:
-                logger.warning(
-                    f'Error closing loop for {subscriber_id}/{callback_id}: {e}'
-                )
-            del self._thread_loops[subscriber_id][callback_id]
-
-            if (
-                subscriber_id in self._thread_pools
-                and callback_id in self._thread_pools[subscriber_id]
-            ):
-                pool = self._thread_pools[subscriber_id][callback_id]
-                pool.shutdown()
-                del self._thread_pools[subscriber_id][callback_id]
-
-            del self._subscribers[subscriber_id][callback_id]    
+        with self._subscribers_lock:
+            callback_queue = self._callback_queues[subscriber_id].pop(callback_id)
+            del self._subscribers[subscriber_id][callback_id]
+            self._update_delivery_order()
+        # Outside the lock, since the callback may subscribe while it drains.
+        callback_queue.close()
 
     def subscribe(
         self,
@@ -112,19 +190,61 @@ class EventStream(EventStore):
         callback: Callable[[Event], None],
         callback_id: str,
     ) -> None:
-        initializer = partial(self._init_thread_loop, subscriber_id, callback_id)
-        pool = ThreadPoolExecutor(max_workers=1, initializer=initializer)
-        if subscriber_id not in self._subscribers:
-            self._subscribers[subscriber_id] = {}
-            self._thread_pools[subscriber_id] = {}
+        callback_queue = self._dispatcher.register(
+            callback, self._make_error_handler(callback_id, subscriber_id)
+        )
+        self._add_subscriber(subscriber_id, callback_id, callback, callback_queue)
 
-        if callback_id in self._subscribers[subscriber_id]:
-            raise ValueError(
-                f'Callback ID on subscriber {subscriber_id} already exists: {callback_id}'
-            )
+    def subscribe_batch(
+        self,
+        subscriber_id: EventStreamSubscriber,
+        callback: Callable[[list[Event]], None],
+        callback_id: str,
+        max_batch_size: int = 100,
+        max_linger: float = 0.0,
+    ) -> None:
+        """Subscribes a callback that receives events in lists.
+
+        Events that are queued together are delivered in one call of at most
+        `max_batch_size` events. With `max_linger` > 0, the first event of a
+        batch waits up to that many seconds for more events to arrive.
+        """
+        callback_queue = self._dispatcher.register_batch(
+            callback,
+            self._make_error_handler(callback_id, subscriber_id),
+            max_batch_size,
+            max_linger,
+        )
+        self._add_subscriber(subscriber_id, callback_id, callback, callback_queue)
+
+    def _add_subscriber(
+        self,
+        subscriber_id: EventStreamSubscriber,
+        callback_id: str,
+        callback: Callable,
+        callback_queue: CallbackQueue,
+    ) -> None:
+        with self._subscribers_lock:
+            if subscriber_id not in self._subscribers:
+                self._subscribers[subscriber_id] = {}
+                self._callback_queues[subscriber_id] = {}
+
+            if callback_id in self._subscribers[subscriber_id]:
+                raise ValueError(
+                    f'Callback ID on subscriber {subscriber_id} already exists: {callback_id}'
+                )
 
-        self._subscribers[subscriber_id][callback_id] = callback
-        self._thread_pools[subscriber_id][callback_id] = pool    
+            self._subscribers[subscriber_id][callback_id] = callback
+            self._callback_queues[subscriber_id][callback_id] = callback_queue
+            self._update_delivery_order()
+
+    def _update_delivery_order(self) -> None:
+        # Rebuilt on (un)subscribe so the queue thread never sorts per event.
+        self._delivery_order = tuple(
+            callback_queue
+            for subscriber_id in sorted(self._callback_queues)
+            for callback_queue in self._callback_queues[subscriber_id].values()
+        )
 
     def unsubscribe(
         self, subscriber_id: EventStreamSubscriber, callback_id: str
@@ -149,113 +269,280 @@ class EventStream(EventStore):
         with self._lock:
             event._id = self.cur_id
             self.cur_id += 1
+            self._uncommitted.append(event.id)
+            self._unwritten += 1
+        try:
+            event = self._write_event(event)
+        finally:
+            with self._lock:
+                self._unwritten -= 1
+                self._state_changed.notify_all()
+        self._queue.put(event)
 
-            current_write_page = self._write_page_cache
+    def _write_event(self, event: Event) -> Event:
+        """Serializes and writes an event whose id was just assigned.
 
+        Serializing, offloading and compressing run outside the lock, while
+        other events are added. Only the page, manifest and index state is
+        updated under it, in id order.
+        """
+        try:
             data = event_to_dict(event)
-            data = self._replace_secrets(data)
-            event = event_from_dict(data) # LOOK: 少了些东西？
-            current_write_page.append(data)
-
-            if len(current_write_page) >= self.cache_size:
-                self._write_page_cache = []
-
-        if event.id is not None:
-            event_json = json.dumps(event)
-            filename = self._get_filename_for_id(event.id, self.user_id)
-            if len(event_json) > 1_000_000:
-                logger.warning(
-                    f'Saving event JSON over 1MB: {len(event_json):,} bytes, filename: {filename}',
-                    extra={
-                        'user_id': self.user_id,
-                        'session_id': self.sid,
-                        'size': len(event_json),
-                    },
+            event = self._redact_event(event, data)
+            # Tokenized before offloading, so offloaded text is searchable.
+            tokens = get_event_tokens(data) if self._text_index_enabled else None
+            # Oversized fields are written once as blobs instead of being
+            # embedded in both the event file and its cache page.
+            offloaded_size = 0
+            if self.blob_threshold is not None:
+                offloaded_size = offload_large_fields(
+                    data, self._blob_store, self.blob_threshold
                 )
-            self.file_store.write(filename, event_json)
+            # Encoded once and shared by the event file and its cache page.
+            event_json = json.dumps(data)
+            stored_json = event_json
+            if self.compression is not None:
+                stored_json = compress_text(
+                    event_json, self.compression, self.compression_threshold
+                )
+        except BaseException:
+            # Later events must not wait for this one.
+            with self._commit_turn(event.id):
+                pass
+            raise
+        with self._commit_turn(event.id):
+            writes, page_to_store = self._commit_event(
+                event.id, data, tokens, stored_json
+            )
+        if page_to_store is not None:
+            start = event.id + 1 - self.cache_size
+            writes.append(self._get_cache_page_write(start, page_to_store))
+
+        filename = writes[0][0]
+        if len(event_json) > 1_000_000:
+            logger.warning(
+                f'Saving event JSON over 1MB: {len(event_json):,} bytes '
+                f'({len(stored_json):,} stored), filename: {filename}',
+                extra={
+                    'user_id': self.user_id,
+                    'session_id': self.sid,
+                    'size': len(event_json),
+                    'stored_size': len(stored_json),
+                },
+            )
+        # The event and everything it completes are written as one commit.
+        self.file_store.write_many(writes)
+        self._cache_event(event.id, event, len(event_json) + offloaded_size)
+        if (
+            self.compaction_page_size is not None
+            and (event.id + 1) % self.compaction_page_size == 0
+        ):
+            self._start_compaction()
+        return event
 
-            self._store_cache_page(current_write_page)   
+    @contextmanager
+    def _commit_turn(self, id: int) -> Iterator[None]:
+        """Holds the lock once every event added before `id` is committed."""
+        with self._lock:
+            self._state_changed.wait_for(lambda: self._uncommitted[0] == id)
+            try:
+                yield
+            finally:
+                self._uncommitted.popleft()
+                self._state_changed.notify_all()
 
-        self._queue.put(event)
+    def _commit_event(
+        self,
+        id: int,
+        data: dict[str, Any],
+        tokens: Iterable[str] | None,
+        stored_json: str,
+    ) -> tuple[list[tuple[str, str]], list[str] | None]:
+        """Adds an event to the page, manifest and index state.
+
+        Returns the writes of the event and of the manifest and index segments
+        it completes, and the cache page it completes, if any.
+        """
+        writes = [(self._get_filename_for_id(id, self.user_id), stored_json)]
+        if (id + 1) % EVENTS_MANIFEST_INTERVAL == 0:
+            # Readers probe for the few events added since.
+            manifest_write = self._get_manifest_write(id + 1)
+            if manifest_write is not None:
+                writes.append(manifest_write)
+
+        # Pages are aligned to multiples of cache_size so readers can find
+        # the page for any id. A page that started before this stream was
+        # opened is incomplete and is not written.
+        page_to_store = None
+        self._write_page_cache.append(stored_json)
+        if (id + 1) % self.cache_size == 0:
+            if len(self._write_page_cache) == self.cache_size:
+                page_to_store = self._write_page_cache
+            self._write_page_cache = []
+
+        # The event index is only kept current once a query loaded it;
+        # until then, loading it catches up on the events added since.
+        if self._event_index is not None:
+            self._event_index.add(id, data)
+            if (id + 1) % EVENT_INDEX_SEGMENT_SIZE == 0:
+                writes.append(
+                    self._get_event_index_segment_write(self._event_index, id + 1)
+                )
+        if tokens is not None:
+            text_segment_to_store = self._add_to_text_index(id, tokens)
+            if text_segment_to_store is not None:
+                writes.append(self._get_text_segment_write(text_segment_to_store))
+        return writes, page_to_store
+
+    def _get_event_index(self) -> EventIndex:
+        # Under the lock, so no event is committed while it catches up. The
+        # events being written must reach the file store first, since those
+        # committed before the index was loaded are only found there.
+        with self._lock:
+            self._state_changed.wait_for(lambda: self._unwritten == 0)
+            return super()._get_event_index()
+
+    def _start_compaction(self) -> None:
+        """Compacts the stored events on a background thread.
+
+        Only one compaction runs at a time. Ranges that complete while it runs
+        are picked up by the next one, since each compacts everything so far.
+        """
+        with self._lock:
+            thread = self._compaction_thread
+            if thread is not None and thread.is_alive():
+                return
+            self._compaction_thread = threading.Thread(
+                target=self._run_compaction, daemon=True
+            )
+            self._compaction_thread.start()
 
-    def _store_cache_page(self, current_write_page: list[dict]):
-        if len(current_write_page) < self.cache_size:
+    def _run_compaction(self) -> None:
+        try:
+            removed = self.compact(self.compaction_page_size)
+        except Exception as e:
+            logger.error(f'Failed to compact events of session {self.sid}: {e}')
             return
-        start = current_write_page[0]["id"]
+        logger.debug(f'Compacted {removed} event files of session {self.sid}')
+
+    def _get_cache_page_write(
+        self, start: int, current_write_page: list[str]
+    ) -> tuple[str, str]:
         end = start + self.cache_size
-        contents = json.dumps(current_write_page)
-        cache_filename = self._get_filename_for_cache(start, end)
-        self.file_store.write(cache_filename, contents)           
+        # Same output as json.dumps on the list of event dicts.
+        contents = '[' + ', '.join(current_write_page) + ']'
+        return self._get_filename_for_cache(start, end), contents
+
+    def _add_to_text_index(
+        self, id: int, tokens: Iterable[str]
+    ) -> TextIndexSegment | None:
+        """Indexes the event and returns its segment once the segment is full.
+
+        Like cache pages, a segment that started before this stream was opened
+        is skipped; readers build it from the events when they need it.
+        """
+        segment = self._text_segment
+        if segment is None or not segment.covers(id):
+            if id % TEXT_INDEX_SEGMENT_SIZE != 0:
+                return None
+            segment = TextIndexSegment(id, id + TEXT_INDEX_SEGMENT_SIZE)
+            self._text_segment = segment
+        segment.add_tokens(id, tokens)
+        if id + 1 == segment.end:
+            self._text_segment = None
+            return segment
+        return None
+
+    def _get_text_segment(self, start: int) -> TextIndexSegment:
+        # The segment being filled by add_event is already current.
+        segment = self._text_segment
+        if segment is not None and segment.start == start:
+            return segment
+        return super()._get_text_segment(start)
+
+    def _get_text_segment_write(self, segment: TextIndexSegment) -> tuple[str, str]:
+        self._text_segments[segment.start] = segment
+        filename = self._get_filename_for_text_segment(segment.start, segment.end)
+        return filename, segment.to_json()
 
     def set_secrets(self, secrets: dict[str, str]) -> None:
         self.secrets = secrets.copy()
+        self._secret_masker.set_secrets(self.secrets.values())
 
     def update_secrets(self, secrets: dict[str, str]) -> None:
-        self.secrets.update(secrets)    
-
-    def _replace_secrets(
-        self, data: dict[str, Any], is_top_level: bool = True
-    ) -> dict[str, Any]:
-        TOP_LEVEL_PROTECTED_FIELDS = {
-            'timestamp',
-            'id',
-            'source',
-            'cause',
-            'action',
-            'observation',
-            'message',
-        }
+        self.secrets.update(secrets)
+        self._secret_masker.set_secrets(self.secrets.values())
 
-        for key in data:
-            if is_top_level and key in TOP_LEVEL_PROTECTED_FIELDS:
-                continue
-            elif isinstance(data[key], dict):
-                data[key] = self._replace_secrets(data[key], is_top_level=False)
-            elif isinstance(data[key], str):
-                for secret in self.secrets.values():
-                    data[key] = data[key].replace(secret, '<secret_hidden>')
+    def _redact_event(self, event: Event, data: dict[str, Any]) -> Event:
+        """Masks secrets in `data` in place and applies the same masking to `event`.
 
-        return data
-
-
-    def _run_queue_loop(self) -> None:
-        self._queue_loop = asyncio.new_event_loop()
-        asyncio.set_event_loop(self._queue_loop)
-        try:
-            self._queue_loop.run_until_complete(self._process_queue())
-        finally:
-            self._queue_loop.close()
+        String fields are updated on the event directly. Only when a secret is
+        found inside a nested value is the event rebuilt from the masked dict.
+        """
+        masker = self._secret_masker
+        if not masker.has_secrets:
+            return event
 
-    async def _process_queue(self) -> None:
-        while should_continue() and not self._stop_flag.is_set():
-            event = None
-            try:
-                event = self._queue.get(timeout=0.1)
-            except queue.Empty:
+        needs_rebuild = False
+        for key in data:
+            if key in TOP_LEVEL_PROTECTED_FIELDS:
                 continue
-
-            for key in sorted(self._subscribers.keys()):
-                callbacks = self._subscribers[key]
-                callback_ids = list(callbacks.keys())
-                for callback_id in callback_ids:
-                    if callback_id in callbacks:
-                        callback = callbacks[callback_id]
-                        pool = self._thread_pools[key][callback_id] # LOOK
-                        future = pool.submit(callback, event)
-                        future.add_done_callback(
-                            self._make_error_handler(callback_id, key)
-                        )
-                    
-
-    def _make_error_handler(self, callback_id: str, subscriber_id: str) -> Callable[[Any], None]:
-        def _handle_callback_error(fut: Any) -> None:
-            try:
-                fut.result()
-            except Exception as e:
-                logger.error(
-                    f'Error in event callback {callback_id} for subscriber {subscriber_id}: {str(e)}',
-                )
-                raise e
+            value = data[key]
+            if key in ('args', 'extras'):
+                for name, field_value in value.items():
+                    if not masker.contains_secret(field_value):
+                        continue
+                    value[name] = masker.mask(field_value)
+                    if isinstance(field_value, str):
+                        setattr(event, name, value[name])
+                    else:
+                        needs_rebuild = True
+            elif masker.contains_secret(value):
+                data[key] = masker.mask(value)
+                if key == 'content':
+                    event.content = data[key]
+                else:
+                    needs_rebuild = True
+
+        if needs_rebuild:
+            return event_from_dict(data)
+        return event
+
+
+    def _stop_queue(self) -> None:
+        # Called from signal handlers, so it must not take any lock.
+        self._queue.put(_STOP_QUEUE)
+
+    def _process_queue(self) -> None:
+        # Blocks until an event or the stop marker arrives, so an idle stream
+        # uses no CPU. Shutdown signals reach us through the shutdown listener,
+        # which cannot fire for a shutdown that happened before we started.
+        if not should_continue():
+            return
+        while True:
+            events = [self._queue.get()]
+            while len(events) < _MAX_EVENTS_PER_DRAIN:
+                try:
+                    events.append(self._queue.get_nowait())
+                except queue.Empty:
+                    break
+            stop_at = next(
+                (i for i, e in enumerate(events) if e is _STOP_QUEUE), None
+            )
+            if stop_at is not None:
+                # Events added before the stop marker are still delivered.
+                events = events[:stop_at]
+            if events:
+                for callback_queue in self._delivery_order:
+                    callback_queue.put_many(events)
+            if stop_at is not None:
+                return
+
+    def _make_error_handler(self, callback_id: str, subscriber_id: str) -> Callable[[Exception], None]:
+        def _handle_callback_error(e: Exception) -> None:
+            logger.error(
+                f'Error in event callback {callback_id} for subscriber {subscriber_id}: {str(e)}',
+            )
 
         return _handle_callback_error
 
@@ -0,0 +1,146 @@
+import base64
+import json
+import re
+from typing import Any, Iterable
+
+# Number of events per segment. A multiple of the event cache page size, so a
+# segment can be built from whole pages.
+TEXT_INDEX_SEGMENT_SIZE = 250
+# Longer tokens are mostly hashes and encoded blobs, which nobody searches for.
+MAX_TOKEN_LENGTH = 64
+
+_TOKEN_RE = re.compile(r'\w+')
+_TEXT_FIELDS = ('content', 'message')
+_NESTED_TEXT_FIELDS = ('args', 'extras')
+
+
+def tokenize(text: str) -> set[str]:
+    return {
+        token
+        for token in _TOKEN_RE.findall(text.lower())
+        if len(token) <= MAX_TOKEN_LENGTH
+    }
+
+
+def get_event_text(data: dict[str, Any]) -> Iterable[str]:
+    """Yields the searchable strings of an event dict from `event_to_dict`."""
+    for key in _TEXT_FIELDS:
+        value = data.get(key)
+        if isinstance(value, str):
+            yield value
+    for key in _NESTED_TEXT_FIELDS:
+        values = data.get(key)
+        if isinstance(values, dict):
+            for value in values.values():
+                if isinstance(value, str):
+                    yield value
+
+
+def get_event_tokens(data: dict[str, Any]) -> set[str]:
+    tokens: set[str] = set()
+    for text in get_event_text(data):
+        tokens |= tokenize(text)
+    return tokens
+
+
+def encode_ids(ids: Iterable[int], base: int = 0) -> bytes:
+    """Encodes sorted ids as varint deltas, starting from `base`."""
+    out = bytearray()
+    previous = base
+    for id in ids:
+        delta = id - previous
+        previous = id
+        while delta >= 0x80:
+            out.append((delta & 0x7F) | 0x80)
+            delta >>= 7
+        out.append(delta)
+    return bytes(out)
+
+
+def decode_ids(data: bytes, base: int = 0) -> list[int]:
+    ids = []
+    previous = base
+    delta = 0
+    shift = 0
+    for byte in data:
+        delta |= (byte & 0x7F) << shift
+        if byte & 0x80:
+            shift += 7
+            continue
+        previous += delta
+        ids.append(previous)
+        delta = 0
+        shift = 0
+    return ids
+
+
+class TextIndexSegment:
+    """Inverted text index of the events with ids in [start, end).
+
+    Segments are built by adding event dicts in id order and are immutable
+    once written. Postings read from a file stay encoded until a query needs
+    them. Events below `next_id` have been indexed.
+    """
+
+    start: int
+    end: int
+    next_id: int
+
+    def __init__(self, start: int, end: int):
+        self.start = start
+        self.end = end
+        self.next_id = start
+        self._postings: dict[str, list[int]] = {}
+        self._encoded: dict[str, bytes] = {}
+
+    def covers(self, id: int) -> bool:
+        return self.start <= id < self.end
+
+    def add(self, id: int, data: dict[str, Any]) -> None:
+        self.add_tokens(id, get_event_tokens(data))
+
+    def add_tokens(self, id: int, tokens: Iterable[str]) -> None:
+        for token in tokens:
+            self._postings.setdefault(token, []).append(id)
+        self.next_id = id + 1
+
+    def get_ids(self, token: str) -> list[int]:
+        ids = self._postings.get(token)
+        if ids is None:
+            encoded = self._encoded.get(token)
+            if encoded is None:
+                return []
+            ids = self._postings[token] = decode_ids(encoded, self.start)
+        return ids
+
+    def find(self, tokens: Iterable[str]) -> list[int]:
+        """Returns the sorted ids of events containing every token."""
+        lists = sorted((self.get_ids(token) for token in tokens), key=len)
+        if not lists:
+            return []
+        ids = lists[0]
+        for other in lists[1:]:
+            members = set(other)
+            ids = [id for id in ids if id in members]
+        return ids
+
+    def to_json(self) -> str:
+        postings = {
+            token: base64.b64encode(encode_ids(ids, self.start)).decode('ascii')
+            for token, ids in self._postings.items()
+        }
+        for token, encoded in self._encoded.items():
+            if token not in postings:
+                postings[token] = base64.b64encode(encoded).decode('ascii')
+        return json.dumps({'start': self.start, 'end': self.end, 'postings': postings})
+
+    @classmethod
+    def from_json(cls, contents: str) -> 'TextIndexSegment':
+        data = json.loads(contents)
+        segment = cls(int(data['start']), int(data['end']))
+        segment.next_id = segment.end
+        segment._encoded = {
+            token: base64.b64decode(encoded)
+            for token, encoded in data['postings'].items()
+        }
+        return segment
@@ -1,4 +1,10 @@
+from openhands.storage.async_files import AsyncFileStore, SyncToAsyncFileStore
+from openhands.storage.async_memory import AsyncInMemoryFileStore
+from openhands.storage.batched_web_hook import BatchedWebHookFileStore
+from openhands.storage.caching import CachingFileStore
 from openhands.storage.files import FileStore
+from openhands.storage.segmented_local import SegmentedLocalFileStore
+from openhands.storage.tiered import TieredFileStore
 
 
 # LOOK: 除了LocalFileStore其他不懂
@@ -8,33 +14,45 @@ def get_file_store(
     file_store_web_hook_url: str | None = None,
     file_store_web_hook_headers: dict | None = None,
     file_store_web_hook_batch: bool = False,
+    file_store_cache: bool = False,
+    file_store_cache_dir: str | None = None,
+    file_store_hot_path: str | None = None,
 ) -> FileStore:
     store: FileStore
     if file_store_type == 'local':
         if file_store_path is None:
             raise ValueError('file_store_path is required for local file store')
         store = LocalFileStore(file_store_path)
+    elif file_store_type == 'local_segmented':
+        if file_store_path is None:
+            raise ValueError('file_store_path is required for local file store')
+        store = SegmentedLocalFileStore(file_store_path)
     elif file_store_type == 's3':
         store = S3FileStore(file_store_path)
     elif file_store_type == 'google_cloud':
         store = GoogleCloudFileStore(file_store_path)
     else:
         store = InMemoryFileStore()
+    if file_store_hot_path is not None:
+        # Active conversations on local disk; idle ones in the store above.
+        store = TieredFileStore(LocalFileStore(file_store_hot_path), store)
+    if file_store_cache:
+        store = CachingFileStore(store, disk_cache_dir=file_store_cache_dir)
     if file_store_web_hook_url:
         if file_store_web_hook_headers is None:
             file_store_web_hook_headers = {}
             if os.getenv('SESSION_API_KEY'):
                 file_store_web_hook_headers['X-SESSION-API-KEY'] = os.getenv('SESSION_API_KEY')
 
-        client = httpx.Client(headers=file_store_web_hook_headers or {})
-
         if file_store_web_hook_batch:
+            # Owns a pooled async client instead of sharing a sync one.
             store = BatchedWebHookFileStore(
                 store,
                 file_store_web_hook_url,
-                client,
+                headers=file_store_web_hook_headers,
             )
         else:
+            client = httpx.Client(headers=file_store_web_hook_headers or {})
             store = WebHookFileStore(
                 store,
                 file_store_web_hook_url,
@@ -42,3 +60,40 @@ def get_file_store(
             )
     return store
 
+
+def get_async_file_store(
+    file_store_type: str,
+    file_store_path: str | None = None,
+    file_store_web_hook_url: str | None = None,
+    file_store_web_hook_headers: dict | None = None,
+    file_store_web_hook_batch: bool = False,
+    file_store_cache: bool = False,
+    file_store_cache_dir: str | None = None,
+    file_store_hot_path: str | None = None,
+) -> AsyncFileStore:
+    """Creates the configured file store for callers on an event loop.
+
+    Takes the same arguments as `get_file_store`. Stores without a native
+    async implementation run on the executor through SyncToAsyncFileStore.
+    """
+    wrapped = file_store_web_hook_url or file_store_cache or file_store_hot_path
+    if not wrapped and file_store_type not in (
+        'local',
+        'local_segmented',
+        's3',
+        'google_cloud',
+    ):
+        return AsyncInMemoryFileStore()
+    return SyncToAsyncFileStore(
+        get_file_store(
+            file_store_type,
+            file_store_path,
+            file_store_web_hook_url,
+            file_store_web_hook_headers,
+            file_store_web_hook_batch,
+            file_store_cache,
+            file_store_cache_dir,
+            file_store_hot_path,
+        )
+    )
+
@@ -0,0 +1,98 @@
+from abc import abstractmethod
+
+from openhands.storage.files import FileStore
+from openhands.utils.async_utils import call_async_from_sync, call_sync_from_async
+
+
+class AsyncFileStore:
+    """Asyncio counterpart of FileStore, for callers running on an event loop."""
+
+    @abstractmethod
+    async def awrite(self, path: str, contents: str | bytes) -> None:
+        pass
+
+    @abstractmethod
+    async def aread(self, path: str) -> str:
+        """Returns the contents of a file, decompressed like `FileStore.read`."""
+
+    @abstractmethod
+    async def alist(
+        self,
+        path: str,
+        prefix: str | None = None,
+        min_id: int | None = None,
+        max_id: int | None = None,
+    ) -> list[str]:
+        """Lists the entries of a directory, filtered like `FileStore.list`."""
+
+    @abstractmethod
+    async def adelete(self, path: str) -> None:
+        pass
+
+
+class SyncToAsyncFileStore(AsyncFileStore):
+    """Exposes a FileStore as an AsyncFileStore.
+
+    Every call runs the sync store on the default executor, so this is for
+    stores without a native async implementation, such as local disk, S3 or
+    GCS. Wrapping a LocalFileStore keeps all disk I/O, stats included, off
+    the event loop.
+    """
+
+    file_store: FileStore
+
+    def __init__(self, file_store: FileStore):
+        self.file_store = file_store
+
+    async def awrite(self, path: str, contents: str | bytes) -> None:
+        await call_sync_from_async(self.file_store.write, path, contents)
+
+    async def aread(self, path: str) -> str:
+        return await call_sync_from_async(self.file_store.read, path)
+
+    async def alist(
+        self,
+        path: str,
+        prefix: str | None = None,
+        min_id: int | None = None,
+        max_id: int | None = None,
+    ) -> list[str]:
+        return await call_sync_from_async(
+            self.file_store.list, path, prefix, min_id, max_id
+        )
+
+    async def adelete(self, path: str) -> None:
+        await call_sync_from_async(self.file_store.delete, path)
+
+
+class AsyncToSyncFileStore(FileStore):
+    """Exposes an AsyncFileStore as a FileStore, for code that is not async.
+
+    Must not be called from a running event loop's thread for stores whose
+    state is bound to that loop.
+    """
+
+    async_file_store: AsyncFileStore
+
+    def __init__(self, async_file_store: AsyncFileStore):
+        self.async_file_store = async_file_store
+
+    def write(self, path: str, contents: str | bytes) -> None:
+        call_async_from_sync(self.async_file_store.awrite, None, path, contents)
+
+    def read(self, path: str) -> str:
+        return call_async_from_sync(self.async_file_store.aread, None, path)
+
+    def list(
+        self,
+        path: str,
+        prefix: str | None = None,
+        min_id: int | None = None,
+        max_id: int | None = None,
+    ) -> list[str]:
+        return call_async_from_sync(
+            self.async_file_store.alist, None, path, prefix, min_id, max_id
+        )
+
+    def delete(self, path: str) -> None:
+        call_async_from_sync(self.async_file_store.adelete, None, path)
@@ -0,0 +1,59 @@
+from openhands.storage.async_files import AsyncFileStore
+from openhands.storage.compression import decompress_text
+from openhands.storage.files import filter_listing
+
+
+class AsyncInMemoryFileStore(AsyncFileStore):
+    """AsyncFileStore backed by a dict, for tests and ephemeral sessions.
+
+    Listings follow LocalFileStore: direct children of the path, with `/`
+    appended to directories.
+    """
+
+    files: dict[str, str]
+
+    def __init__(self, files: dict[str, str] | None = None):
+        self.files = {} if files is None else files
+
+    @staticmethod
+    def _normalize(path: str) -> str:
+        return path.lstrip('/')
+
+    async def awrite(self, path: str, contents: str | bytes) -> None:
+        if isinstance(contents, bytes):
+            contents = contents.decode('utf-8')
+        self.files[self._normalize(path)] = contents
+
+    async def aread(self, path: str) -> str:
+        try:
+            contents = self.files[self._normalize(path)]
+        except KeyError:
+            raise FileNotFoundError(path)
+        return decompress_text(contents)
+
+    async def alist(
+        self,
+        path: str,
+        prefix: str | None = None,
+        min_id: int | None = None,
+        max_id: int | None = None,
+    ) -> list[str]:
+        dir_path = self._normalize(path)
+        if dir_path and not dir_path.endswith('/'):
+            dir_path += '/'
+        entries: dict[str, None] = {}
+        for file_path in self.files:
+            if not file_path.startswith(dir_path):
+                continue
+            name, sep, _ = file_path[len(dir_path) :].partition('/')
+            entries[dir_path + name + sep] = None
+        if not entries:
+            raise FileNotFoundError(path)
+        return filter_listing(entries, prefix, min_id, max_id)
+
+    async def adelete(self, path: str) -> None:
+        path = self._normalize(path)
+        prefix = path.rstrip('/') + '/'
+        for file_path in list(self.files):
+            if file_path == path or file_path.startswith(prefix):
+                del self.files[file_path]
@@ -0,0 +1,282 @@
+import asyncio
+import base64
+import threading
+import time
+from dataclasses import dataclass
+from typing import Iterable
+
+import httpx
+
+from openhands.core.logger import openhands_logger as logger
+from openhands.storage.files import FileStore
+
+DEFAULT_BATCH_TIMEOUT_SECONDS = 0.1
+DEFAULT_BATCH_SIZE_LIMIT_BYTES = 1024 * 1024
+DEFAULT_MAX_CONCURRENT_REQUESTS = 4
+DEFAULT_MAX_RETRIES = 3
+DEFAULT_RETRY_BACKOFF_SECONDS = 0.1
+
+_DELETE = None
+
+
+@dataclass
+class WebHookBatchMetrics:
+    batches_sent: int = 0
+    operations_sent: int = 0
+    # Writes and deletes dropped because a later one to the same path
+    # replaced them within the same window.
+    operations_coalesced: int = 0
+    bytes_sent: int = 0
+    max_batch_operations: int = 0
+    retries: int = 0
+    failed_batches: int = 0
+    last_flush_latency: float = 0.0
+    total_flush_latency: float = 0.0
+
+    @property
+    def mean_batch_operations(self) -> float:
+        return self.operations_sent / self.batches_sent if self.batches_sent else 0.0
+
+    @property
+    def mean_flush_latency(self) -> float:
+        return self.total_flush_latency / self.batches_sent if self.batches_sent else 0.0
+
+
+class BatchedWebHookFileStore(FileStore):
+    """Mirrors writes and deletes to a web hook, in batches.
+
+    Operations go to the wrapped store immediately and are queued for the
+    web hook. A batch is sent once `batch_timeout_seconds` have passed since
+    its first operation or once it holds `batch_size_limit_bytes` of content,
+    whichever comes first; repeated operations on one path within a batch
+    are sent only once, with the latest contents. Each batch is a single
+    POST of a JSON list of operations to `base_url`.
+
+    Batches are sent from a background event loop through one pooled
+    `httpx.AsyncClient`, at most `max_concurrent_requests` at a time. Failed
+    requests are retried with exponential backoff up to `max_retries` times.
+    A batch that touches a path of a batch still in flight waits for it, so
+    the web hook sees the operations on each path in order.
+    """
+
+    file_store: FileStore
+    base_url: str
+    batch_timeout_seconds: float
+    batch_size_limit_bytes: int
+    max_retries: int
+    retry_backoff_seconds: float
+    metrics: WebHookBatchMetrics
+
+    def __init__(
+        self,
+        file_store: FileStore,
+        base_url: str,
+        client: httpx.AsyncClient | None = None,
+        batch_timeout_seconds: float = DEFAULT_BATCH_TIMEOUT_SECONDS,
+        batch_size_limit_bytes: int = DEFAULT_BATCH_SIZE_LIMIT_BYTES,
+        max_concurrent_requests: int = DEFAULT_MAX_CONCURRENT_REQUESTS,
+        max_retries: int = DEFAULT_MAX_RETRIES,
+        retry_backoff_seconds: float = DEFAULT_RETRY_BACKOFF_SECONDS,
+        headers: dict | None = None,
+    ):
+        self.file_store = file_store
+        self.base_url = base_url
+        self.batch_timeout_seconds = batch_timeout_seconds
+        self.batch_size_limit_bytes = batch_size_limit_bytes
+        self.max_retries = max_retries
+        self.retry_backoff_seconds = retry_backoff_seconds
+        self.metrics = WebHookBatchMetrics()
+        if client is None:
+            client = httpx.AsyncClient(
+                headers=headers or {},
+                limits=httpx.Limits(
+                    max_connections=max_concurrent_requests,
+                    max_keepalive_connections=max_concurrent_requests,
+                ),
+            )
+        self._client = client
+        self._semaphore = asyncio.Semaphore(max_concurrent_requests)
+
+        # Path -> contents, or _DELETE. Insertion order is the send order.
+        self._pending: dict[str, str | bytes | None] = {}
+        self._pending_bytes = 0
+        # Incremented whenever a batch is cut, so a window's timer does
+        # nothing once its batch has already been sent for being full.
+        self._window = 0
+        self._window_open = False
+        self._lock = threading.Lock()
+        self._closed = False
+
+        self._loop = asyncio.new_event_loop()
+        self._thread = threading.Thread(
+            target=self._loop.run_forever, name='web-hook-batcher', daemon=True
+        )
+        self._thread.start()
+        # Only touched on the loop thread.
+        self._inflight: dict[str, asyncio.Future] = {}
+        self._tasks: set[asyncio.Future] = set()
+
+    def write(self, path: str, contents: str | bytes) -> None:
+        self.file_store.write(path, contents)
+        self._enqueue(((path, contents),))
+
+    def write_many(self, items: Iterable[tuple[str, str | bytes]]) -> None:
+        items = list(items)
+        self.file_store.write_many(items)
+        self._enqueue(items)
+
+    def read(self, path: str) -> str:
+        return self.file_store.read(path)
+
+    def read_bytes(self, path: str) -> bytes:
+        return self.file_store.read_bytes(path)
+
+    def exists(self, path: str) -> bool:
+        return self.file_store.exists(path)
+
+    def list(
+        self,
+        path: str,
+        prefix: str | None = None,
+        min_id: int | None = None,
+        max_id: int | None = None,
+    ) -> list[str]:
+        return self.file_store.list(path, prefix, min_id, max_id)
+
+    def delete(self, path: str) -> None:
+        self.file_store.delete(path)
+        self._enqueue(((path, _DELETE),))
+
+    def flush(self) -> None:
+        """Sends every queued operation and waits for all requests to finish."""
+        self._send_pending()
+        asyncio.run_coroutine_threadsafe(self._wait_for_tasks(), self._loop).result()
+
+    def close(self) -> None:
+        if self._closed:
+            return
+        try:
+            self.flush()
+        finally:
+            self._closed = True
+            asyncio.run_coroutine_threadsafe(self._client.aclose(), self._loop).result()
+            self._loop.call_soon_threadsafe(self._loop.stop)
+            self._thread.join()
+            self._loop.close()
+
+    def _enqueue(self, items: Iterable[tuple[str, str | bytes | None]]) -> None:
+        if self._closed:
+            raise RuntimeError('Cannot write to a closed BatchedWebHookFileStore')
+        with self._lock:
+            for path, contents in items:
+                if path in self._pending:
+                    # Moved to the end, since it is now the latest operation.
+                    previous = self._pending.pop(path)
+                    if previous is not None:
+                        self._pending_bytes -= len(previous)
+                    self.metrics.operations_coalesced += 1
+                self._pending[path] = contents
+                if contents is not None:
+                    self._pending_bytes += len(contents)
+            full = self._pending_bytes >= self.batch_size_limit_bytes
+            open_window = not full and not self._window_open
+            if open_window:
+                self._window_open = True
+            window = self._window
+        if full:
+            self._send_pending()
+        elif open_window:
+            self._loop.call_soon_threadsafe(
+                self._loop.call_later,
+                self.batch_timeout_seconds,
+                self._close_window,
+                window,
+            )
+
+    def _close_window(self, window: int) -> None:
+        with self._lock:
+            if window != self._window:
+                return
+        self._send_pending()
+
+    def _send_pending(self) -> None:
+        with self._lock:
+            batch, self._pending = self._pending, {}
+            self._pending_bytes = 0
+            self._window += 1
+            self._window_open = False
+        if batch:
+            self._loop.call_soon_threadsafe(self._start_send, batch)
+
+    def _start_send(self, batch: dict[str, str | bytes | None]) -> None:
+        # Runs on the loop, so batches are registered in the order they were
+        # cut and later batches can wait for earlier ones.
+        waits = {self._inflight[path] for path in batch if path in self._inflight}
+        task = self._loop.create_task(self._send_batch(batch, waits))
+        for path in batch:
+            self._inflight[path] = task
+        self._tasks.add(task)
+        task.add_done_callback(lambda t: self._finish_send(t, batch))
+
+    def _finish_send(self, task: asyncio.Future, batch: dict) -> None:
+        self._tasks.discard(task)
+        for path in batch:
+            if self._inflight.get(path) is task:
+                del self._inflight[path]
+
+    async def _send_batch(
+        self, batch: dict[str, str | bytes | None], waits: set[asyncio.Future]
+    ) -> None:
+        if waits:
+            await asyncio.wait(waits)
+        payload = [_to_operation(path, contents) for path, contents in batch.items()]
+        size = sum(len(contents) for contents in batch.values() if contents is not None)
+        async with self._semaphore:
+            start = time.monotonic()
+            for attempt in range(self.max_retries + 1):
+                try:
+                    response = await self._client.post(self.base_url, json=payload)
+                    response.raise_for_status()
+                    break
+                except httpx.HTTPError as e:
+                    if attempt == self.max_retries or not _is_retryable(e):
+                        self.metrics.failed_batches += 1
+                        logger.error(
+                            f'Failed to send {len(payload)} operations to web hook '
+                            f'{self.base_url}: {e}'
+                        )
+                        return
+                    self.metrics.retries += 1
+                    await asyncio.sleep(self.retry_backoff_seconds * 2**attempt)
+            latency = time.monotonic() - start
+        metrics = self.metrics
+        metrics.batches_sent += 1
+        metrics.operations_sent += len(payload)
+        metrics.bytes_sent += size
+        metrics.max_batch_operations = max(metrics.max_batch_operations, len(payload))
+        metrics.last_flush_latency = latency
+        metrics.total_flush_latency += latency
+
+    async def _wait_for_tasks(self) -> None:
+        while self._tasks:
+            await asyncio.wait(set(self._tasks))
+
+
+def _is_retryable(error: httpx.HTTPError) -> bool:
+    # Client errors will fail the same way again.
+    if isinstance(error, httpx.HTTPStatusError):
+        return error.response.status_code >= 500 or error.response.status_code == 429
+    return True
+
+
+def _to_operation(path: str, contents: str | bytes | None) -> dict:
+    if contents is None:
+        return {'method': 'DELETE', 'path': path}
+    if isinstance(contents, bytes):
+        return {
+            'method': 'POST',
+            'path': path,
+            'content': base64.b64encode(contents).decode('ascii'),
+            'encoding': 'base64',
+        }
+    return {'method': 'POST', 'path': path, 'content': contents}
@@ -0,0 +1,236 @@
+import os
+import shutil
+import threading
+from collections import OrderedDict
+from typing import Iterable
+
+from openhands.core.logger import openhands_logger as logger
+from openhands.storage.compression import decompress_text
+from openhands.storage.files import FileStore, filter_listing
+from openhands.storage.local import LocalFileStore
+
+DEFAULT_CACHE_MAX_MEMORY_BYTES = 64 * 1024 * 1024
+DEFAULT_CACHE_MAX_DISK_BYTES = 1024 * 1024 * 1024
+
+# The disk tier lives in this subdirectory of `disk_cache_dir`, marked by
+# this file, so that emptying it never touches files the cache did not write.
+DISK_CACHE_SUBDIR = 'file_store_cache'
+_DISK_CACHE_MARKER = '.file_store_cache'
+
+
+def _normalize(path: str) -> str:
+    return path.strip('/')
+
+
+class _LRU:
+    """Paths to sizes, least recently used first, with a byte budget."""
+
+    def __init__(self, max_bytes: int):
+        self.max_bytes = max_bytes
+        self.entries: OrderedDict[str, int] = OrderedDict()
+        self.size_bytes = 0
+
+    def touch(self, path: str) -> bool:
+        if path not in self.entries:
+            return False
+        self.entries.move_to_end(path)
+        return True
+
+    def add(self, path: str, size: int) -> list[str]:
+        """Adds a path and returns the paths evicted to make room for it."""
+        self.remove(path)
+        self.entries[path] = size
+        self.size_bytes += size
+        evicted = []
+        while self.size_bytes > self.max_bytes:
+            evicted_path, evicted_size = self.entries.popitem(last=False)
+            self.size_bytes -= evicted_size
+            evicted.append(evicted_path)
+        return evicted
+
+    def remove(self, path: str) -> bool:
+        size = self.entries.pop(path, None)
+        if size is None:
+            return False
+        self.size_bytes -= size
+        return True
+
+
+class CachingFileStore(FileStore):
+    """Read-through cache in front of another, usually remote, FileStore.
+
+    Reads and listings are served from memory when possible. Files are
+    cached as their raw contents, so `read_bytes` is cached as well and
+    `read` decompresses on every call. Files evicted
+    from memory move to an optional local disk tier in a DISK_CACHE_SUBDIR
+    subdirectory of `disk_cache_dir` before they are dropped; both tiers
+    evict the least recently used files once over their byte budget.
+    Writes and deletes through this store go to the wrapped store first and
+    then update the cache, so the cache is only stale if something else
+    changes the wrapped store, which is fine for immutable files like
+    events. The disk tier is emptied on startup.
+    """
+
+    file_store: FileStore
+
+    def __init__(
+        self,
+        file_store: FileStore,
+        max_memory_bytes: int = DEFAULT_CACHE_MAX_MEMORY_BYTES,
+        disk_cache_dir: str | None = None,
+        max_disk_bytes: int = DEFAULT_CACHE_MAX_DISK_BYTES,
+    ):
+        self.file_store = file_store
+        self.hits = 0
+        self.misses = 0
+        self._memory: dict[str, bytes] = {}
+        self._memory_lru = _LRU(max_memory_bytes)
+        self._disk: LocalFileStore | None = None
+        self._disk_lru = _LRU(max_disk_bytes)
+        if disk_cache_dir is not None:
+            self._disk = LocalFileStore(_reset_disk_cache_dir(disk_cache_dir))
+        self._listings: dict[str, list[str]] = {}
+        self._lock = threading.RLock()
+        # Bumped by every write and delete, so a read or listing fetched
+        # while one happened is not cached over the newer state.
+        self._version = 0
+
+    def write(self, path: str, contents: str | bytes) -> None:
+        self.file_store.write(path, contents)
+        self._update(path, contents)
+
+    def write_many(self, items: Iterable[tuple[str, str | bytes]]) -> None:
+        items = list(items)
+        self.file_store.write_many(items)
+        for path, contents in items:
+            self._update(path, contents)
+
+    def read(self, path: str) -> str:
+        return decompress_text(self.read_bytes(path).decode('utf-8'))
+
+    def read_bytes(self, path: str) -> bytes:
+        key = _normalize(path)
+        with self._lock:
+            contents = self._get(key)
+            if contents is not None:
+                self.hits += 1
+                return contents
+            self.misses += 1
+            version = self._version
+        contents = self.file_store.read_bytes(path)
+        with self._lock:
+            if version == self._version:
+                self._put(key, contents)
+        return contents
+
+    def exists(self, path: str) -> bool:
+        key = _normalize(path)
+        with self._lock:
+            if key in self._memory_lru.entries or key in self._disk_lru.entries:
+                return True
+        return self.file_store.exists(path)
+
+    def list(
+        self,
+        path: str,
+        prefix: str | None = None,
+        min_id: int | None = None,
+        max_id: int | None = None,
+    ) -> list[str]:
+        # Full listings are cached and filtered here.
+        key = _normalize(path)
+        with self._lock:
+            files = self._listings.get(key)
+            if files is not None:
+                self.hits += 1
+                return filter_listing(files, prefix, min_id, max_id)
+            self.misses += 1
+            version = self._version
+        files = self.file_store.list(path)
+        with self._lock:
+            if version == self._version:
+                self._listings[key] = list(files)
+        return filter_listing(files, prefix, min_id, max_id)
+
+    def delete(self, path: str) -> None:
+        self.file_store.delete(path)
+        key = _normalize(path)
+        prefix = key + '/' if key else ''
+        with self._lock:
+            self._version += 1
+            # The path may be a directory; drop everything below it too.
+            cached = list(self._memory_lru.entries) + list(self._disk_lru.entries)
+            for cached_path in cached:
+                if cached_path == key or cached_path.startswith(prefix):
+                    self._invalidate(cached_path)
+            for listed_path in list(self._listings):
+                if listed_path == key or listed_path.startswith(prefix):
+                    del self._listings[listed_path]
+            self._invalidate_parent_listings(key)
+
+    def _update(self, path: str, contents: str | bytes) -> None:
+        key = _normalize(path)
+        with self._lock:
+            self._version += 1
+            self._invalidate(key)
+            self._invalidate_parent_listings(key)
+            if isinstance(contents, str):
+                contents = contents.encode('utf-8')
+            self._put(key, contents)
+
+    def _get(self, key: str) -> bytes | None:
+        if self._memory_lru.touch(key):
+            return self._memory[key]
+        if self._disk is None or not self._disk_lru.touch(key):
+            return None
+        try:
+            contents = self._disk.read_bytes(key)
+        except FileNotFoundError:
+            self._disk_lru.remove(key)
+            return None
+        # Promoted back to memory.
+        self._disk_lru.remove(key)
+        self._disk.delete(key)
+        self._put(key, contents)
+        return contents
+
+    def _put(self, key: str, contents: bytes) -> None:
+        self._memory[key] = contents
+        for evicted in self._memory_lru.add(key, len(contents)):
+            self._demote(evicted, self._memory.pop(evicted))
+
+    def _demote(self, key: str, contents: bytes) -> None:
+        if self._disk is None:
+            return
+        try:
+            self._disk.write(key, contents)
+        except OSError as e:
+            logger.warning(f'Could not write {key} to the disk cache: {e}')
+            return
+        for evicted in self._disk_lru.add(key, len(contents)):
+            self._disk.delete(evicted)
+
+    def _invalidate(self, key: str) -> None:
+        if self._memory_lru.remove(key):
+            del self._memory[key]
+        if self._disk is not None and self._disk_lru.remove(key):
+            self._disk.delete(key)
+
+    def _invalidate_parent_listings(self, key: str) -> None:
+        # A new file can also add a subdirectory to every ancestor listing.
+        while key:
+            key = key.rpartition('/')[0]
+            self._listings.pop(key, None)
+
+
+def _reset_disk_cache_dir(disk_cache_dir: str) -> str:
+    """Empties the disk tier left by an earlier run and returns its path."""
+    path = os.path.join(os.path.expanduser(disk_cache_dir), DISK_CACHE_SUBDIR)
+    marker = os.path.join(path, _DISK_CACHE_MARKER)
+    if os.path.exists(path):
+        if not os.path.isfile(marker):
+            raise ValueError(f'Not clearing {path}: it was not created by the file cache')
+        shutil.rmtree(path)
+    os.makedirs(path)
+    open(marker, 'w').close()
+    return path
@@ -0,0 +1,126 @@
+import json
+
+from openhands.core.logger import openhands_logger as logger
+from openhands.storage.files import FileStore
+
+EVENTS_DIR_NAME = 'events'
+EVENT_CACHE_DIR_NAME = 'event_cache'
+DEFAULT_PAGE_SIZE = 25
+
+
+def list_files(file_store: FileStore, path: str) -> list[str]:
+    """Lists every file below `path`, recursively."""
+    try:
+        entries = file_store.list(path)
+    except FileNotFoundError:
+        return []
+    files = []
+    for entry in entries:
+        if entry.endswith('/'):
+            files.extend(list_files(file_store, entry))
+        else:
+            files.append(entry)
+    return files
+
+
+def get_event_ids(file_store: FileStore, conversation_dir: str) -> list[int]:
+    """Returns the sorted ids of the per-event files of a conversation."""
+    ids = []
+    for filename in list_files(file_store, f'{conversation_dir}{EVENTS_DIR_NAME}/'):
+        name = filename.rsplit('/', 1)[-1]
+        stem, _, ext = name.partition('.')
+        if ext == 'json' and stem.isdigit():
+            ids.append(int(stem))
+    return sorted(ids)
+
+
+def get_page_ranges(file_store: FileStore, conversation_dir: str) -> list[tuple[int, int]]:
+    """Returns the sorted (start, end) id ranges of a conversation's pages."""
+    ranges = []
+    cache_dir = f'{conversation_dir}{EVENT_CACHE_DIR_NAME}/'
+    for filename in list_files(file_store, cache_dir):
+        stem = filename.rsplit('/', 1)[-1].partition('.')[0]
+        start, _, end = stem.partition('-')
+        if start.isdigit() and end.isdigit() and int(start) < int(end):
+            ranges.append((int(start), int(end)))
+    return sorted(ranges)
+
+
+def compact_events(
+    file_store: FileStore,
+    conversation_dir: str,
+    page_size: int = DEFAULT_PAGE_SIZE,
+    end_id: int | None = None,
+) -> int:
+    """Merges the stored events of a conversation into pages of `page_size`.
+
+    Events below `end_id` are written as pages of
+    `event_cache/{start}-{end}.json`, the layout EventStore reads, starting
+    at multiples of `page_size`; the last page ends at `end_id`. By default
+    `end_id` is the end of the last full page, so a tail that may still grow
+    is left alone. A range that is missing an event is skipped.
+
+    Each page is written before the per-event files and smaller pages it
+    supersedes are deleted, so a reader always finds every event in one of
+    them. Returns the number of files deleted.
+    """
+    if page_size < 1:
+        raise ValueError(f'page_size must be positive: {page_size}')
+    event_ids = set(get_event_ids(file_store, conversation_dir))
+    page_ranges = get_page_ranges(file_store, conversation_dir)
+    if end_id is None:
+        last_id = max([*event_ids, *(end - 1 for _, end in page_ranges)], default=-1)
+        end_id = (last_id + 1) // page_size * page_size
+    loaded_pages: dict[tuple[int, int], list] = {}
+
+    def read_entry(id: int):
+        # Entries are kept as stored, so compressed envelopes and blob
+        # references carry over unchanged; `read` would decompress them.
+        for page_range in page_ranges:
+            if page_range[0] <= id < page_range[1]:
+                filename = _get_page_filename(conversation_dir, *page_range)
+                if page_range not in loaded_pages:
+                    loaded_pages[page_range] = json.loads(file_store.read(filename))
+                return loaded_pages[page_range][id - page_range[0]]
+        if id in event_ids:
+            return json.loads(
+                file_store.read_bytes(f'{conversation_dir}{EVENTS_DIR_NAME}/{id}.json')
+            )
+        raise FileNotFoundError(id)
+
+    removed = 0
+    for start in range(0, end_id, page_size):
+        end = min(start + page_size, end_id)
+        file_ids = [id for id in range(start, end) if id in event_ids]
+        inner_pages = [
+            r
+            for r in page_ranges
+            if start <= r[0] and r[1] <= end and r != (start, end)
+        ]
+        covered = any(r[0] <= start and end <= r[1] for r in page_ranges)
+        if covered and not file_ids and not inner_pages:
+            continue
+        if not covered:
+            try:
+                entries = [read_entry(id) for id in range(start, end)]
+            except FileNotFoundError:
+                logger.debug(
+                    f'Not compacting events {start}-{end} of {conversation_dir}: '
+                    'some are missing'
+                )
+                continue
+            file_store.write(
+                _get_page_filename(conversation_dir, start, end), json.dumps(entries)
+            )
+        for id in file_ids:
+            file_store.delete(f'{conversation_dir}{EVENTS_DIR_NAME}/{id}.json')
+        for page_range in inner_pages:
+            file_store.delete(_get_page_filename(conversation_dir, *page_range))
+        removed += len(file_ids) + len(inner_pages)
+    if removed:
+        logger.debug(f'Compacted {removed} event files of {conversation_dir}')
+    return removed
+
+
+def _get_page_filename(conversation_dir: str, start: int, end: int) -> str:
+    return f'{conversation_dir}{EVENT_CACHE_DIR_NAME}/{start}-{end}.json'
@@ -0,0 +1,111 @@
+import base64
+import binascii
+import json
+import zlib
+from typing import Any
+
+try:
+    import zstandard
+except ImportError:
+    zstandard = None
+
+# Payloads smaller than this are stored as plain text.
+DEFAULT_COMPRESSION_THRESHOLD = 64 * 1024
+
+# Compressed payloads are stored as a small JSON document, so they still fit
+# the text-based FileStore interface and can sit inside cache pages. The
+# marker key comes first, which lets readers skip most plain documents by
+# their prefix without parsing them twice.
+_ENVELOPE_KEY = 'compressed'
+_ENVELOPE_PREFIX = '{"compressed": '
+_CODECS = ('zlib', 'zstd')
+_DECOMPRESS_ERRORS: tuple[type[Exception], ...] = (zlib.error, UnicodeDecodeError)
+if zstandard is not None:
+    _DECOMPRESS_ERRORS += (zstandard.ZstdError,)
+
+
+def _compress(codec: str, data: bytes) -> bytes:
+    if codec == 'zlib':
+        return zlib.compress(data, 6)
+    if codec == 'zstd':
+        if zstandard is None:
+            raise ValueError('zstd compression requires the zstandard package')
+        return zstandard.ZstdCompressor(level=3).compress(data)
+    raise ValueError(f'Unknown compression codec: {codec}')
+
+
+def _decompress(codec: str, data: bytes) -> bytes:
+    if codec == 'zlib':
+        return zlib.decompress(data)
+    if codec == 'zstd':
+        if zstandard is None:
+            raise ValueError('Reading zstd compressed data requires the zstandard package')
+        return zstandard.ZstdDecompressor().decompress(data)
+    raise ValueError(f'Unknown compression codec: {codec}')
+
+
+def compress_text(
+    text: str,
+    codec: str = 'zlib',
+    threshold: int = DEFAULT_COMPRESSION_THRESHOLD,
+) -> str:
+    """Returns `text`, or a compressed envelope of it if it reaches `threshold`.
+
+    The plain text is kept when compressing would not make it smaller.
+    """
+    if len(text) < threshold:
+        return text
+    compressed = base64.b64encode(_compress(codec, text.encode('utf-8'))).decode('ascii')
+    if len(compressed) >= len(text):
+        return text
+    return json.dumps({_ENVELOPE_KEY: codec, 'data': compressed})
+
+
+def is_compressed(text: str) -> bool:
+    """Returns whether `text` is an envelope written by `compress_text`."""
+    return _decompress_text(text) is not None
+
+
+def decompress_text(text: str) -> str:
+    """Inverse of `compress_text`.
+
+    Anything that is not a complete envelope, e.g. a user file that merely
+    starts like one, is returned unchanged.
+    """
+    decompressed = _decompress_text(text)
+    return text if decompressed is None else decompressed
+
+
+def decompress_value(value: Any) -> Any:
+    """Decodes a parsed envelope, e.g. an entry of a cache page, to its JSON value."""
+    decompressed = _decompress_envelope(value)
+    return value if decompressed is None else json.loads(decompressed)
+
+
+def _decompress_text(text: str) -> str | None:
+    if not text.startswith(_ENVELOPE_PREFIX):
+        return None
+    try:
+        envelope = json.loads(text)
+    except ValueError:
+        return None
+    return _decompress_envelope(envelope)
+
+
+def _decompress_envelope(envelope: Any) -> str | None:
+    """Returns the text of an envelope, or None if `envelope` is not one."""
+    if not (
+        isinstance(envelope, dict)
+        and envelope.keys() == {_ENVELOPE_KEY, 'data'}
+        and envelope[_ENVELOPE_KEY] in _CODECS
+        and isinstance(envelope['data'], str)
+    ):
+        return None
+    try:
+        data = base64.b64decode(envelope['data'], validate=True)
+    except binascii.Error:
+        return None
+    try:
+        return _decompress(envelope[_ENVELOPE_KEY], data).decode('utf-8')
+    except _DECOMPRESS_ERRORS:
+        return None
@@ -1,18 +1,107 @@
 from abc import abstractmethod
+from typing import Iterable
 
 class FileStore:
     @abstractmethod
     def write(self, path: str, contents: str | bytes) -> None:
         pass
 
+    def write_many(self, items: Iterable[tuple[str, str | bytes]]) -> None:
+        """Writes several files as one logical commit, in the given order.
+
+        Stores override this to batch the work, e.g. one directory pass and a
+        single group fsync. The default writes the files one by one.
+        """
+        for path, contents in items:
+            self.write(path, contents)
+
     @abstractmethod
     def read(self, path: str) -> str:
-        pass
+        """Returns the contents of a file as text.
+
+        Files written as a compressed envelope (see compression.py) are
+        returned decompressed, so readers never see the envelope.
+        """
+
+    def read_bytes(self, path: str) -> bytes:
+        """Returns the contents of a file as bytes.
+
+        Stores that can, override this to return the raw contents as stored,
+        without decoding envelopes. The default encodes `read`, which holds
+        the same data for every reader, only not compressed.
+        """
+        return self.read(path).encode('utf-8')
+
+    def read_view(self, path: str) -> memoryview:
+        """Returns the raw contents of a file as a read-only buffer.
+
+        Stores that can hand out their own buffers (e.g. memory-mapped files)
+        do so without copying; the default wraps `read_bytes`.
+        """
+        return memoryview(self.read_bytes(path))
+
+    def exists(self, path: str) -> bool:
+        """Returns whether a file exists.
+
+        Stores override this with a metadata lookup; the default reads the
+        file.
+        """
+        try:
+            self.read_bytes(path)
+        except FileNotFoundError:
+            return False
+        return True
 
     @abstractmethod
-    def list(self, path: str) -> list[str]:
-        pass
+    def list(
+        self,
+        path: str,
+        prefix: str | None = None,
+        min_id: int | None = None,
+        max_id: int | None = None,
+    ) -> list[str]:
+        """Lists the entries of a directory, with `/` appended to subdirectories.
+
+        `prefix` keeps only names starting with it. `min_id` and `max_id`
+        keep only names of the form `<id>.<ext>` with the id in that range,
+        e.g. event files. Stores that cannot filter while listing apply
+        `filter_listing` to the full listing.
+        """
 
     @abstractmethod
     def delete(self, path: str) -> None:
         pass
+
+
+def matches_list_filters(
+    name: str,
+    prefix: str | None = None,
+    min_id: int | None = None,
+    max_id: int | None = None,
+) -> bool:
+    """Returns whether an entry name passes the filters of `FileStore.list`."""
+    if prefix is not None and not name.startswith(prefix):
+        return False
+    if min_id is None and max_id is None:
+        return True
+    try:
+        id = int(name.split('.', 1)[0])
+    except ValueError:
+        return False
+    return (min_id is None or id >= min_id) and (max_id is None or id <= max_id)
+
+
+def filter_listing(
+    files: Iterable[str],
+    prefix: str | None = None,
+    min_id: int | None = None,
+    max_id: int | None = None,
+) -> list[str]:
+    """Applies the filters of `FileStore.list` to a full directory listing."""
+    if prefix is None and min_id is None and max_id is None:
+        return list(files)
+    return [
+        f
+        for f in files
+        if matches_list_filters(f.rstrip('/').rsplit('/', 1)[-1], prefix, min_id, max_id)
+    ]
@@ -1,16 +1,69 @@
+import mmap
 import os
 import shutil
+import threading
+import time
+import uuid
+from typing import Iterable
 from openhands.core.logger import openhands_logger as logger
-from openhands.storage.files import FileStore
+from openhands.storage.compression import decompress_text
+from openhands.storage.files import FileStore, matches_list_filters
+
+# Smaller files are read into memory by `read_view`; mapping them costs more
+# than copying.
+MMAP_THRESHOLD_BYTES = 64 * 1024
+
+# Temporary files of atomic writes; hidden from listings.
+_TEMP_PREFIX = '.'
+_TEMP_SUFFIX = '.tmp'
+
 
 class LocalFileStore(FileStore):
+    """Stores files under a local root directory.
+
+    With `atomic_writes`, files are written to a temporary file that is then
+    renamed over the target, so readers and crashes never see a partial file.
+    Writes are not fsynced unless `fsync_batch_size` or `fsync_interval` is
+    set; then written files and their directories are fsynced as a group once
+    that many writes have been made or that many seconds have passed since
+    the first unsynced write, and on `flush`.
+
+    With `listing_cache`, directory listings are kept in memory and updated
+    by this store's own writes and deletes. Changes made to the directory by
+    anything else are not seen, so only enable it for a store that owns its
+    root.
+    """
+
     root: str
+    atomic_writes: bool
+    fsync_batch_size: int | None
+    fsync_interval: float | None
+    listing_cache: bool
 
-    def __init__(self, root: str):
+    def __init__(
+        self,
+        root: str,
+        atomic_writes: bool = True,
+        fsync_batch_size: int | None = None,
+        fsync_interval: float | None = None,
+        listing_cache: bool = False,
+    ):
         if root.startswith('~'):
             root = os.path.expanduser(root)
         self.root = root
+        self.atomic_writes = atomic_writes
+        self.fsync_batch_size = fsync_batch_size
+        self.fsync_interval = fsync_interval
         os.makedirs(self.root, exist_ok=True)
+        self._created_dirs: set[str] = {self.root}
+        self._sync_lock = threading.Lock()
+        self._unsynced_paths: set[str] = set()
+        self._unsynced_writes = 0
+        self._last_sync = time.monotonic()
+        self._sync_timer: threading.Timer | None = None
+        self.listing_cache = listing_cache
+        self._listings: dict[str, dict[str, bool]] = {}
+        self._listings_lock = threading.Lock()
 
     def get_full_path(self, path: str) -> str:
         if path.startswith('/'):
@@ -19,22 +72,193 @@ class LocalFileStore(FileStore):
 
     def write(self, path: str, contents: str | bytes) -> None:
         full_path = self.get_full_path(path)
-        os.makedirs(os.path.dirname(full_path), exist_ok=True)
-        mode = 'w' if isinstance(contents, str) else 'wb'
-        with open(full_path, mode) as f:
-            f.write(contents)
+        if isinstance(contents, str):
+            contents = contents.encode('utf-8')
+        try:
+            self._write_file(full_path, contents)
+        except FileNotFoundError:
+            # The directory was removed behind our back; create it again.
+            self._created_dirs.discard(os.path.dirname(full_path))
+            self._write_file(full_path, contents)
+        if self.listing_cache:
+            self._add_to_listing(full_path)
+        self._record_writes((full_path,))
+
+    def write_many(self, items: Iterable[tuple[str, str | bytes]]) -> None:
+        full_paths = []
+        for path, contents in items:
+            full_path = self.get_full_path(path)
+            if isinstance(contents, str):
+                contents = contents.encode('utf-8')
+            try:
+                self._write_file(full_path, contents)
+            except FileNotFoundError:
+                self._created_dirs.discard(os.path.dirname(full_path))
+                self._write_file(full_path, contents)
+            if self.listing_cache:
+                self._add_to_listing(full_path)
+            full_paths.append(full_path)
+        # Counted together, so a group fsync never splits the batch.
+        self._record_writes(full_paths)
+
+    def _write_file(self, full_path: str, contents: bytes) -> None:
+        directory = os.path.dirname(full_path)
+        if directory not in self._created_dirs:
+            os.makedirs(directory, exist_ok=True)
+            self._created_dirs.add(directory)
+            if self.listing_cache:
+                # Any of the parents may have gained a subdirectory.
+                self._drop_listings(directory, parents=True)
+        if not self.atomic_writes:
+            with open(full_path, 'wb') as f:
+                f.write(contents)
+            return
+        temp_path = os.path.join(
+            directory,
+            f'{_TEMP_PREFIX}{os.path.basename(full_path)}.{uuid.uuid4().hex}{_TEMP_SUFFIX}',
+        )
+        try:
+            with open(temp_path, 'wb') as f:
+                f.write(contents)
+            os.replace(temp_path, full_path)
+        except BaseException:
+            try:
+                os.remove(temp_path)
+            except FileNotFoundError:
+                pass
+            raise
+
+    def _record_writes(self, full_paths: Iterable[str | None]) -> None:
+        """Counts writes towards the next group fsync.
+
+        Each item is the file to fsync, or None for writes that subclasses
+        sync themselves in `flush`.
+        """
+        if self.fsync_batch_size is None and self.fsync_interval is None:
+            return
+        with self._sync_lock:
+            for full_path in full_paths:
+                if full_path is not None:
+                    self._unsynced_paths.add(full_path)
+                self._unsynced_writes += 1
+            due = (
+                self.fsync_batch_size is not None
+                and self._unsynced_writes >= self.fsync_batch_size
+            ) or (
+                self.fsync_interval is not None
+                and time.monotonic() - self._last_sync >= self.fsync_interval
+            )
+            if not due and self.fsync_interval is not None and self._sync_timer is None:
+                self._sync_timer = threading.Timer(self.fsync_interval, self.flush)
+                self._sync_timer.daemon = True
+                self._sync_timer.start()
+        if due:
+            self.flush()
+
+    def flush(self) -> None:
+        """Fsyncs every file written since the last flush, and their directories."""
+        with self._sync_lock:
+            paths, self._unsynced_paths = self._unsynced_paths, set()
+            self._unsynced_writes = 0
+            self._last_sync = time.monotonic()
+            if self._sync_timer is not None:
+                self._sync_timer.cancel()
+                self._sync_timer = None
+        directories = set()
+        for full_path in paths:
+            directories.add(os.path.dirname(full_path))
+            self._fsync(full_path)
+        # Renames and new files are only durable once their directory is.
+        for directory in directories:
+            self._fsync(directory)
+
+    @staticmethod
+    def _fsync(full_path: str) -> None:
+        try:
+            fd = os.open(full_path, os.O_RDONLY)
+        except FileNotFoundError:
+            return
+        try:
+            os.fsync(fd)
+        finally:
+            os.close(fd)
+
+    def close(self) -> None:
+        self.flush()
 
     def read(self, path: str) -> str:
+        return decompress_text(self.read_bytes(path).decode('utf-8'))
+
+    def read_bytes(self, path: str) -> bytes:
         full_path = self.get_full_path(path)
-        with open(full_path, 'r') as f:
+        with open(full_path, 'rb') as f:
             return f.read()
 
-    def list(self, path: str) -> list[str]:
+    def read_view(self, path: str) -> memoryview:
         full_path = self.get_full_path(path)
-        files = [os.path.join(path, f) for f in os.listdir(full_path)]
-        files = [f + '/' if os.path.isdir(self.get_full_path(f)) else f for f in files]
+        with open(full_path, 'rb') as f:
+            if os.fstat(f.fileno()).st_size < MMAP_THRESHOLD_BYTES:
+                return memoryview(f.read())
+            # The mapping stays valid after the file is closed, and is
+            # released once the last view of it is gone.
+            return memoryview(mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ))
+
+    def exists(self, path: str) -> bool:
+        return os.path.isfile(self.get_full_path(path))
+
+    def list(
+        self,
+        path: str,
+        prefix: str | None = None,
+        min_id: int | None = None,
+        max_id: int | None = None,
+    ) -> list[str]:
+        files = []
+        for name, is_dir in self._list_entries(self.get_full_path(path)).items():
+            if not matches_list_filters(name, prefix, min_id, max_id):
+                continue
+            filename = os.path.join(path, name)
+            files.append(filename + '/' if is_dir else filename)
         return files
 
+    def _list_entries(self, full_path: str) -> dict[str, bool]:
+        if not self.listing_cache:
+            return _scan(full_path)
+        key = os.path.normpath(full_path)
+        with self._listings_lock:
+            entries = self._listings.get(key)
+            if entries is None:
+                entries = self._listings[key] = _scan(full_path)
+            # A copy, since writes update the cached entries in place.
+            return dict(entries)
+
+    def _add_to_listing(self, full_path: str) -> None:
+        directory, name = os.path.split(os.path.normpath(full_path))
+        with self._listings_lock:
+            entries = self._listings.get(directory)
+            if entries is not None:
+                entries[name] = False
+
+    def _remove_from_listing(self, full_path: str) -> None:
+        directory, name = os.path.split(os.path.normpath(full_path))
+        with self._listings_lock:
+            entries = self._listings.get(directory)
+            if entries is not None:
+                entries.pop(name, None)
+
+    def _drop_listings(self, full_path: str, parents: bool = False) -> None:
+        """Forgets the listings of a directory and everything below it."""
+        key = os.path.normpath(full_path)
+        with self._listings_lock:
+            for cached in list(self._listings):
+                if cached == key or cached.startswith(key + os.sep):
+                    del self._listings[cached]
+            if parents:
+                root = os.path.normpath(self.root)
+                while key != root and os.sep in key:
+                    key = os.path.dirname(key)
+                    self._listings.pop(key, None)
+
     def delete(self, path: str) -> None:
         try:
             full_path = self.get_full_path(path)
@@ -43,9 +267,31 @@ class LocalFileStore(FileStore):
                 return
             if os.path.isfile(full_path):
                 os.remove(full_path)
+                if self.listing_cache:
+                    self._remove_from_listing(full_path)
                 logger.debug(f'Removed local file: {full_path}')
             elif os.path.isdir(full_path):
                 shutil.rmtree(full_path)
+                if self.listing_cache:
+                    self._drop_listings(full_path)
+                    self._remove_from_listing(full_path)
+                self._created_dirs = {
+                    d
+                    for d in self._created_dirs
+                    if d != full_path and not d.startswith(full_path.rstrip('/') + '/')
+                }
                 logger.debug(f'Removed local directory: {full_path}')
         except Exception as e:
-            logger.error(f'Error clearing local file store: {str(e)}')
\ No newline at end of file
+            logger.error(f'Error clearing local file store: {str(e)}')
+
+def _scan(full_path: str) -> dict[str, bool]:
+    """Maps the names in a directory to whether they are directories."""
+    entries = {}
+    with os.scandir(full_path) as it:
+        for entry in it:
+            if entry.name.startswith(_TEMP_PREFIX) and entry.name.endswith(_TEMP_SUFFIX):
+                continue
+            # Uses the type from the directory entry where the OS provides it,
+            # instead of one stat per file.
+            entries[entry.name] = entry.is_dir()
+    return entries
@@ -8,3 +8,21 @@ def get_conversion_dir(sid: str, user_id: str | None = None) -> str:
 
 def get_conversation_events_dir(sid: str, user_id: str | None = None) -> str:
     return f'{get_conversion_dir(sid, user_id)}events/'
+
+def get_conversation_event_filename(sid: str, id: int, user_id: str | None = None) -> str:
+    return f'{get_conversation_events_dir(sid, user_id)}{id}.json'
+
+def get_conversation_events_manifest_filename(sid: str, user_id: str | None = None) -> str:
+    return f'{get_conversion_dir(sid, user_id)}events_manifest.json'
+
+def get_conversation_event_index_dir(sid: str, user_id: str | None = None) -> str:
+    return f'{get_conversion_dir(sid, user_id)}event_index/'
+
+def get_conversation_text_index_dir(sid: str, user_id: str | None = None) -> str:
+    return f'{get_conversion_dir(sid, user_id)}text_index/'
+
+def get_conversation_blobs_dir(sid: str, user_id: str | None = None) -> str:
+    return f'{get_conversion_dir(sid, user_id)}blobs/'
+
+def get_conversation_state_checkpoint_filename(sid: str, user_id: str | None = None) -> str:
+    return f'{get_conversion_dir(sid, user_id)}state_checkpoint.pkl'
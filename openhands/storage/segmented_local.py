@@ -0,0 +1,425 @@
+import mmap
+import os
+import re
+import shutil
+import struct
+import threading
+from collections import OrderedDict
+from typing import Iterable
+
+from openhands.core.logger import openhands_logger as logger
+from openhands.storage.local import LocalFileStore
+
+SEGMENTS_DIR_NAME = 'event_segments'
+DEFAULT_SEGMENT_SIZE_BYTES = 64 * 1024 * 1024
+# Each open conversation holds its log, index and read file descriptors, so
+# only this many are kept open at a time.
+DEFAULT_MAX_OPEN_LOGS = 128
+
+_EVENT_PATH_RE = re.compile(r'^(?P<conversation>(?:.*/)?)events/(?P<id>\d+)\.json$')
+_EVENTS_DIR_RE = re.compile(r'^(?P<conversation>(?:.*/)?)events/?$')
+
+# Every record in a segment is a header followed by the event JSON. A length
+# of -1 marks a tombstone left behind by `delete`.
+_RECORD_HEADER = struct.Struct('<qi')
+# The offset index maps an event id to the payload of its latest record.
+_INDEX_ENTRY = struct.Struct('<qqi')
+_TOMBSTONE = -1
+
+
+class _Segment:
+    number: int
+    log_path: str
+    index_path: str
+    size: int
+    indexed_size: int
+    # Number of events whose latest record is in this segment.
+    live: int
+
+    def __init__(self, directory: str, number: int):
+        self.number = number
+        self.log_path = os.path.join(directory, f'{number}.log')
+        self.index_path = os.path.join(directory, f'{number}.idx')
+        self.size = 0
+        self.indexed_size = 0
+        self.live = 0
+
+
+class _EventLog:
+    """Append-only segments plus offset index for one conversation's events."""
+
+    directory: str
+    offsets: dict[int, tuple[_Segment, int, int]]
+    segments: list[_Segment]
+
+    def __init__(self, directory: str, events_dir: str, segment_size: int):
+        self.directory = directory
+        self.events_dir = events_dir
+        self.segment_size = segment_size
+        self.offsets = {}
+        self.segments = []
+        self._log_file = None
+        self._index_file = None
+        self._read_fds: dict[int, int] = {}
+        self._maps: dict[int, mmap.mmap] = {}
+        self._dirty = False
+        self._load()
+
+    def _load(self) -> None:
+        if not os.path.isdir(self.directory):
+            return
+        numbers = sorted(
+            int(name[: -len('.log')])
+            for name in os.listdir(self.directory)
+            if name.endswith('.log') and name[: -len('.log')].isdigit()
+        )
+        for number in numbers:
+            segment = _Segment(self.directory, number)
+            self._load_segment(segment)
+            self.segments.append(segment)
+        self.reclaim()
+
+    def _load_segment(self, segment: _Segment) -> None:
+        segment.size = os.path.getsize(segment.log_path)
+        if os.path.exists(segment.index_path):
+            with open(segment.index_path, 'rb') as f:
+                index = f.read()
+            usable = len(index) - len(index) % _INDEX_ENTRY.size
+            for event_id, offset, length in _INDEX_ENTRY.iter_unpack(index[:usable]):
+                end = offset + max(length, 0)
+                if end > segment.size:
+                    break
+                self._apply(event_id, segment, offset, length)
+                segment.indexed_size = max(segment.indexed_size, end)
+
+        # Records appended after the last index flush are recovered from their
+        # headers, and a torn record at the tail is cut off.
+        recovered = []
+        position = segment.indexed_size
+        with open(segment.log_path, 'rb') as f:
+            f.seek(position)
+            while True:
+                header = f.read(_RECORD_HEADER.size)
+                if len(header) < _RECORD_HEADER.size:
+                    break
+                event_id, length = _RECORD_HEADER.unpack(header)
+                payload_offset = position + _RECORD_HEADER.size
+                if payload_offset + max(length, 0) > segment.size:
+                    break
+                f.seek(max(length, 0), os.SEEK_CUR)
+                self._apply(event_id, segment, payload_offset, length)
+                recovered.append(_INDEX_ENTRY.pack(event_id, payload_offset, length))
+                position = payload_offset + max(length, 0)
+
+        if position < segment.size:
+            logger.warning(
+                f'Truncating torn record in {segment.log_path} at offset {position}'
+            )
+            with open(segment.log_path, 'r+b') as f:
+                f.truncate(position)
+            segment.size = position
+        if recovered:
+            with open(segment.index_path, 'ab') as f:
+                f.write(b''.join(recovered))
+        segment.indexed_size = position
+
+    def _apply(self, event_id: int, segment: _Segment, offset: int, length: int) -> None:
+        previous = self.offsets.pop(event_id, None)
+        if previous is not None:
+            previous[0].live -= 1
+        if length != _TOMBSTONE:
+            self.offsets[event_id] = (segment, offset, length)
+            segment.live += 1
+
+    def reclaim(self) -> None:
+        """Removes the oldest segments once none of their events are live.
+
+        Only whole segments at the start are removed: the tombstones in a
+        segment may hide records of earlier ones, which must not come back.
+        """
+        while len(self.segments) > 1 and self.segments[0].live == 0:
+            segment = self.segments.pop(0)
+            fd = self._read_fds.pop(segment.number, None)
+            if fd is not None:
+                os.close(fd)
+            self._maps.pop(segment.number, None)
+            for path in (segment.log_path, segment.index_path):
+                try:
+                    os.remove(path)
+                except FileNotFoundError:
+                    pass
+
+    def _active_segment(self) -> _Segment:
+        if self.segments and self.segments[-1].size < self.segment_size:
+            segment = self.segments[-1]
+        else:
+            number = self.segments[-1].number + 1 if self.segments else 0
+            # Records still waiting for the group fsync would otherwise lose
+            # it once their segment is closed.
+            self.sync()
+            self._close_files()
+            os.makedirs(self.directory, exist_ok=True)
+            # Keep the events directory around so listings look the same as
+            # with one file per event.
+            os.makedirs(self.events_dir, exist_ok=True)
+            segment = _Segment(self.directory, number)
+            self.segments.append(segment)
+        if self._log_file is None:
+            self._log_file = open(segment.log_path, 'ab')
+            self._index_file = open(segment.index_path, 'ab')
+        return segment
+
+    def append(self, event_id: int, payload: bytes | None) -> None:
+        segment = self._active_segment()
+        length = _TOMBSTONE if payload is None else len(payload)
+        offset = segment.size + _RECORD_HEADER.size
+        record = _RECORD_HEADER.pack(event_id, length)
+        if payload is not None:
+            record += payload
+        # A single write per event; the index entry stays buffered until the
+        # next flush since it can always be rebuilt from the record headers.
+        self._log_file.write(record)
+        self._log_file.flush()
+        self._index_file.write(_INDEX_ENTRY.pack(event_id, offset, length))
+        segment.size += len(record)
+        self._apply(event_id, segment, offset, length)
+        self._dirty = True
+        if payload is None:
+            self.reclaim()
+
+    def read(self, event_id: int) -> bytes | None:
+        location = self.offsets.get(event_id)
+        if location is None:
+            return None
+        segment, offset, length = location
+        return os.pread(self._get_read_fd(segment), length, offset)
+
+    def read_view(self, event_id: int) -> memoryview | None:
+        location = self.offsets.get(event_id)
+        if location is None:
+            return None
+        segment, offset, length = location
+        if length == 0:
+            return memoryview(b'')
+        mapped = self._maps.get(segment.number)
+        if mapped is None or offset + length > len(mapped):
+            # The active segment grows; map it again to see the new records.
+            # Views of the old mapping keep it alive until they are released.
+            mapped = mmap.mmap(self._get_read_fd(segment), 0, access=mmap.ACCESS_READ)
+            self._maps[segment.number] = mapped
+        return memoryview(mapped)[offset : offset + length]
+
+    def _get_read_fd(self, segment: _Segment) -> int:
+        fd = self._read_fds.get(segment.number)
+        if fd is None:
+            fd = os.open(segment.log_path, os.O_RDONLY)
+            self._read_fds[segment.number] = fd
+        return fd
+
+    def sync(self) -> None:
+        if not self._dirty or self._log_file is None:
+            return
+        self._log_file.flush()
+        self._index_file.flush()
+        os.fsync(self._log_file.fileno())
+        os.fsync(self._index_file.fileno())
+        self.segments[-1].indexed_size = self.segments[-1].size
+        self._dirty = False
+
+    def _close_files(self) -> None:
+        if self._log_file is not None:
+            self._log_file.close()
+            self._index_file.close()
+            self._log_file = None
+            self._index_file = None
+
+    def close(self) -> None:
+        self._close_files()
+        for fd in self._read_fds.values():
+            os.close(fd)
+        self._read_fds = {}
+        # Not closed explicitly, since callers may still hold views of them.
+        self._maps = {}
+
+
+class SegmentedLocalFileStore(LocalFileStore):
+    """A LocalFileStore that appends event files to per-conversation segments.
+
+    Writes to `<conversation>/events/<id>.json` go to append-only segment files
+    under `<conversation>/event_segments/` instead of one file per event. Reads
+    and listings of the events directory merge the segments with any per-event
+    files written by the plain layout, so existing conversations keep working.
+    All other paths behave exactly like LocalFileStore.
+
+    Deleting an event appends a tombstone, and the oldest segments are removed
+    once all of their events are deleted, e.g. after compaction into cache
+    pages. Events deleted out of order keep their segment until the events
+    before them are deleted too. At most `max_open_logs` conversations keep
+    their segment files open; the least recently used one is closed first.
+    """
+
+    segment_size: int
+    max_open_logs: int
+
+    def __init__(
+        self,
+        root: str,
+        segment_size: int = DEFAULT_SEGMENT_SIZE_BYTES,
+        fsync_batch_size: int | None = None,
+        fsync_interval: float | None = None,
+        max_open_logs: int = DEFAULT_MAX_OPEN_LOGS,
+    ):
+        super().__init__(
+            root, fsync_batch_size=fsync_batch_size, fsync_interval=fsync_interval
+        )
+        self.segment_size = segment_size
+        self.max_open_logs = max_open_logs
+        self._logs: OrderedDict[str, _EventLog] = OrderedDict()
+        self._lock = threading.RLock()
+
+    def _get_log(self, conversation_dir: str) -> _EventLog:
+        log = self._logs.get(conversation_dir)
+        if log is None:
+            directory = self.get_full_path(conversation_dir + SEGMENTS_DIR_NAME)
+            events_dir = self.get_full_path(conversation_dir + 'events')
+            log = _EventLog(directory, events_dir, self.segment_size)
+            self._logs[conversation_dir] = log
+            while len(self._logs) > self.max_open_logs:
+                _, evicted = self._logs.popitem(last=False)
+                evicted.sync()
+                evicted.close()
+        else:
+            self._logs.move_to_end(conversation_dir)
+        return log
+
+    @staticmethod
+    def _normalize(path: str) -> str:
+        return path[1:] if path.startswith('/') else path
+
+    def write(self, path: str, contents: str | bytes) -> None:
+        match = _EVENT_PATH_RE.match(self._normalize(path))
+        if match is None:
+            super().write(path, contents)
+            return
+        if isinstance(contents, str):
+            contents = contents.encode('utf-8')
+        with self._lock:
+            self._get_log(match['conversation']).append(int(match['id']), contents)
+        self._record_writes((None,))
+
+    def write_many(self, items: Iterable[tuple[str, str | bytes]]) -> None:
+        other_items = []
+        event_writes = 0
+        with self._lock:
+            for path, contents in items:
+                match = _EVENT_PATH_RE.match(self._normalize(path))
+                if match is None:
+                    other_items.append((path, contents))
+                    continue
+                if isinstance(contents, str):
+                    contents = contents.encode('utf-8')
+                self._get_log(match['conversation']).append(int(match['id']), contents)
+                event_writes += 1
+        # Events are appended first: the other files of a commit (manifest,
+        # cache pages) describe events and must not get ahead of them.
+        if other_items:
+            super().write_many(other_items)
+        self._record_writes([None] * event_writes)
+
+    def read_bytes(self, path: str) -> bytes:
+        match = _EVENT_PATH_RE.match(self._normalize(path))
+        if match is not None:
+            with self._lock:
+                payload = self._get_log(match['conversation']).read(int(match['id']))
+            if payload is not None:
+                return payload
+        return super().read_bytes(path)
+
+    def read_view(self, path: str) -> memoryview:
+        match = _EVENT_PATH_RE.match(self._normalize(path))
+        if match is not None:
+            with self._lock:
+                view = self._get_log(match['conversation']).read_view(int(match['id']))
+            if view is not None:
+                return view
+        return super().read_view(path)
+
+    def exists(self, path: str) -> bool:
+        match = _EVENT_PATH_RE.match(self._normalize(path))
+        if match is not None:
+            with self._lock:
+                if int(match['id']) in self._get_log(match['conversation']).offsets:
+                    return True
+        return super().exists(path)
+
+    def list(
+        self,
+        path: str,
+        prefix: str | None = None,
+        min_id: int | None = None,
+        max_id: int | None = None,
+    ) -> list[str]:
+        match = _EVENTS_DIR_RE.match(self._normalize(path))
+        if match is None:
+            return super().list(path, prefix, min_id, max_id)
+        with self._lock:
+            event_ids = [
+                event_id
+                for event_id in self._get_log(match['conversation']).offsets
+                if (min_id is None or event_id >= min_id)
+                and (max_id is None or event_id <= max_id)
+                and (prefix is None or f'{event_id}.json'.startswith(prefix))
+            ]
+        try:
+            files = super().list(path, prefix, min_id, max_id)
+        except FileNotFoundError:
+            if not event_ids:
+                raise
+            files = []
+        prefix = path if path.endswith('/') else path + '/'
+        seen = set(files)
+        for event_id in event_ids:
+            filename = f'{prefix}{event_id}.json'
+            if filename not in seen:
+                files.append(filename)
+        return files
+
+    def delete(self, path: str) -> None:
+        normalized = self._normalize(path)
+        match = _EVENT_PATH_RE.match(normalized)
+        if match is not None:
+            with self._lock:
+                log = self._get_log(match['conversation'])
+                if int(match['id']) in log.offsets:
+                    log.append(int(match['id']), None)
+            super().delete(path)
+            return
+
+        with self._lock:
+            events_dir_match = _EVENTS_DIR_RE.match(normalized)
+            prefix = normalized.rstrip('/') + '/' if normalized else ''
+            for conversation_dir in list(self._logs):
+                if conversation_dir.startswith(prefix) or (
+                    events_dir_match is not None
+                    and conversation_dir == events_dir_match['conversation']
+                ):
+                    self._logs.pop(conversation_dir).close()
+            if events_dir_match is not None:
+                segments_dir = self.get_full_path(
+                    events_dir_match['conversation'] + SEGMENTS_DIR_NAME
+                )
+                shutil.rmtree(segments_dir, ignore_errors=True)
+        super().delete(path)
+
+    def flush(self) -> None:
+        with self._lock:
+            for log in self._logs.values():
+                log.sync()
+        super().flush()
+
+    def close(self) -> None:
+        with self._lock:
+            self.flush()
+            for log in self._logs.values():
+                log.close()
+            self._logs = OrderedDict()
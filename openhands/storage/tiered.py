@@ -0,0 +1,292 @@
+import re
+import threading
+import time
+from contextlib import contextmanager
+from typing import Callable, Iterable, Iterator
+
+from openhands.core.logger import openhands_logger as logger
+from openhands.storage.compaction import DEFAULT_PAGE_SIZE, compact_events, list_files
+from openhands.storage.files import FileStore
+from openhands.storage.locations import CONVERSATION_BASE_DIR
+
+DEFAULT_IDLE_SECONDS = 60 * 60
+DEFAULT_MIGRATE_INTERVAL_SECONDS = 60
+# Conversations are copied between the tiers in batches of about this many
+# bytes, so only one batch is held in memory at a time.
+COPY_BATCH_BYTES = 8 * 1024 * 1024
+
+_CONVERSATION_DIR_RE = re.compile(
+    rf'^(?P<conversation>(?:{CONVERSATION_BASE_DIR}|users/[^/]+/conversations)/[^/]+/)'
+)
+
+
+def get_conversation_dir_of(path: str) -> str | None:
+    """Returns the conversation directory a path is in, as in locations.py."""
+    match = _CONVERSATION_DIR_RE.match(path.lstrip('/'))
+    return match['conversation'] if match is not None else None
+
+
+class TieredFileStore(FileStore):
+    """Keeps active conversations in a hot store and idle ones in a cold one.
+
+    Paths inside a conversation directory are routed to wherever that
+    conversation lives. A conversation in the cold store is copied to the hot
+    store as soon as any of its paths is accessed, so it is served locally
+    from then on. A background migrator moves conversations that have not
+    been accessed for `idle_seconds` back to the cold store, first compacting
+    their per-event files into cache pages so fewer, larger files move.
+    Paths outside conversations always use the cold store. `on_delete` is
+    called with the deleted directory whenever a conversation directory, or
+    one above it, is deleted, e.g. to forget what was cached about them.
+    """
+
+    hot: FileStore
+    cold: FileStore
+    idle_seconds: float
+    on_delete: Callable[[str], None] | None
+
+    def __init__(
+        self,
+        hot: FileStore,
+        cold: FileStore,
+        idle_seconds: float = DEFAULT_IDLE_SECONDS,
+        migrate_interval: float | None = DEFAULT_MIGRATE_INTERVAL_SECONDS,
+        on_delete: Callable[[str], None] | None = None,
+    ):
+        self.hot = hot
+        self.cold = cold
+        self.idle_seconds = idle_seconds
+        self.on_delete = on_delete
+        # Hot conversation dir -> time of the last access.
+        self._last_access: dict[str, float] = {}
+        self._locks: dict[str, threading.RLock] = {}
+        self._lock = threading.Lock()
+        self._discover_hot()
+        self._stop = threading.Event()
+        self._migrator: threading.Thread | None = None
+        if migrate_interval is not None:
+            self._migrator = threading.Thread(
+                target=self._run_migrator,
+                args=(migrate_interval,),
+                name='tiered-store-migrator',
+                daemon=True,
+            )
+            self._migrator.start()
+
+    def promote(self, conversation_dir: str) -> None:
+        """Copies a cold conversation to the hot store.
+
+        The conversation is locked meanwhile, since it cannot be used before
+        its files are in the hot store.
+        """
+        with self._conversation_lock(conversation_dir):
+            if conversation_dir in self._last_access:
+                return
+            files = list_files(self.cold, conversation_dir)
+            if files:
+                _copy_files(self.cold, self.hot, files)
+                logger.debug(f'Promoted {conversation_dir} ({len(files)} files)')
+            with self._lock:
+                self._last_access[conversation_dir] = time.monotonic()
+
+    def demote(self, conversation_dir: str) -> bool:
+        """Compacts a hot conversation and moves it to the cold store.
+
+        The files are copied without locking the conversation, which stays
+        usable from the hot store meanwhile. If it is accessed before the
+        copy is done, it stays hot and False is returned.
+        """
+        with self._lock:
+            started = self._last_access.get(conversation_dir)
+        if started is None:
+            return False
+        # Pages of cache_size events, the only ones EventStore can find.
+        compact_events(self.hot, conversation_dir, DEFAULT_PAGE_SIZE)
+        files = list_files(self.hot, conversation_dir)
+        _copy_files(self.hot, self.cold, files)
+        # Files compacted away since the last promotion are stale now.
+        stale = set(list_files(self.cold, conversation_dir)) - set(files)
+        with self._conversation_lock(conversation_dir):
+            with self._lock:
+                if self._last_access.get(conversation_dir) != started:
+                    return False
+            for path in stale:
+                self.cold.delete(path)
+            self.hot.delete(conversation_dir)
+            with self._lock:
+                del self._last_access[conversation_dir]
+        logger.debug(f'Demoted {conversation_dir} ({len(files)} files)')
+        return True
+
+    def migrate_idle(self) -> list[str]:
+        """Demotes every conversation idle for `idle_seconds`; returns them."""
+        now = time.monotonic()
+        with self._lock:
+            idle = [
+                conversation_dir
+                for conversation_dir, last_access in self._last_access.items()
+                if now - last_access >= self.idle_seconds
+            ]
+        demoted = []
+        for conversation_dir in idle:
+            # Skip conversations that were used while we were busy.
+            with self._lock:
+                last_access = self._last_access.get(conversation_dir)
+            if (
+                last_access is None
+                or time.monotonic() - last_access < self.idle_seconds
+            ):
+                continue
+            try:
+                if self.demote(conversation_dir):
+                    demoted.append(conversation_dir)
+            except Exception as e:
+                logger.error(f'Failed to demote {conversation_dir}: {e}')
+        return demoted
+
+    def write(self, path: str, contents: str | bytes) -> None:
+        conversation_dir = get_conversation_dir_of(path)
+        if conversation_dir is None:
+            self.cold.write(path, contents)
+            return
+        with self._use(conversation_dir):
+            self.hot.write(path, contents)
+
+    def write_many(self, items: Iterable[tuple[str, str | bytes]]) -> None:
+        hot_items = []
+        cold_items = []
+        for path, contents in items:
+            conversation_dir = get_conversation_dir_of(path)
+            if conversation_dir is None:
+                cold_items.append((path, contents))
+            else:
+                hot_items.append((conversation_dir, path, contents))
+        conversation_dirs = dict.fromkeys(c for c, _, _ in hot_items)
+        for conversation_dir in conversation_dirs:
+            with self._use(conversation_dir):
+                self.hot.write_many(
+                    (path, contents)
+                    for c, path, contents in hot_items
+                    if c == conversation_dir
+                )
+        if cold_items:
+            self.cold.write_many(cold_items)
+
+    def read(self, path: str) -> str:
+        conversation_dir = get_conversation_dir_of(path)
+        if conversation_dir is None:
+            return self.cold.read(path)
+        with self._use(conversation_dir):
+            return self.hot.read(path)
+
+    def read_bytes(self, path: str) -> bytes:
+        conversation_dir = get_conversation_dir_of(path)
+        if conversation_dir is None:
+            return self.cold.read_bytes(path)
+        with self._use(conversation_dir):
+            return self.hot.read_bytes(path)
+
+    def exists(self, path: str) -> bool:
+        conversation_dir = get_conversation_dir_of(path)
+        if conversation_dir is None:
+            return self.cold.exists(path)
+        with self._use(conversation_dir):
+            return self.hot.exists(path)
+
+    def list(
+        self,
+        path: str,
+        prefix: str | None = None,
+        min_id: int | None = None,
+        max_id: int | None = None,
+    ) -> list[str]:
+        conversation_dir = get_conversation_dir_of(path)
+        if conversation_dir is not None:
+            with self._use(conversation_dir):
+                return self.hot.list(path, prefix, min_id, max_id)
+        # Above conversation level, e.g. listing all conversations.
+        files: dict[str, None] = {}
+        for store in (self.hot, self.cold):
+            try:
+                files.update(dict.fromkeys(store.list(path, prefix, min_id, max_id)))
+            except FileNotFoundError:
+                pass
+        if not files:
+            raise FileNotFoundError(path)
+        return [*files]
+
+    def delete(self, path: str) -> None:
+        conversation_dir = get_conversation_dir_of(path)
+        if conversation_dir is None:
+            self.hot.delete(path)
+            self.cold.delete(path)
+            with self._lock:
+                prefix = path.strip('/') + '/'
+                for hot_dir in [*self._last_access]:
+                    if hot_dir.startswith(prefix):
+                        del self._last_access[hot_dir]
+            self._deleted(prefix)
+            return
+        with self._conversation_lock(conversation_dir):
+            # Old copies in the cold store must not come back on promotion.
+            self.hot.delete(path)
+            self.cold.delete(path)
+        if path.strip('/') + '/' == conversation_dir:
+            self._deleted(conversation_dir)
+
+    def close(self) -> None:
+        self._stop.set()
+        if self._migrator is not None:
+            self._migrator.join()
+
+    @contextmanager
+    def _use(self, conversation_dir: str) -> Iterator[None]:
+        """Locks a conversation for one access, promoting it first if needed."""
+        with self._conversation_lock(conversation_dir):
+            if conversation_dir not in self._last_access:
+                self.promote(conversation_dir)
+            with self._lock:
+                self._last_access[conversation_dir] = time.monotonic()
+            yield
+
+    def _deleted(self, path: str) -> None:
+        if self.on_delete is not None:
+            self.on_delete(path)
+
+    def _conversation_lock(self, conversation_dir: str) -> threading.RLock:
+        with self._lock:
+            lock = self._locks.get(conversation_dir)
+            if lock is None:
+                lock = self._locks[conversation_dir] = threading.RLock()
+            return lock
+
+    def _discover_hot(self) -> None:
+        # Conversations left in the hot store by an earlier process count as
+        # accessed now, so they are demoted once idle like any other.
+        now = time.monotonic()
+        for root in (f'{CONVERSATION_BASE_DIR}/', 'users/'):
+            for path in list_files(self.hot, root):
+                conversation_dir = get_conversation_dir_of(path)
+                if conversation_dir is not None:
+                    self._last_access.setdefault(conversation_dir, now)
+
+    def _run_migrator(self, interval: float) -> None:
+        while not self._stop.wait(interval):
+            demoted = self.migrate_idle()
+            if demoted:
+                logger.info(f'Moved {len(demoted)} idle conversations to cold storage')
+
+
+def _copy_files(source: FileStore, target: FileStore, files: list[str]) -> None:
+    batch: list[tuple[str, bytes]] = []
+    batch_bytes = 0
+    for path in files:
+        contents = source.read_bytes(path)
+        batch.append((path, contents))
+        batch_bytes += len(contents)
+        if batch_bytes >= COPY_BATCH_BYTES:
+            target.write_many(batch)
+            batch = []
+            batch_bytes = 0
+    if batch:
+        target.write_many(batch)
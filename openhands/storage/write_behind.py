@@ -0,0 +1,194 @@
+import itertools
+import queue
+import threading
+import time
+from typing import Iterable
+
+from openhands.core.logger import openhands_logger as logger
+from openhands.storage.compression import decompress_text
+from openhands.storage.files import FileStore
+
+_STOP = object()
+
+DEFAULT_MAX_RETRIES = 3
+DEFAULT_RETRY_BACKOFF_SECONDS = 0.1
+
+
+class WriteBehindFileStore(FileStore):
+    """Wraps a FileStore so that writes happen on a background thread.
+
+    `write` only records the contents and enqueues the path, so callers never
+    wait on the underlying store (a network round trip for S3, GCS or web hook
+    stores) unless the queue is full. The writer drains up to `max_batch_size`
+    paths at a time and only writes the latest contents of each path. Reads of
+    pending paths are served from memory; `list` and `delete` first flush so
+    they always see a consistent store.
+
+    A failed batch is retried with exponential backoff up to `max_retries`
+    times. If it still fails, its files stay pending, later writes raise
+    right away, and `flush` tries those files once more and raises if they
+    fail again.
+    """
+
+    file_store: FileStore
+    max_batch_size: int
+    max_retries: int
+    retry_backoff_seconds: float
+
+    def __init__(
+        self,
+        file_store: FileStore,
+        max_pending_writes: int = 1000,
+        max_batch_size: int = 100,
+        max_retries: int = DEFAULT_MAX_RETRIES,
+        retry_backoff_seconds: float = DEFAULT_RETRY_BACKOFF_SECONDS,
+    ):
+        self.file_store = file_store
+        self.max_batch_size = max_batch_size
+        self.max_retries = max_retries
+        self.retry_backoff_seconds = retry_backoff_seconds
+        self._pending: dict[str, tuple[int, str | bytes]] = {}
+        self._pending_lock = threading.Lock()
+        self._sequence = itertools.count()
+        self._queue: queue.Queue = queue.Queue(maxsize=max_pending_writes)
+        self._error: Exception | None = None
+        # Pending paths whose writes failed after all retries.
+        self._failed: set[str] = set()
+        self._closed = False
+        self._thread = threading.Thread(target=self._run, daemon=True)
+        self._thread.start()
+
+    def write(self, path: str, contents: str | bytes) -> None:
+        self.write_many(((path, contents),))
+
+    def write_many(self, items: Iterable[tuple[str, str | bytes]]) -> None:
+        if self._closed:
+            raise RuntimeError('Cannot write to a closed WriteBehindFileStore')
+        if self._error is not None:
+            raise RuntimeError(
+                'Earlier background writes failed; flush to retry them'
+            ) from self._error
+        queued = []
+        with self._pending_lock:
+            for path, contents in items:
+                seq = next(self._sequence)
+                self._pending[path] = (seq, contents)
+                queued.append((path, seq))
+        # Blocks when the writer falls behind, which is the backpressure.
+        for item in queued:
+            self._queue.put(item)
+
+    def read(self, path: str) -> str:
+        with self._pending_lock:
+            pending = self._pending.get(path)
+        if pending is not None:
+            contents = pending[1]
+            if isinstance(contents, bytes):
+                contents = contents.decode('utf-8')
+            return decompress_text(contents)
+        return self.file_store.read(path)
+
+    def read_bytes(self, path: str) -> bytes:
+        with self._pending_lock:
+            pending = self._pending.get(path)
+        if pending is not None:
+            contents = pending[1]
+            return contents if isinstance(contents, bytes) else contents.encode('utf-8')
+        return self.file_store.read_bytes(path)
+
+    def exists(self, path: str) -> bool:
+        with self._pending_lock:
+            if path in self._pending:
+                return True
+        return self.file_store.exists(path)
+
+    def list(
+        self,
+        path: str,
+        prefix: str | None = None,
+        min_id: int | None = None,
+        max_id: int | None = None,
+    ) -> list[str]:
+        self.flush()
+        return self.file_store.list(path, prefix, min_id, max_id)
+
+    def delete(self, path: str) -> None:
+        self.flush()
+        self.file_store.delete(path)
+
+    def flush(self) -> None:
+        """Blocks until every write issued so far has reached the wrapped store."""
+        self._queue.join()
+        if self._error is None:
+            return
+        # Failed writes get one more round of retries before giving up.
+        with self._pending_lock:
+            failed, self._failed = self._failed, set()
+            retries = [(path, self._pending[path][0]) for path in failed]
+            self._error = None
+        for item in retries:
+            self._queue.put(item)
+        self._queue.join()
+        if self._error is not None:
+            raise self._error
+
+    def close(self) -> None:
+        if self._closed:
+            return
+        self._closed = True
+        try:
+            self.flush()
+        finally:
+            self._queue.put(_STOP)
+            self._thread.join()
+
+    def _run(self) -> None:
+        while True:
+            batch = [self._queue.get()]
+            while len(batch) < self.max_batch_size:
+                try:
+                    batch.append(self._queue.get_nowait())
+                except queue.Empty:
+                    break
+            stop = _STOP in batch
+            # Only the newest contents of each path are written.
+            paths = dict.fromkeys(item[0] for item in batch if item is not _STOP)
+            try:
+                self._write_batch(paths)
+            finally:
+                for _ in batch:
+                    self._queue.task_done()
+            if stop:
+                return
+
+    def _write_batch(self, paths: Iterable[str]) -> None:
+        batch = []
+        with self._pending_lock:
+            for path in paths:
+                pending = self._pending.get(path)
+                if pending is not None:
+                    batch.append((path, pending))
+        if not batch:
+            return
+        for attempt in range(self.max_retries + 1):
+            try:
+                # One call, so the wrapped store can commit the batch together.
+                self.file_store.write_many(
+                    [(path, contents) for path, (_, contents) in batch]
+                )
+                break
+            except Exception as e:
+                if attempt < self.max_retries:
+                    time.sleep(self.retry_backoff_seconds * 2**attempt)
+                    continue
+                logger.error(f'Error writing {len(batch)} files in background: {e}')
+                # Kept pending, so nothing is lost and flush can retry them.
+                with self._pending_lock:
+                    self._failed.update(path for path, _ in batch)
+                    if self._error is None:
+                        self._error = e
+                return
+        with self._pending_lock:
+            for path, (seq, _) in batch:
+                if self._pending.get(path, (None,))[0] == seq:
+                    del self._pending[path]
@@ -0,0 +1,86 @@
+"""Event loop responsiveness of a server that saves events through a file store.
+
+Simulates conversations saving events and reloading them, the way a server
+handler would, while a heartbeat task measures how late the event loop runs
+it. Compares calling LocalFileStore directly on the loop with wrapping it in
+SyncToAsyncFileStore. Run with:
+python -m openhands.tests.benchmarks.bench_async_file_store
+"""
+
+import asyncio
+import json
+import tempfile
+import time
+
+from openhands.storage.async_files import SyncToAsyncFileStore
+from openhands.storage.local import LocalFileStore
+
+CONVERSATIONS = 20
+EVENTS_PER_CONVERSATION = 50
+HEARTBEAT_SECONDS = 0.001
+
+
+def _event(i: int) -> str:
+    return json.dumps({'id': i, 'observation': 'run', 'content': 'output\n' * 200})
+
+
+async def _conversation_on_loop(store: LocalFileStore, sid: str) -> None:
+    # Blocking calls made from a coroutine, as if the store were used directly.
+    for i in range(EVENTS_PER_CONVERSATION):
+        store.write(f'sessions/{sid}/events/{i}.json', _event(i))
+        await asyncio.sleep(0)
+    for path in store.list(f'sessions/{sid}/events/'):
+        store.read(path)
+        await asyncio.sleep(0)
+
+
+async def _conversation_async(store: SyncToAsyncFileStore, sid: str) -> None:
+    for i in range(EVENTS_PER_CONVERSATION):
+        await store.awrite(f'sessions/{sid}/events/{i}.json', _event(i))
+    for path in await store.alist(f'sessions/{sid}/events/'):
+        await store.aread(path)
+
+
+async def _run(conversation, store) -> tuple[float, float, float]:
+    lags: list[float] = []
+    done = asyncio.Event()
+
+    async def heartbeat() -> None:
+        while not done.is_set():
+            start = time.perf_counter()
+            await asyncio.sleep(HEARTBEAT_SECONDS)
+            lags.append(time.perf_counter() - start - HEARTBEAT_SECONDS)
+
+    beat = asyncio.create_task(heartbeat())
+    start = time.perf_counter()
+    await asyncio.gather(*(conversation(store, f'c{i}') for i in range(CONVERSATIONS)))
+    elapsed = time.perf_counter() - start
+    done.set()
+    await beat
+    lags.sort()
+    p99 = lags[int(len(lags) * 0.99)] if lags else 0.0
+    return elapsed * 1000, p99 * 1000, (lags[-1] if lags else 0.0) * 1000
+
+
+def main() -> None:
+    for fsync in (False, True):
+        kwargs = {'fsync_batch_size': 1} if fsync else {}
+        with tempfile.TemporaryDirectory() as root:
+            result = asyncio.run(
+                _run(_conversation_on_loop, LocalFileStore(root, **kwargs))
+            )
+            print(f'fsync={fsync!s:5s} on loop   total {result[0]:8.1f}ms  '
+                  f'loop lag p99 {result[1]:6.2f}ms max {result[2]:6.2f}ms')
+        with tempfile.TemporaryDirectory() as root:
+            result = asyncio.run(
+                _run(
+                    _conversation_async,
+                    SyncToAsyncFileStore(LocalFileStore(root, **kwargs)),
+                )
+            )
+            print(f'fsync={fsync!s:5s} executor  total {result[0]:8.1f}ms  '
+                  f'loop lag p99 {result[1]:6.2f}ms max {result[2]:6.2f}ms')
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,139 @@
+"""Resuming a conversation by full replay vs. from a State checkpoint.
+
+Writes conversations of increasing length in the layout EventStream uses
+(per-event files and 25 event cache pages) with a checkpoint every
+DEFAULT_CHECKPOINT_INTERVAL events, then times rebuilding the state by
+replaying every event and by restoring the checkpoint and replaying the
+rest. The restored history is read lazily, so resuming and then reading the
+last few events is timed as well. Also times saving one checkpoint, which
+keeps only the ids of the history, and pickling the whole state with its
+history for comparison. Run with:
+python -m openhands.tests.benchmarks.bench_controller_resume
+"""
+
+import asyncio
+import base64
+import json
+import pickle
+import tempfile
+import time
+from dataclasses import dataclass, field
+
+from openhands.controller.checkpoint import (
+    DEFAULT_CHECKPOINT_INTERVAL,
+    StateCheckpointer,
+)
+from openhands.events.event_store import EventStore
+from openhands.storage.local import LocalFileStore
+
+HISTORY_LENGTHS = (250, 1000, 5000, 20000)
+CACHE_SIZE = 25
+# Events a resumed controller typically looks at first, e.g. for stuck checks.
+RECENT_EVENTS = 20
+# Events after the last checkpoint, as when a conversation stopped between two.
+UNCHECKPOINTED_EVENTS = DEFAULT_CHECKPOINT_INTERVAL // 2
+
+
+@dataclass
+class _State:
+    history: list = field(default_factory=list)
+
+
+def _apply(state: _State, event) -> None:
+    state.history.append(event)
+
+
+def _event(i: int) -> dict:
+    return {
+        'id': i,
+        'source': 'agent',
+        'observation': 'run',
+        'content': f'output of command {i}\n' * 20,
+        'extras': {'command': f'echo {i}', 'exit_code': 0},
+    }
+
+
+def _write_conversation(file_store: LocalFileStore, length: int) -> None:
+    page = []
+    for i in range(length):
+        event_json = json.dumps(_event(i))
+        file_store.write(f'sessions/bench/events/{i}.json', event_json)
+        page.append(event_json)
+        if len(page) == CACHE_SIZE:
+            file_store.write(
+                f'sessions/bench/event_cache/{i + 1 - CACHE_SIZE}-{i + 1}.json',
+                '[' + ', '.join(page) + ']',
+            )
+            page = []
+
+
+def _full_replay(file_store: LocalFileStore) -> _State:
+    event_store = EventStore('bench', file_store, None, event_cache=None)
+    state = _State()
+    for event in event_store.search_events():
+        _apply(state, event)
+    return state
+
+
+def _resume(file_store: LocalFileStore) -> _State:
+    event_store = EventStore('bench', file_store, None, event_cache=None)
+    checkpointer = StateCheckpointer('bench', file_store)
+    state = checkpointer.restore(event_store)
+
+    async def apply(event) -> None:
+        _apply(state, event)
+
+    asyncio.run(checkpointer.replay(event_store, apply))
+    return state
+
+
+def _resume_and_read_recent(file_store: LocalFileStore) -> _State:
+    state = _resume(file_store)
+    state.history[-RECENT_EVENTS:]
+    return state
+
+
+def _time(run, iterations: int = 5) -> float:
+    run()
+    start = time.perf_counter()
+    for _ in range(iterations):
+        run()
+    return (time.perf_counter() - start) / iterations * 1000
+
+
+def main() -> None:
+    print(
+        f'{"events":>8s} {"full replay":>14s} {"checkpoint":>14s} {"speedup":>8s} '
+        f'{"+recent":>10s} {"save":>10s} {"with history":>14s}'
+    )
+    for length in HISTORY_LENGTHS:
+        with tempfile.TemporaryDirectory() as root:
+            file_store = LocalFileStore(root)
+            _write_conversation(file_store, length)
+            checkpointed = length - UNCHECKPOINTED_EVENTS
+            event_store = EventStore('bench', file_store, None, event_cache=None)
+            state = _State()
+            for event in event_store.search_events(end_id=checkpointed - 1):
+                _apply(state, event)
+            checkpointer = StateCheckpointer('bench', file_store)
+            checkpointer.save(state, checkpointed - 1)
+
+            assert len(_resume(file_store).history) == length
+            full = _time(lambda: _full_replay(file_store))
+            resumed = _time(lambda: _resume(file_store))
+            recent = _time(lambda: _resume_and_read_recent(file_store))
+            save = _time(lambda: checkpointer.save(state, checkpointed - 1))
+            with_history = _time(
+                lambda: file_store.write(
+                    'sessions/bench/full_state.pkl',
+                    base64.b64encode(pickle.dumps(state)).decode('ascii'),
+                )
+            )
+            print(
+                f'{length:8d} {full:12.2f}ms {resumed:12.2f}ms {full / resumed:7.1f}x '
+                f'{recent:8.2f}ms {save:8.3f}ms {with_history:12.3f}ms'
+            )
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,89 @@
+"""Thread count and memory of per-callback executors vs. the shared dispatcher.
+
+Simulates many conversations, each with a few subscriber callbacks, and
+delivers one event to every callback. Run with:
+python -m openhands.tests.benchmarks.bench_event_dispatch
+"""
+
+import asyncio
+import gc
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor, wait
+
+from openhands.events.dispatcher import EventDispatcher
+
+NUM_CONVERSATIONS = 200
+CALLBACKS_PER_CONVERSATION = 4
+
+
+def _rss_kib() -> int:
+    with open('/proc/self/status') as f:
+        for line in f:
+            if line.startswith('VmRSS:'):
+                return int(line.split()[1])
+    return 0
+
+
+def _callback(event: int) -> None:
+    time.sleep(0.001)
+
+
+def _per_callback_executors() -> tuple[int, float]:
+    start = time.perf_counter()
+    pools = []
+    futures = []
+    for _ in range(NUM_CONVERSATIONS * CALLBACKS_PER_CONVERSATION):
+        pool = ThreadPoolExecutor(
+            max_workers=1,
+            initializer=lambda: asyncio.set_event_loop(asyncio.new_event_loop()),
+        )
+        pools.append(pool)
+        futures.append(pool.submit(_callback, 1))
+    wait(futures)
+    elapsed = time.perf_counter() - start
+    threads = threading.active_count()
+    for pool in pools:
+        pool.shutdown()
+    return threads, elapsed
+
+
+def _shared_dispatcher() -> tuple[int, float]:
+    start = time.perf_counter()
+    dispatcher = EventDispatcher()
+    done = threading.Semaphore(0)
+
+    def callback(event: int) -> None:
+        _callback(event)
+        done.release()
+
+    total = NUM_CONVERSATIONS * CALLBACKS_PER_CONVERSATION
+    queues = [dispatcher.register(callback, lambda e: None) for _ in range(total)]
+    for callback_queue in queues:
+        callback_queue.put(1)
+    for _ in range(total):
+        done.acquire()
+    elapsed = time.perf_counter() - start
+    threads = threading.active_count()
+    dispatcher.shutdown()
+    return threads, elapsed
+
+
+def main() -> None:
+    for name, run in (
+        ('per-callback executors', _per_callback_executors),
+        ('shared dispatcher', _shared_dispatcher),
+    ):
+        gc.collect()
+        rss_before = _rss_kib()
+        threads, elapsed = run()
+        rss_after = _rss_kib()
+        print(
+            f'{name:24s} callbacks={NUM_CONVERSATIONS * CALLBACKS_PER_CONVERSATION} '
+            f'threads={threads:5d} rss_delta={rss_after - rss_before:7d}KiB '
+            f'time={elapsed * 1000:8.1f}ms'
+        )
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,86 @@
+"""Reading large cache pages through read, read_bytes and read_view.
+
+Writes one cache page of large observations to a LocalFileStore and one
+conversation to a SegmentedLocalFileStore, then times reading them back.
+Run with:
+python -m openhands.tests.benchmarks.bench_file_reads
+"""
+
+import json
+import tempfile
+import time
+from typing import Any, Callable
+
+from openhands.storage.local import LocalFileStore
+from openhands.storage.segmented_local import SegmentedLocalFileStore
+
+PAGE_SIZE = 25
+LINES_PER_EVENT = 2500
+ITERATIONS = 200
+PAGE_PATH = 'sessions/bench/event_cache/0-25.json'
+
+
+def _event(i: int) -> dict:
+    return {
+        'id': i,
+        'observation': 'run',
+        'content': f'line {i} of command output\n' * LINES_PER_EVENT,
+        'extras': {'command': 'pytest', 'exit_code': 0},
+    }
+
+
+def _time(run: Callable[[], Any]) -> float:
+    run()
+    start = time.perf_counter()
+    for _ in range(ITERATIONS):
+        run()
+    return (time.perf_counter() - start) / ITERATIONS * 1000
+
+
+def _text_mode_read(store: LocalFileStore, path: str) -> str:
+    # What LocalFileStore.read did before read_bytes existed.
+    with open(store.get_full_path(path), 'r') as f:
+        return f.read()
+
+
+def main() -> None:
+    with tempfile.TemporaryDirectory() as root:
+        store = LocalFileStore(root)
+        page = json.dumps([_event(i) for i in range(PAGE_SIZE)])
+        store.write(PAGE_PATH, page)
+        print(f'page size: {len(page) / 1024 / 1024:.1f} MiB')
+
+        cases = {
+            'text mode read': lambda: _text_mode_read(store, PAGE_PATH),
+            'read': lambda: store.read(PAGE_PATH),
+            'read_bytes': lambda: store.read_bytes(PAGE_PATH),
+            'read_view': lambda: store.read_view(PAGE_PATH),
+            'json.loads(text mode read)': lambda: json.loads(
+                _text_mode_read(store, PAGE_PATH)
+            ),
+            'json.loads(read)': lambda: json.loads(store.read(PAGE_PATH)),
+            'json.loads(read_bytes)': lambda: json.loads(store.read_bytes(PAGE_PATH)),
+        }
+        for name, run in cases.items():
+            print(f'{name:32s} {_time(run):8.3f}ms')
+
+    with tempfile.TemporaryDirectory() as root:
+        store = SegmentedLocalFileStore(root)
+        for i in range(PAGE_SIZE):
+            store.write(f'sessions/bench/events/{i}.json', json.dumps(_event(i)))
+
+        def read_all() -> None:
+            for i in range(PAGE_SIZE):
+                store.read_bytes(f'sessions/bench/events/{i}.json')
+
+        def view_all() -> None:
+            for i in range(PAGE_SIZE):
+                store.read_view(f'sessions/bench/events/{i}.json')
+
+        print(f'{"segment read_bytes x" + str(PAGE_SIZE):32s} {_time(read_all):8.3f}ms')
+        print(f'{"segment read_view x" + str(PAGE_SIZE):32s} {_time(view_all):8.3f}ms')
+        store.close()
+
+
+if __name__ == '__main__':
+    main()
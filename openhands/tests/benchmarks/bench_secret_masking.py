@@ -0,0 +1,58 @@
+"""Compare the compiled SecretMasker with the old per-secret replace loop.
+
+Run with: python -m openhands.tests.benchmarks.bench_secret_masking
+"""
+
+import copy
+import timeit
+
+from openhands.events.secret_masker import SecretMasker
+
+
+def _legacy_replace_secrets(data: dict, secrets: dict[str, str]) -> dict:
+    for key in data:
+        if isinstance(data[key], dict):
+            data[key] = _legacy_replace_secrets(data[key], secrets)
+        elif isinstance(data[key], str):
+            for secret in secrets.values():
+                data[key] = data[key].replace(secret, '<secret_hidden>')
+    return data
+
+
+def _make_event(content_size: int) -> dict:
+    line = 'drwxr-xr-x  2 openhands openhands 4096 Jan  1 00:00 some_directory\n'
+    content = (line * (content_size // len(line) + 1))[:content_size]
+    return {
+        'content': content,
+        'extras': {
+            'command': 'ls -la /workspace',
+            'metadata': {'exit_code': 0, 'pid': 42, 'working_dir': '/workspace'},
+            'hidden': False,
+        },
+    }
+
+
+def main() -> None:
+    for num_secrets in (1, 10, 50):
+        secrets = {f'SECRET_{i}': f'sk-{i:04d}-' + 'x' * 24 for i in range(num_secrets)}
+        masker = SecretMasker(secrets.values())
+        for content_size in (1_000, 100_000, 1_000_000):
+            event = _make_event(content_size)
+            number = max(1, 2_000_000 // (content_size * num_secrets))
+            legacy = timeit.timeit(
+                lambda: _legacy_replace_secrets(copy.deepcopy(event), secrets),
+                number=number,
+            )
+            compiled = timeit.timeit(
+                lambda: masker.mask(copy.deepcopy(event)), number=number
+            )
+            print(
+                f'secrets={num_secrets:3d} content={content_size:>9,d}B '
+                f'legacy={legacy / number * 1e6:10.1f}us '
+                f'compiled={compiled / number * 1e6:10.1f}us '
+                f'speedup={legacy / compiled:5.1f}x'
+            )
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,45 @@
+import pytest
+
+from openhands.events.event_cache import EventCache
+from openhands.storage.local import LocalFileStore
+
+
+class CountingFileStore(LocalFileStore):
+    """LocalFileStore that records the paths it reads and lists."""
+
+    def __init__(self, root: str):
+        super().__init__(root)
+        self.reads: list[str] = []
+        self.lists: list[str] = []
+
+    def read_bytes(self, path: str) -> bytes:
+        # LocalFileStore.read goes through read_bytes too.
+        self.reads.append(path)
+        return super().read_bytes(path)
+
+    def list(self, path, prefix=None, min_id=None, max_id=None) -> list[str]:
+        self.lists.append(path)
+        return super().list(path, prefix, min_id, max_id)
+
+
+@pytest.fixture
+def counting_file_store(tmp_path) -> CountingFileStore:
+    return CountingFileStore(str(tmp_path / 'files'))
+
+
+@pytest.fixture
+def raw_events(monkeypatch) -> None:
+    """Makes EventStore return events as the dicts they are stored as."""
+    monkeypatch.setattr(
+        'openhands.events.event_store.event_from_dict', lambda data: data
+    )
+
+
+@pytest.fixture(autouse=True)
+def fresh_event_cache(monkeypatch) -> EventCache:
+    """Gives each test its own process-wide event cache."""
+    event_cache = EventCache()
+    monkeypatch.setattr(
+        'openhands.events.event_cache._default_event_cache', event_cache
+    )
+    return event_cache
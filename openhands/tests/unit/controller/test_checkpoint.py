@@ -0,0 +1,166 @@
+import asyncio
+import json
+import pickle
+from dataclasses import dataclass, field
+
+import pytest
+
+from openhands.controller.checkpoint import LazyHistory, StateCheckpointer
+from openhands.events.event_store import EventStore
+from openhands.storage.local import LocalFileStore
+
+
+@dataclass
+class _Event:
+    id: int
+
+
+@dataclass
+class _State:
+    history: list = field(default_factory=list)
+    start_id: int = 0
+    iteration: int = 0
+
+
+def _apply(state: _State, event: _Event) -> None:
+    state.history.append(event)
+    state.iteration += 1
+
+
+@pytest.fixture
+def event_store(tmp_path, monkeypatch):
+    monkeypatch.setattr(
+        'openhands.events.event_store.event_from_dict', lambda data: _Event(**data)
+    )
+    file_store = LocalFileStore(str(tmp_path))
+    for i in range(10):
+        file_store.write(f'sessions/abc/events/{i}.json', json.dumps({'id': i}))
+    return EventStore('abc', file_store, None, event_cache=None)
+
+
+def test_checkpoints_are_saved_every_interval(event_store):
+    checkpointer = StateCheckpointer('abc', event_store.file_store, interval=4)
+    state = _State()
+
+    async def apply_all() -> list[int]:
+        saved = []
+        for i in range(10):
+            _apply(state, _Event(i))
+            if await checkpointer.on_event_applied(state, i):
+                saved.append(i)
+        return saved
+
+    assert asyncio.run(apply_all()) == [3, 7]
+    checkpoint = checkpointer.load()
+    assert checkpoint.last_event_id == 7
+    assert checkpoint.state.iteration == 8
+    # The history is saved as ids, and the live state keeps its own.
+    assert checkpoint.state.history == []
+    assert checkpoint.history_ids == list(range(8))
+    assert len(state.history) == 10
+
+
+def test_snapshot_is_taken_before_the_write(event_store, monkeypatch):
+    checkpointer = StateCheckpointer('abc', event_store.file_store, interval=1)
+    state = _State()
+    _apply(state, _Event(0))
+
+    async def apply_during_write() -> None:
+        write = checkpointer._write
+
+        def slow_write(*args) -> None:
+            # The loop changing the state must not reach the saved checkpoint.
+            state.iteration = 100
+            write(*args)
+
+        monkeypatch.setattr(checkpointer, '_write', slow_write)
+        assert await checkpointer.on_event_applied(state, 0)
+
+    asyncio.run(apply_during_write())
+    assert checkpointer.load().state.iteration == 1
+
+
+def test_restore_reads_only_the_events_it_needs(event_store, monkeypatch):
+    state = _State(start_id=2)
+    for i in (2, 3, 5, 6):
+        _apply(state, _Event(i))
+    StateCheckpointer('abc', event_store.file_store).save(state, 6)
+
+    read_ids = []
+    search_events = event_store.search_events
+
+    def recording_search_events(start_id=0, end_id=None, **kwargs):
+        for event in search_events(start_id, end_id, **kwargs):
+            read_ids.append(event.id)
+            yield event
+
+    monkeypatch.setattr(event_store, 'search_events', recording_search_events)
+    checkpointer = StateCheckpointer('abc', event_store.file_store)
+    restored = checkpointer.restore(event_store)
+    assert isinstance(restored.history, LazyHistory)
+    assert restored.iteration == 4
+    assert read_ids == []
+
+    assert restored.history[-1] == _Event(6)
+    assert read_ids == [6]
+    assert [event.id for event in restored.history] == [2, 3, 5, 6]
+
+    replayed = []
+
+    async def replay(event) -> None:
+        replayed.append(event.id)
+
+    read_ids.clear()
+    asyncio.run(checkpointer.replay(event_store, replay))
+    assert replayed == [7, 8, 9]
+    assert read_ids == [7, 8, 9]
+
+
+def test_lazy_history_behaves_like_a_list(event_store):
+    history = LazyHistory(event_store, [1, 2, 3])
+
+    history.append(_Event(4))
+    del history[0]
+    history.insert(0, _Event(0))
+
+    assert history == [_Event(0), _Event(2), _Event(3), _Event(4)]
+    assert history[1:3] == [_Event(2), _Event(3)]
+    assert history.ids == [0, 2, 3, 4]
+    assert pickle.loads(pickle.dumps(history)) == list(history)
+
+
+def test_restored_history_is_checkpointed_without_reading_it(event_store):
+    StateCheckpointer('abc', event_store.file_store).save(
+        _State(history=[_Event(0), _Event(1)]), 1
+    )
+    checkpointer = StateCheckpointer('abc', event_store.file_store)
+    state = checkpointer.restore(event_store)
+    state.history.append(_Event(2))
+
+    checkpointer.save(state, 2)
+
+    assert state.history._events[:2] == [None, None]
+    assert checkpointer.load().history_ids == [0, 1, 2]
+
+
+def test_restore_without_checkpoint(event_store):
+    checkpointer = StateCheckpointer('abc', event_store.file_store)
+
+    assert checkpointer.restore(event_store) is None
+
+
+def test_flush_saves_unsaved_events(event_store):
+    checkpointer = StateCheckpointer('abc', event_store.file_store, interval=None)
+    state = _State()
+    checkpointer.flush(state)
+    assert checkpointer.load() is None
+
+    assert not asyncio.run(checkpointer.on_event_applied(state, 0))
+    checkpointer.flush(state)
+    assert checkpointer.load().last_event_id == 0
+
+
+def test_unreadable_checkpoint_is_ignored(event_store):
+    event_store.file_store.write('sessions/abc/state_checkpoint.pkl', 'not a pickle')
+
+    assert StateCheckpointer('abc', event_store.file_store).load() is None
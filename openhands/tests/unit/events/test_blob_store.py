@@ -0,0 +1,100 @@
+import json
+import pickle
+from dataclasses import dataclass, field
+
+from openhands.events.blob_store import (
+    BlobStore,
+    offload_large_fields,
+    resolve_blob_refs,
+)
+from openhands.events.event_cache import EventCache
+from openhands.events.event_store import EventStore
+from openhands.storage.local import LocalFileStore
+
+
+@dataclass
+class _Observation:
+    content: str
+    extras: dict = field(default_factory=dict)
+
+
+def test_offload_replaces_and_deduplicates_large_fields(tmp_path):
+    file_store = LocalFileStore(str(tmp_path))
+    blob_store = BlobStore(file_store, 'sessions/abc/blobs/')
+    big = 'x' * 1000
+    data = {'id': 1, 'content': big, 'extras': {'command': 'ls', 'output': big}}
+
+    assert offload_large_fields(data, blob_store, threshold=100) == 2000
+    assert data['extras']['command'] == 'ls'
+    assert data['content'] == data['extras']['output']
+    assert len(file_store.list('sessions/abc/blobs')) == 1
+    digest = data['content']['$blob']
+    assert blob_store.get(digest) == big
+
+
+def test_resolve_loads_each_blob_once(counting_file_store):
+    file_store = counting_file_store
+    blob_store = BlobStore(file_store, 'sessions/abc/blobs/')
+    big = 'y' * 500
+    data = {'content': big, 'extras': {'output': big, 'command': 'ls'}}
+    offload_large_fields(data, blob_store, threshold=100)
+    data = json.loads(json.dumps(data))
+
+    assert resolve_blob_refs(data, blob_store) == 1000
+    assert data == {'content': big, 'extras': {'output': big, 'command': 'ls'}}
+    assert len(file_store.reads) == 1
+
+
+def test_event_store_loads_blobs_on_access(counting_file_store, monkeypatch):
+    monkeypatch.setattr(
+        'openhands.events.event_store.event_from_dict',
+        lambda data: _Observation(data['content']),
+    )
+    file_store = counting_file_store
+    blob_store = BlobStore(file_store, 'sessions/abc/blobs/')
+    data = {'id': 0, 'content': 'z' * 5000}
+    offload_large_fields(data, blob_store, threshold=100)
+    file_store.write('sessions/abc/events/0.json', json.dumps(data))
+    event_cache = EventCache()
+    store = EventStore('abc', file_store, None, event_cache=event_cache)
+    store.cur_id
+    file_store.reads.clear()
+
+    event = store.get_event(0)
+
+    assert file_store.reads == ['sessions/abc/events/0.json']
+    assert type(event) is _Observation
+    # The blob counts towards the cache budget before it is loaded.
+    assert event_cache.size_bytes >= 5000
+    assert event.content == 'z' * 5000
+    assert file_store.reads[1].startswith('sessions/abc/blobs/')
+    event.content
+    assert len(file_store.reads) == 2
+
+
+def test_pending_blobs_pickle_as_their_text(counting_file_store, monkeypatch):
+    monkeypatch.setattr(
+        'openhands.events.event_store.event_from_dict',
+        lambda data: _Observation(data['content']),
+    )
+    blob_store = BlobStore(counting_file_store, 'sessions/abc/blobs/')
+    data = {'id': 0, 'content': 'z' * 5000}
+    offload_large_fields(data, blob_store, threshold=100)
+    counting_file_store.write('sessions/abc/events/0.json', json.dumps(data))
+    store = EventStore('abc', counting_file_store, None, event_cache=None)
+
+    pickled = pickle.dumps(store.get_event(0))
+    counting_file_store.delete('sessions/abc/blobs/')
+
+    assert pickle.loads(pickled) == _Observation('z' * 5000)
+
+
+def test_text_index_rebuilt_from_disk_includes_offloaded_fields(tmp_path, raw_events):
+    file_store = LocalFileStore(str(tmp_path))
+    blob_store = BlobStore(file_store, 'sessions/abc/blobs/')
+    data = {'id': 0, 'observation': 'run', 'content': 'needle ' + 'x' * 500}
+    offload_large_fields(data, blob_store, threshold=100)
+    file_store.write('sessions/abc/events/0.json', json.dumps(data))
+    store = EventStore('abc', file_store, None, event_cache=None)
+
+    assert store.find_text_ids('needle') == [0]
@@ -0,0 +1,205 @@
+import asyncio
+import threading
+import time
+
+from openhands.events.dispatcher import EventDispatcher
+
+
+def _wait_for(predicate, timeout: float = 5) -> None:
+    deadline = time.monotonic() + timeout
+    while not predicate():
+        assert time.monotonic() < deadline, 'timed out'
+        time.sleep(0.001)
+
+
+def test_events_are_delivered_in_order_per_callback():
+    dispatcher = EventDispatcher(max_workers=4)
+    received: dict[int, list[int]] = {i: [] for i in range(10)}
+    queues = [
+        dispatcher.register(received[i].append, lambda e: None) for i in range(10)
+    ]
+    for event in range(200):
+        for callback_queue in queues:
+            callback_queue.put(event)
+
+    _wait_for(lambda: all(len(events) == 200 for events in received.values()))
+    assert all(events == list(range(200)) for events in received.values())
+    dispatcher.shutdown()
+
+
+def test_worker_threads_are_bounded():
+    dispatcher = EventDispatcher(max_workers=2)
+    threads: set[str] = set()
+    done = threading.Event()
+    count = 0
+
+    def callback(event):
+        nonlocal count
+        threads.add(threading.current_thread().name)
+        count += 1
+        if count == 50:
+            done.set()
+
+    for _ in range(50):
+        dispatcher.register(callback, lambda e: None).put(1)
+
+    assert done.wait(timeout=5)
+    assert len(threads) <= 2
+    dispatcher.shutdown()
+
+
+def test_sync_callbacks_can_run_until_complete():
+    dispatcher = EventDispatcher(max_workers=1)
+    results = []
+
+    async def handle(event):
+        return event * 2
+
+    def callback(event):
+        results.append(asyncio.get_event_loop().run_until_complete(handle(event)))
+
+    callback_queue = dispatcher.register(callback, lambda e: None)
+    callback_queue.put(1)
+    callback_queue.put(2)
+
+    _wait_for(lambda: len(results) == 2)
+    assert results == [2, 4]
+    dispatcher.shutdown()
+
+
+def test_async_callbacks_run_on_shared_loop():
+    dispatcher = EventDispatcher(max_workers=1)
+    received = []
+    loops = set()
+
+    async def callback(event):
+        loops.add(id(asyncio.get_running_loop()))
+        await asyncio.sleep(0)
+        received.append(event)
+
+    first = dispatcher.register(callback, lambda e: None)
+    second = dispatcher.register(callback, lambda e: None)
+    for event in range(5):
+        first.put(event)
+        second.put(event)
+
+    _wait_for(lambda: len(received) == 10)
+    assert len(loops) == 1
+    dispatcher.shutdown()
+
+
+def test_errors_are_reported_and_delivery_continues():
+    dispatcher = EventDispatcher(max_workers=1)
+    errors = []
+    received = []
+
+    def callback(event):
+        if event == 1:
+            raise ValueError('boom')
+        received.append(event)
+
+    callback_queue = dispatcher.register(callback, errors.append)
+    for event in range(3):
+        callback_queue.put(event)
+
+    _wait_for(lambda: len(received) == 2)
+    assert received == [0, 2]
+    assert [str(e) for e in errors] == ['boom']
+    dispatcher.shutdown()
+
+
+def test_close_delivers_queued_events():
+    dispatcher = EventDispatcher(max_workers=1)
+    release = threading.Event()
+    received = []
+
+    def callback(event):
+        release.wait(timeout=5)
+        received.append(event)
+
+    callback_queue = dispatcher.register(callback, lambda e: None)
+    for event in range(10):
+        callback_queue.put(event)
+    threading.Timer(0.05, release.set).start()
+    callback_queue.close()
+
+    assert received == list(range(10))
+    callback_queue.put(10)
+    dispatcher.shutdown()
+    assert received == list(range(10))
+
+
+def test_close_delivers_lingering_batches():
+    dispatcher = EventDispatcher(max_workers=1)
+    batches = []
+    callback_queue = dispatcher.register_batch(
+        batches.append, lambda e: None, max_batch_size=100, max_linger=60
+    )
+    callback_queue.put_many(range(3))
+
+    callback_queue.close()
+
+    assert batches == [[0, 1, 2]]
+    dispatcher.shutdown()
+
+
+def test_callback_can_close_its_own_queue():
+    dispatcher = EventDispatcher(max_workers=1)
+    received = []
+
+    def callback(event):
+        received.append(event)
+        if event == 0:
+            callback_queue.close()
+
+    callback_queue = dispatcher.register(callback, lambda e: None)
+    callback_queue.put_many(range(3))
+
+    _wait_for(lambda: len(received) == 3)
+    assert received == [0, 1, 2]
+    dispatcher.shutdown()
+
+
+def test_batch_queue_delivers_queued_events_together():
+    dispatcher = EventDispatcher(max_workers=1)
+    batches = []
+    callback_queue = dispatcher.register_batch(
+        batches.append, lambda e: None, max_batch_size=4, max_linger=0
+    )
+
+    callback_queue.put_many(range(10))
+
+    _wait_for(lambda: sum(len(batch) for batch in batches) == 10)
+    assert batches == [[0, 1, 2, 3], [4, 5, 6, 7], [8, 9]]
+    dispatcher.shutdown()
+
+
+def test_batch_queue_lingers_for_more_events():
+    dispatcher = EventDispatcher(max_workers=1)
+    batches = []
+    callback_queue = dispatcher.register_batch(
+        batches.append, lambda e: None, max_batch_size=100, max_linger=0.2
+    )
+
+    for event in range(3):
+        callback_queue.put(event)
+        time.sleep(0.01)
+
+    _wait_for(lambda: batches)
+    assert batches == [[0, 1, 2]]
+    dispatcher.shutdown()
+
+
+def test_full_batch_does_not_wait_for_linger():
+    dispatcher = EventDispatcher(max_workers=1)
+    batches = []
+    callback_queue = dispatcher.register_batch(
+        batches.append, lambda e: None, max_batch_size=2, max_linger=60
+    )
+
+    callback_queue.put(0)
+    callback_queue.put(1)
+
+    _wait_for(lambda: batches, timeout=1)
+    assert batches == [[0, 1]]
+    dispatcher.shutdown()
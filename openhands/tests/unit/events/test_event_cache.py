@@ -0,0 +1,47 @@
+from openhands.events.event_cache import EventCache
+
+
+def test_hits_and_misses_are_counted():
+    cache = EventCache(max_bytes=100)
+    cache.put('abc', 1, 'event-1', 10)
+
+    assert cache.get('abc', 1) == 'event-1'
+    assert cache.get('abc', 2) is None
+    assert cache.get('xyz', 1) is None
+    assert (cache.hits, cache.misses) == (1, 2)
+
+
+def test_least_recently_used_events_are_evicted_by_size():
+    cache = EventCache(max_bytes=30)
+    for i in range(3):
+        cache.put('abc', i, f'event-{i}', 10)
+    cache.get('abc', 0)
+    cache.put('abc', 3, 'event-3', 10)
+
+    assert cache.get('abc', 1) is None
+    assert cache.get('abc', 0) == 'event-0'
+    assert cache.size_bytes == 30
+    assert len(cache) == 3
+
+
+def test_oversized_events_are_not_cached():
+    cache = EventCache(max_bytes=10)
+    cache.put('abc', 0, 'event-0', 5)
+    cache.put('abc', 1, 'huge', 11)
+
+    assert cache.get('abc', 1) is None
+    assert cache.get('abc', 0) == 'event-0'
+
+
+def test_invalidate_conversation():
+    cache = EventCache()
+    cache.put('abc', 0, 'a0', 1)
+    cache.put('abc', 1, 'a1', 1)
+    cache.put('xyz', 0, 'x0', 1)
+
+    cache.invalidate('abc', 0)
+    assert cache.get('abc', 0) is None
+    cache.invalidate('abc')
+    assert cache.get('abc', 1) is None
+    assert cache.get('xyz', 0) == 'x0'
+    assert cache.size_bytes == 1
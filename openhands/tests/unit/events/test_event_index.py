@@ -0,0 +1,113 @@
+import json
+
+import pytest
+
+from openhands.events.event_cache import EventCache
+from openhands.events.event_index import EVENT_INDEX_SEGMENT_SIZE, EventIndex
+from openhands.events.event_store import EventStore
+from openhands.storage.local import LocalFileStore
+
+
+def _event(i: int) -> dict:
+    if i % 2 == 0:
+        return {'id': i, 'source': 'user', 'action': 'message'}
+    return {'id': i, 'source': 'agent', 'observation': 'run', 'cause': i - 1}
+
+
+def test_find_intersects_criteria():
+    index = EventIndex()
+    for i in range(10):
+        index.add(i, _event(i))
+
+    assert index.find(action='message') == [0, 2, 4, 6, 8]
+    assert index.find(source='agent', observation='run', start_id=4, end_id=7) == [5, 7]
+    assert index.find(cause=4) == [5]
+    assert index.find(action='message', source='agent') == []
+    assert index.next_id == 10
+
+
+def test_add_out_of_order_keeps_ids_sorted_and_unique():
+    index = EventIndex()
+    for i in (4, 0, 2, 2):
+        index.add(i, _event(i))
+
+    assert index.find(action='message') == [0, 2, 4]
+
+
+def test_slices_merge_back_into_the_index():
+    index = EventIndex()
+    for i in range(10):
+        index.add(i, _event(i))
+
+    merged = EventIndex()
+    for start in (5, 0):
+        merged.merge(index.slice(start, start + 5))
+
+    assert merged.next_id == 10
+    assert merged.find(action='message') == index.find(action='message')
+    assert merged.find(source='agent') == index.find(source='agent')
+    assert index.slice(3, 6).find(action='message') == [4]
+
+
+def test_find_requires_a_criterion():
+    with pytest.raises(ValueError):
+        EventIndex().find()
+
+
+def test_store_catches_up_from_segments(tmp_path, raw_events):
+    size = EVENT_INDEX_SEGMENT_SIZE
+    file_store = LocalFileStore(str(tmp_path))
+    for i in range(size + 30):
+        file_store.write(f'sessions/abc/events/{i}.json', json.dumps(_event(i)))
+    segment = EventIndex()
+    for i in range(size):
+        segment.add(i, _event(i))
+    file_store.write(f'sessions/abc/event_index/0-{size}.json', segment.to_json())
+    # Indexed from the segment, not from the event file.
+    file_store.write('sessions/abc/events/0.json', json.dumps({'id': 0}))
+
+    store = EventStore('abc', file_store, None, event_cache=EventCache())
+
+    assert store.find_event_ids(action='message', end_id=4) == [0, 2, 4]
+    assert store.find_event_ids(action='message', start_id=size + 15) == [
+        i for i in range(size + 15, size + 30) if i % 2 == 0
+    ]
+    events = store.find_events(source='agent', reverse=True, limit=2)
+    assert [event['id'] for event in events] == [size + 29, size + 27]
+
+
+def test_store_persists_the_segments_it_rebuilds(tmp_path, raw_events):
+    size = EVENT_INDEX_SEGMENT_SIZE
+    file_store = LocalFileStore(str(tmp_path))
+    for i in range(size + 10):
+        file_store.write(f'sessions/abc/events/{i}.json', json.dumps(_event(i)))
+
+    store = EventStore('abc', file_store, None, event_cache=EventCache())
+    # Nothing is indexed until the first query.
+    assert not file_store.exists(f'sessions/abc/event_index/0-{size}.json')
+    ids = store.find_event_ids(cause=4)
+
+    assert ids == [5]
+    assert file_store.list('sessions/abc/event_index/') == [
+        f'sessions/abc/event_index/0-{size}.json'
+    ]
+    reloaded = EventStore('abc', file_store, None, event_cache=EventCache())
+    assert reloaded.find_event_ids(action='message') == store.find_event_ids(
+        action='message'
+    )
+
+
+def test_store_catches_up_on_events_added_since_the_last_query(tmp_path, raw_events):
+    file_store = LocalFileStore(str(tmp_path))
+    for i in range(3):
+        file_store.write(f'sessions/abc/events/{i}.json', json.dumps(_event(i)))
+    store = EventStore('abc', file_store, None, event_cache=EventCache())
+    assert store.find_event_ids(action='message') == [0, 2]
+
+    # Added by another store.
+    file_store.write(
+        'sessions/abc/events/3.json', json.dumps({'id': 3, 'action': 'message'})
+    )
+    store.cur_id = 4
+
+    assert store.find_event_ids(action='message') == [0, 2, 3]
@@ -0,0 +1,44 @@
+from dataclasses import asdict
+
+import pytest
+
+from openhands.events.action import CmdRunAction, FileEditAction, MessageAction
+from openhands.events.observation import CmdOutputObservation
+from openhands.events.observation.commands import CmdOutputMetadata
+from openhands.events.serialization.event import TOP_KEYS, _fields_to_dict
+
+
+def _legacy_props(event) -> dict:
+    props = asdict(event)
+    for key in TOP_KEYS:
+        props.pop(key, None)
+    return props
+
+
+@pytest.mark.parametrize(
+    'event',
+    [
+        CmdRunAction(command='ls -la', thought='listing'),
+        MessageAction(content='hello', image_urls=['http://example.com/a.png']),
+        FileEditAction(path='/workspace/a.py', content='print(1)'),
+        CmdOutputObservation(
+            content='total 0',
+            command='ls -la',
+            metadata=CmdOutputMetadata(exit_code=0, pid=42),
+        ),
+    ],
+)
+def test_fields_to_dict_matches_asdict(event):
+    props = _fields_to_dict(event)
+
+    assert props == _legacy_props(event)
+    assert list(props) == list(_legacy_props(event))
+
+
+def test_fields_to_dict_copies_mutable_values():
+    action = MessageAction(content='hello', image_urls=['a.png'])
+
+    props = _fields_to_dict(action)
+    props['image_urls'].append('b.png')
+
+    assert action.image_urls == ['a.png']
@@ -0,0 +1,232 @@
+import dataclasses
+import json
+
+import pytest
+
+from openhands.events.event_cache import EventCache
+from openhands.events.event_store import EventStore
+from openhands.storage.compaction import get_page_ranges
+from openhands.storage.local import LocalFileStore
+
+
+def _write_events(file_store, count, start=0):
+    for i in range(start, start + count):
+        file_store.write(f'sessions/abc/events/{i}.json', json.dumps({'id': i}))
+
+
+def test_cur_id_recovered_from_manifest(tmp_path, monkeypatch):
+    file_store = LocalFileStore(str(tmp_path))
+    _write_events(file_store, 5)
+    file_store.write('sessions/abc/events_manifest.json', json.dumps({'cur_id': 5}))
+
+    store = EventStore('abc', file_store, None)
+    monkeypatch.setattr(
+        store, '_calculate_cur_id', lambda: pytest.fail('events dir was scanned')
+    )
+    assert store.cur_id == 5
+
+
+def test_missing_manifest_is_repaired(tmp_path):
+    file_store = LocalFileStore(str(tmp_path))
+    _write_events(file_store, 3)
+
+    assert EventStore('abc', file_store, None).cur_id == 3
+    manifest = json.loads(file_store.read('sessions/abc/events_manifest.json'))
+    assert manifest == {'cur_id': 3}
+
+
+def test_events_after_manifest_are_probed(tmp_path, monkeypatch):
+    file_store = LocalFileStore(str(tmp_path))
+    _write_events(file_store, 7)
+    file_store.write('sessions/abc/events_manifest.json', json.dumps({'cur_id': 4}))
+
+    store = EventStore('abc', file_store, None)
+    monkeypatch.setattr(
+        store, '_calculate_cur_id', lambda: pytest.fail('events dir was scanned')
+    )
+    assert store.cur_id == 7
+    manifest = json.loads(file_store.read('sessions/abc/events_manifest.json'))
+    assert manifest == {'cur_id': 7}
+
+
+@pytest.mark.parametrize('manifest_id', [4, 50])
+def test_stale_manifest_falls_back_to_scan(tmp_path, manifest_id):
+    file_store = LocalFileStore(str(tmp_path))
+    _write_events(file_store, 40)
+    file_store.write(
+        'sessions/abc/events_manifest.json', json.dumps({'cur_id': manifest_id})
+    )
+
+    assert EventStore('abc', file_store, None).cur_id == 40
+    manifest = json.loads(file_store.read('sessions/abc/events_manifest.json'))
+    assert manifest == {'cur_id': 40}
+
+
+def test_scan_only_lists_events_after_the_last_page(tmp_path, monkeypatch):
+    file_store = LocalFileStore(str(tmp_path))
+    _write_events(file_store, 60)
+    _write_pages(file_store, 60)
+    listings = []
+    original_list = file_store.list
+
+    def list_files(path, prefix=None, min_id=None, max_id=None):
+        files = original_list(path, prefix, min_id, max_id)
+        if path.endswith('events/'):
+            listings.append(files)
+        return files
+
+    monkeypatch.setattr(file_store, 'list', list_files)
+
+    assert EventStore('abc', file_store, None).cur_id == 60
+    assert [len(files) for files in listings] == [10]
+
+
+def test_empty_conversation_does_not_write_manifest(tmp_path):
+    file_store = LocalFileStore(str(tmp_path))
+
+    assert EventStore('abc', file_store, None).cur_id == 0
+    assert not (tmp_path / 'sessions' / 'abc' / 'events_manifest.json').exists()
+
+
+def _write_pages(file_store, count, page_size=25):
+    for start in range(0, count - count % page_size, page_size):
+        page = [{'id': i} for i in range(start, start + page_size)]
+        file_store.write(
+            f'sessions/abc/event_cache/{start}-{start + page_size}.json',
+            json.dumps(page),
+        )
+
+
+@pytest.fixture
+def paged_store(raw_events, counting_file_store):
+    file_store = counting_file_store
+    _write_events(file_store, 110)
+    _write_pages(file_store, 110)
+    file_store.write('sessions/abc/events_manifest.json', json.dumps({'cur_id': 110}))
+    store = EventStore('abc', file_store, None, event_cache=EventCache())
+    store.cur_id
+    file_store.reads.clear()
+    return store
+
+
+def test_search_events_reads_cache_pages(paged_store):
+    events = list(paged_store.search_events())
+
+    assert [event['id'] for event in events] == list(range(110))
+    # 4 full pages, one missing page lookup for the tail, and 10 tail events.
+    assert len(paged_store.file_store.reads) == 15
+
+
+def test_search_events_reverse_with_bounds(paged_store):
+    events = list(paged_store.search_events(start_id=20, end_id=104, reverse=True))
+
+    assert [event['id'] for event in events] == list(range(104, 19, -1))
+
+
+def test_search_events_is_lazy(paged_store):
+    events = paged_store.search_events(start_id=30, limit=3)
+
+    assert [event['id'] for event in events] == [30, 31, 32]
+    assert paged_store.file_store.reads == ['sessions/abc/event_cache/25-50.json']
+
+
+def test_search_events_with_zero_limit_reads_nothing(paged_store):
+    assert list(paged_store.search_events(limit=0)) == []
+    assert paged_store.file_store.reads == []
+
+
+def test_get_event_falls_back_to_cache_page(paged_store):
+    paged_store.file_store.delete('sessions/abc/events/7.json')
+
+    assert paged_store.get_event(7) == {'id': 7}
+
+
+def test_repeated_reads_are_served_from_event_cache(paged_store):
+    list(paged_store.search_events(start_id=90))
+    paged_store.file_store.reads.clear()
+
+    assert [event['id'] for event in paged_store.search_events(start_id=90)] == list(
+        range(90, 110)
+    )
+    assert paged_store.get_event(95) == {'id': 95}
+    assert paged_store.file_store.reads == []
+    assert paged_store.event_cache.hits == 21
+
+
+def test_compact_merges_pages_and_removes_event_files(paged_store):
+    file_store = paged_store.file_store
+
+    # 100 event files and the four 25 event pages they were already in.
+    assert paged_store.compact(page_size=50) == 104
+    assert sorted(file_store.list('sessions/abc/event_cache')) == [
+        'sessions/abc/event_cache/0-50.json',
+        'sessions/abc/event_cache/50-100.json',
+    ]
+    assert len(file_store.list('sessions/abc/events')) == 10
+    assert [e['id'] for e in paged_store.search_events()] == list(range(110))
+
+    file_store.delete('sessions/abc/events_manifest.json')
+    assert EventStore('abc', file_store, None).cur_id == 110
+
+
+def test_compact_tail(paged_store):
+    assert paged_store.compact(page_size=50, include_tail=True) == 114
+    assert 'sessions/abc/event_cache/100-110.json' in paged_store.file_store.list(
+        'sessions/abc/event_cache'
+    )
+    assert paged_store.get_event(105) == {'id': 105}
+    assert paged_store.compact(page_size=50, include_tail=True) == 0
+
+
+def test_compact_keeps_cached_events(paged_store):
+    event = paged_store.get_event(30)
+
+    paged_store.compact(page_size=50)
+
+    assert paged_store.get_event(30) is event
+
+
+def test_readers_with_stale_page_table_find_compacted_events(paged_store):
+    file_store = paged_store.file_store
+    reader = EventStore('abc', file_store, None, event_cache=None)
+    assert reader.get_event(30) == {'id': 30}
+
+    paged_store.compact(page_size=100)
+
+    assert reader.get_event(60) == {'id': 60}
+    assert [e['id'] for e in reader.search_events(start_id=20)] == list(range(20, 110))
+
+
+def test_page_table_is_refreshed_at_most_once_per_call(paged_store, monkeypatch):
+    file_store = paged_store.file_store
+    for i in range(101, 106):
+        file_store.delete(f'sessions/abc/events/{i}.json')
+    listings = []
+    monkeypatch.setattr(
+        'openhands.events.event_store.get_page_ranges',
+        lambda *args: listings.append(args) or get_page_ranges(*args),
+    )
+
+    ids = [e['id'] for e in paged_store.search_events(start_id=90)]
+
+    assert ids == [*range(90, 101), *range(106, 110)]
+    assert len(listings) == 1
+
+
+def test_delete_forgets_cached_events(paged_store):
+    assert paged_store.get_event(3) == {'id': 3}
+
+    paged_store.delete()
+
+    assert paged_store.cur_id == 0
+    with pytest.raises(FileNotFoundError):
+        paged_store.get_event(3)
+
+
+
+def test_event_cache_is_keyword_only():
+    fields = {f.name: f for f in dataclasses.fields(EventStore)}
+
+    assert fields['event_cache'].kw_only
+    positional = [f.name for f in dataclasses.fields(EventStore) if not f.kw_only]
+    assert positional[:5] == ['sid', 'file_store', 'user_id', 'cache_size', '_cur_id']
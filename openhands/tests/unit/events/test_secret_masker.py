@@ -0,0 +1,46 @@
+from openhands.events.secret_masker import SecretMasker
+
+
+def test_masks_all_secrets_in_one_pass():
+    masker = SecretMasker(['token-123', 'hunter2'])
+
+    assert (
+        masker.mask_text('export A=token-123 B=hunter2 C=token-123')
+        == 'export A=<secret_hidden> B=<secret_hidden> C=<secret_hidden>'
+    )
+
+
+def test_longer_secret_wins_over_its_prefix():
+    masker = SecretMasker(['abc', 'abcdef'])
+
+    assert masker.mask_text('xabcdefx abc') == 'x<secret_hidden>x <secret_hidden>'
+
+
+def test_masks_nested_dicts_and_lists():
+    masker = SecretMasker(['s3cr3t'])
+    data = {
+        'content': 'value s3cr3t',
+        'extras': {'items': ['s3cr3t', {'deep': 'a s3cr3t b'}, 3]},
+    }
+
+    assert masker.mask(data) == {
+        'content': 'value <secret_hidden>',
+        'extras': {'items': ['<secret_hidden>', {'deep': 'a <secret_hidden> b'}, 3]},
+    }
+
+
+def test_regex_characters_and_empty_secrets_are_safe():
+    masker = SecretMasker(['', 'a.b*c'])
+
+    assert masker.mask_text('aXbc a.b*c') == 'aXbc <secret_hidden>'
+
+
+def test_pattern_is_only_rebuilt_when_secrets_change():
+    masker = SecretMasker(['one', 'two'])
+    pattern = masker._pattern
+
+    masker.set_secrets(['two', 'one'])
+    assert masker._pattern is pattern
+
+    masker.set_secrets([])
+    assert masker.mask_text('one two') == 'one two'
@@ -0,0 +1,208 @@
+import json
+import signal
+import threading
+from dataclasses import dataclass
+
+import pytest
+
+from openhands.events.event import Event, EventSource
+from openhands.events.event_store import EventStore
+from openhands.events.stream import EventStream, EventStreamSubscriber
+from openhands.storage.local import LocalFileStore
+
+
+@dataclass
+class _Message:
+    content: str
+    _id: int = Event.INVALID_ID
+
+    @property
+    def id(self) -> int:
+        return self._id
+
+
+def _event_to_dict(event: _Message) -> dict:
+    return {
+        'id': event.id,
+        'source': event._source,
+        'action': 'message',
+        'content': event.content,
+    }
+
+
+@pytest.fixture
+def file_store(tmp_path, monkeypatch, raw_events):
+    monkeypatch.setattr('openhands.events.stream.event_to_dict', _event_to_dict)
+    return LocalFileStore(str(tmp_path))
+
+
+@pytest.fixture
+def open_stream(file_store):
+    streams = []
+
+    def open_stream(**kwargs) -> EventStream:
+        stream = EventStream('abc', file_store, **kwargs)
+        streams.append(stream)
+        return stream
+
+    yield open_stream
+    for stream in streams:
+        stream.close()
+
+
+def _add_messages(stream: EventStream, count: int) -> None:
+    for i in range(count):
+        stream.add_event(_Message(f'message {i}'), EventSource.USER)
+
+
+def test_events_pages_and_manifest_are_written(file_store, open_stream):
+    stream = open_stream()
+    _add_messages(stream, 30)
+
+    stored = json.loads(file_store.read('sessions/abc/events/29.json'))
+    assert stored == {
+        'id': 29,
+        'source': 'user',
+        'action': 'message',
+        'content': 'message 29',
+    }
+    page = json.loads(file_store.read('sessions/abc/event_cache/0-25.json'))
+    assert [event['id'] for event in page] == list(range(25))
+    manifest = json.loads(file_store.read('sessions/abc/events_manifest.json'))
+    assert manifest == {'cur_id': 25}
+
+    stream.close()
+    manifest = json.loads(file_store.read('sessions/abc/events_manifest.json'))
+    assert manifest == {'cur_id': 30}
+
+
+def test_pages_started_before_the_stream_are_not_written(file_store, open_stream):
+    for i in range(3):
+        file_store.write(f'sessions/abc/events/{i}.json', json.dumps({'id': i}))
+    stream = open_stream()
+    _add_messages(stream, 47)
+
+    assert file_store.list('sessions/abc/event_cache') == [
+        'sessions/abc/event_cache/25-50.json'
+    ]
+
+
+def test_secrets_are_masked_in_the_file_and_the_event(file_store, open_stream):
+    stream = open_stream()
+    stream.set_secrets({'token': 's3cret'})
+    event = _Message('the token is s3cret')
+
+    stream.add_event(event, EventSource.USER)
+
+    stored = json.loads(file_store.read('sessions/abc/events/0.json'))
+    assert stored['content'] == 'the token is <secret_hidden>'
+    assert event.content == 'the token is <secret_hidden>'
+
+
+def test_indexes_follow_added_events(open_stream):
+    stream = open_stream(text_index=True)
+    _add_messages(stream, 2)
+    assert stream.find_event_ids(action='message') == [0, 1]
+
+    _add_messages(stream, 1)
+
+    assert stream.find_event_ids(action='message', source='user') == [0, 1, 2]
+    assert stream.find_text_ids('message') == [0, 1, 2]
+    assert stream.find_text_ids('message 0') == [0, 2]
+
+
+def test_offloaded_and_compressed_events_read_back(file_store, open_stream):
+    stream = open_stream(
+        text_index=True,
+        blob_threshold=1000,
+        compression='zlib',
+        compression_threshold=100,
+    )
+    large = 'needle ' + 'x' * 2000
+    medium = 'y' * 500
+    stream.add_event(_Message(large), EventSource.USER)
+    stream.add_event(_Message(medium), EventSource.USER)
+
+    assert '$blob' in file_store.read('sessions/abc/events/0.json')
+    assert file_store.read_bytes('sessions/abc/events/1.json').startswith(
+        b'{"compressed": "zlib"'
+    )
+    assert stream.find_text_ids('needle') == [0]
+    reader = EventStore('abc', file_store, None, event_cache=None)
+    assert reader.get_event(0)['content'] == large
+    assert reader.get_event(1)['content'] == medium
+    assert reader.find_text_ids('needle') == [0]
+
+
+def test_events_are_serialized_outside_the_lock(file_store, open_stream):
+    stream = open_stream(blob_threshold=1000)
+    offloading = threading.Event()
+    release = threading.Event()
+    put = stream._blob_store.put
+
+    def slow_put(text: str) -> str:
+        offloading.set()
+        release.wait(5)
+        return put(text)
+
+    stream._blob_store.put = slow_put
+    first = threading.Thread(
+        target=stream.add_event, args=(_Message('x' * 2000), EventSource.USER)
+    )
+    first.start()
+    assert offloading.wait(5)
+
+    assert stream._lock.acquire(timeout=5)
+    stream._lock.release()
+    second = threading.Thread(
+        target=stream.add_event, args=(_Message('small'), EventSource.USER)
+    )
+    second.start()
+    release.set()
+    first.join(5)
+    second.join(5)
+
+    assert json.loads(file_store.read('sessions/abc/events/1.json'))['content'] == 'small'
+    assert stream.get_event(0).content == 'x' * 2000
+
+
+def test_concurrent_adds_fill_pages_in_id_order(file_store, open_stream):
+    stream = open_stream()
+    threads = [
+        threading.Thread(target=_add_messages, args=(stream, 25)) for _ in range(8)
+    ]
+    for thread in threads:
+        thread.start()
+    for thread in threads:
+        thread.join()
+
+    assert len(file_store.list('sessions/abc/events')) == 200
+    for start in range(0, 200, 25):
+        page = json.loads(
+            file_store.read(f'sessions/abc/event_cache/{start}-{start + 25}.json')
+        )
+        assert [event['id'] for event in page] == list(range(start, start + 25))
+
+
+def test_queue_can_be_stopped_from_a_signal_handler(open_stream):
+    stream = open_stream()
+    delivered = []
+    all_delivered = threading.Event()
+
+    def on_event(event):
+        delivered.append(event.id)
+        if len(delivered) == 3:
+            all_delivered.set()
+
+    stream.subscribe(EventStreamSubscriber.SERVER, on_event, 'test')
+    _add_messages(stream, 3)
+    previous = signal.signal(signal.SIGUSR1, lambda *_: stream._stop_queue())
+    try:
+        signal.raise_signal(signal.SIGUSR1)
+    finally:
+        signal.signal(signal.SIGUSR1, previous)
+
+    stream._queue_thread.join(5)
+    assert not stream._queue_thread.is_alive()
+    assert all_delivered.wait(5)
+    assert delivered == [0, 1, 2]
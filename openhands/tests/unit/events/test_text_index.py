@@ -0,0 +1,75 @@
+import json
+
+from openhands.events.event_cache import EventCache
+from openhands.events.event_store import EventStore
+from openhands.events.text_index import (
+    TextIndexSegment,
+    decode_ids,
+    encode_ids,
+    tokenize,
+)
+from openhands.storage.local import LocalFileStore
+
+
+def _event(i: int) -> dict:
+    if i % 3 == 0:
+        return {'id': i, 'action': 'run', 'args': {'command': f'pytest tests/test_{i}.py'}}
+    return {'id': i, 'observation': 'run', 'content': f'Error: step {i} FAILED'}
+
+
+def test_varint_round_trip():
+    ids = [3, 4, 130, 20000, 20001, 5_000_000]
+    encoded = encode_ids(ids, base=3)
+
+    assert decode_ids(encoded, base=3) == ids
+    assert len(encoded) < len(ids) * 4
+
+
+def test_tokenize_lowercases_and_drops_long_tokens():
+    assert tokenize('Run PYTEST on foo_bar ' + 'x' * 100) == {'run', 'pytest', 'on', 'foo_bar'}
+
+
+def test_segment_round_trip():
+    segment = TextIndexSegment(250, 500)
+    for i in range(250, 260):
+        segment.add(i, _event(i))
+
+    loaded = TextIndexSegment.from_json(segment.to_json())
+
+    assert loaded.find(tokenize('pytest')) == [252, 255, 258]
+    assert loaded.find(tokenize('error failed')) == segment.find(tokenize('error failed'))
+    assert loaded.find(tokenize('step 254')) == [254]
+
+
+def test_store_builds_and_persists_missing_segments(tmp_path, raw_events):
+    file_store = LocalFileStore(str(tmp_path))
+    for i in range(300):
+        file_store.write(f'sessions/abc/events/{i}.json', json.dumps(_event(i)))
+    store = EventStore('abc', file_store, None, event_cache=EventCache())
+
+    assert store.find_text_ids('PYTEST tests', start_id=240, end_id=260) == [
+        240, 243, 246, 249, 252, 255, 258
+    ]
+    events = store.search_text('failed', reverse=True, limit=2)
+    assert [event['id'] for event in events] == [299, 298]
+    assert store.find_text_ids('') == []
+    # Only the complete segment is persisted; the tail keeps growing.
+    assert file_store.list('sessions/abc/text_index') == ['sessions/abc/text_index/0-250.json']
+
+
+def test_store_only_indexes_new_events_of_the_tail_segment(tmp_path, raw_events):
+    file_store = LocalFileStore(str(tmp_path))
+    for i in range(300):
+        file_store.write(f'sessions/abc/events/{i}.json', json.dumps(_event(i)))
+    store = EventStore('abc', file_store, None, event_cache=EventCache())
+    assert store.find_text_ids('step 299') == [299]
+
+    # Already indexed events are not read again.
+    for i in range(250, 300):
+        file_store.delete(f'sessions/abc/events/{i}.json')
+    for i in range(300, 310):
+        file_store.write(f'sessions/abc/events/{i}.json', json.dumps(_event(i)))
+    store.cur_id = 310
+
+    assert store.find_text_ids('step 299') == [299]
+    assert store.find_text_ids('step 307') == [307]
@@ -0,0 +1,76 @@
+import asyncio
+import threading
+
+import pytest
+
+from openhands.storage.async_files import AsyncToSyncFileStore, SyncToAsyncFileStore
+from openhands.storage.async_memory import AsyncInMemoryFileStore
+from openhands.storage.local import LocalFileStore
+
+
+async def _exercise(store) -> None:
+    await store.awrite('sessions/abc/events/0.json', '{"id": 0}')
+    await store.awrite('sessions/abc/events/1.json', b'{"id": 1}')
+    await store.awrite('sessions/abc/metadata.json', '{}')
+
+    assert await store.aread('sessions/abc/events/1.json') == '{"id": 1}'
+    assert sorted(await store.alist('sessions/abc')) == [
+        'sessions/abc/events/',
+        'sessions/abc/metadata.json',
+    ]
+    assert await store.alist('sessions/abc/events', min_id=1) == [
+        'sessions/abc/events/1.json'
+    ]
+    assert await store.alist('sessions/abc', prefix='meta') == [
+        'sessions/abc/metadata.json'
+    ]
+    await store.adelete('sessions/abc/events/0.json')
+    assert await store.alist('sessions/abc/events/') == ['sessions/abc/events/1.json']
+    await store.adelete('sessions/abc/events')
+    with pytest.raises(FileNotFoundError):
+        await store.aread('sessions/abc/events/1.json')
+
+
+@pytest.mark.parametrize(
+    'make_store',
+    [
+        lambda root: AsyncInMemoryFileStore(),
+        lambda root: SyncToAsyncFileStore(LocalFileStore(root)),
+        lambda root: SyncToAsyncFileStore(LocalFileStore(root, fsync_batch_size=1)),
+        lambda root: SyncToAsyncFileStore(
+            AsyncToSyncFileStore(AsyncInMemoryFileStore())
+        ),
+    ],
+)
+def test_async_stores(tmp_path, make_store):
+    asyncio.run(_exercise(make_store(str(tmp_path))))
+
+
+def test_sync_to_async_store_keeps_file_io_off_the_loop(tmp_path, monkeypatch):
+    store = SyncToAsyncFileStore(LocalFileStore(str(tmp_path)))
+    threads = set()
+    for name in ('write', 'read', 'list', 'delete'):
+        method = getattr(store.file_store, name)
+
+        def record(*args, _method=method, **kwargs):
+            threads.add(threading.get_ident())
+            return _method(*args, **kwargs)
+
+        monkeypatch.setattr(store.file_store, name, record)
+
+    asyncio.run(_exercise(store))
+
+    assert threads
+    assert threading.get_ident() not in threads
+
+
+def test_async_to_sync_adapter():
+    async_store = AsyncInMemoryFileStore()
+    store = AsyncToSyncFileStore(async_store)
+
+    store.write('a/b.json', '{}')
+
+    assert store.read('a/b.json') == '{}'
+    assert store.list('a') == ['a/b.json']
+    store.delete('a')
+    assert async_store.files == {}
@@ -0,0 +1,110 @@
+import json
+import threading
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+
+import pytest
+
+from openhands.storage.batched_web_hook import BatchedWebHookFileStore
+from openhands.storage.local import LocalFileStore
+
+
+class _WebHookServer(ThreadingHTTPServer):
+    def __init__(self):
+        super().__init__(('127.0.0.1', 0), _Handler)
+        self.batches: list[list[dict]] = []
+        self.failures_left = 0
+
+    @property
+    def url(self) -> str:
+        return f'http://127.0.0.1:{self.server_address[1]}/batch'
+
+
+class _Handler(BaseHTTPRequestHandler):
+    server: _WebHookServer
+
+    def do_POST(self):
+        body = self.rfile.read(int(self.headers['Content-Length']))
+        if self.server.failures_left > 0:
+            self.server.failures_left -= 1
+            self.send_response(503)
+        else:
+            self.server.batches.append(json.loads(body))
+            self.send_response(200)
+        self.send_header('Content-Length', '0')
+        self.end_headers()
+
+    def log_message(self, format, *args):
+        pass
+
+
+@pytest.fixture
+def server():
+    server = _WebHookServer()
+    thread = threading.Thread(target=server.serve_forever, daemon=True)
+    thread.start()
+    yield server
+    server.shutdown()
+    server.server_close()
+
+
+def test_operations_in_a_window_are_coalesced(tmp_path, server):
+    store = BatchedWebHookFileStore(
+        LocalFileStore(str(tmp_path)), server.url, batch_timeout_seconds=60
+    )
+    store.write('a.json', '1')
+    store.write('b.json', '2')
+    store.write('a.json', '3')
+    store.delete('b.json')
+    store.flush()
+
+    assert server.batches == [
+        [
+            {'method': 'POST', 'path': 'a.json', 'content': '3'},
+            {'method': 'DELETE', 'path': 'b.json'},
+        ]
+    ]
+    assert store.read('a.json') == '3'
+    assert store.metrics.operations_coalesced == 2
+    assert store.metrics.batches_sent == 1
+    store.close()
+
+
+def test_batches_are_cut_by_size_and_time(tmp_path, server):
+    store = BatchedWebHookFileStore(
+        LocalFileStore(str(tmp_path)),
+        server.url,
+        batch_timeout_seconds=0.05,
+        batch_size_limit_bytes=10,
+    )
+    store.write_many([('a', '12345'), ('b', '67890')])
+    store.write('c', b'x')
+    store.flush()
+
+    # Batches without shared paths may be sent concurrently, in any order.
+    batches = sorted(server.batches, key=lambda batch: batch[0]['path'])
+    assert [[op['path'] for op in batch] for batch in batches] == [
+        ['a', 'b'],
+        ['c'],
+    ]
+    assert batches[1][0] == {
+        'method': 'POST',
+        'path': 'c',
+        'content': 'eA==',
+        'encoding': 'base64',
+    }
+    assert store.metrics.max_batch_operations == 2
+    store.close()
+
+
+def test_failed_requests_are_retried(tmp_path, server):
+    server.failures_left = 2
+    store = BatchedWebHookFileStore(
+        LocalFileStore(str(tmp_path)), server.url, retry_backoff_seconds=0.01
+    )
+    store.write('a.json', '1')
+    store.flush()
+
+    assert server.batches == [[{'method': 'POST', 'path': 'a.json', 'content': '1'}]]
+    assert store.metrics.retries == 2
+    assert store.metrics.failed_batches == 0
+    store.close()
@@ -0,0 +1,115 @@
+import pytest
+
+from openhands.storage.caching import DISK_CACHE_SUBDIR, CachingFileStore
+from openhands.storage.compression import compress_text
+from openhands.storage.local import LocalFileStore
+
+
+def test_reads_and_listings_are_cached(counting_file_store):
+    inner = counting_file_store
+    inner.write('sessions/abc/events/0.json', '{"id": 0}')
+    store = CachingFileStore(inner)
+
+    for _ in range(3):
+        assert store.read('sessions/abc/events/0.json') == '{"id": 0}'
+        assert store.list('sessions/abc/events') == ['sessions/abc/events/0.json']
+
+    assert (len(inner.reads), len(inner.lists)) == (1, 1)
+    assert store.hits == 4
+
+
+def test_raw_reads_are_cached(counting_file_store):
+    inner = counting_file_store
+    stored = compress_text('{"id": 0}' * 100, 'zlib', 0)
+    inner.write('sessions/abc/event_cache/0-25.json', stored)
+    store = CachingFileStore(inner)
+
+    for _ in range(3):
+        assert store.read_bytes('sessions/abc/event_cache/0-25.json') == (
+            stored.encode()
+        )
+    assert store.read('sessions/abc/event_cache/0-25.json') == '{"id": 0}' * 100
+
+    assert len(inner.reads) == 1
+    assert store.hits == 3
+
+
+def test_filtered_listings_use_the_cached_listing(counting_file_store):
+    inner = counting_file_store
+    for i in range(5):
+        inner.write(f'sessions/abc/events/{i}.json', '{}')
+    store = CachingFileStore(inner)
+
+    assert sorted(store.list('sessions/abc/events', min_id=3)) == [
+        'sessions/abc/events/3.json',
+        'sessions/abc/events/4.json',
+    ]
+    assert store.list('sessions/abc/events', prefix='1', max_id=2) == [
+        'sessions/abc/events/1.json'
+    ]
+    assert len(inner.lists) == 1
+
+
+def test_own_writes_and_deletes_update_the_cache(counting_file_store):
+    inner = counting_file_store
+    store = CachingFileStore(inner)
+    store.write('sessions/abc/events/0.json', '{"id": 0}')
+    assert store.list('sessions/abc/events') == ['sessions/abc/events/0.json']
+
+    store.write_many([('sessions/abc/events/1.json', b'{"id": 1}')])
+    assert store.read('sessions/abc/events/1.json') == '{"id": 1}'
+    assert sorted(store.list('sessions/abc/events')) == [
+        'sessions/abc/events/0.json',
+        'sessions/abc/events/1.json',
+    ]
+    assert inner.reads == []
+
+    store.delete('sessions/abc')
+    assert store.list('sessions') == []
+
+
+def test_memory_evictions_move_to_disk_tier(tmp_path, counting_file_store):
+    inner = counting_file_store
+    for i in range(4):
+        inner.write(f'{i}.json', str(i) * 10)
+    store = CachingFileStore(
+        inner,
+        max_memory_bytes=20,
+        disk_cache_dir=str(tmp_path / 'cache'),
+        max_disk_bytes=20,
+    )
+    for i in range(4):
+        store.read(f'{i}.json')
+    assert len(inner.reads) == 4
+
+    # 2 and 3 are in memory, 0 and 1 on disk.
+    for i in range(4):
+        assert store.read(f'{i}.json') == str(i) * 10
+    assert len(inner.reads) == 4
+
+
+def test_disk_tier_only_clears_its_own_directory(tmp_path):
+    cache_dir = tmp_path / 'cache'
+    cache_dir.mkdir()
+    (cache_dir / 'keep.txt').write_text('not ours')
+    inner = LocalFileStore(str(tmp_path / 'remote'))
+    inner.write('a.json', 'a' * 30)
+    store = CachingFileStore(inner, max_memory_bytes=10, disk_cache_dir=str(cache_dir))
+    store.read('a.json')
+    assert (cache_dir / DISK_CACHE_SUBDIR / 'a.json').exists()
+
+    CachingFileStore(inner, disk_cache_dir=str(cache_dir))
+
+    assert (cache_dir / 'keep.txt').read_text() == 'not ours'
+    assert not (cache_dir / DISK_CACHE_SUBDIR / 'a.json').exists()
+
+
+def test_disk_tier_refuses_a_directory_it_did_not_create(tmp_path):
+    (tmp_path / DISK_CACHE_SUBDIR).mkdir()
+    (tmp_path / DISK_CACHE_SUBDIR / 'data.json').write_text('{}')
+
+    with pytest.raises(ValueError):
+        CachingFileStore(
+            LocalFileStore(str(tmp_path / 'remote')), disk_cache_dir=str(tmp_path)
+        )
+    assert (tmp_path / DISK_CACHE_SUBDIR / 'data.json').exists()
@@ -0,0 +1,91 @@
+import json
+
+import pytest
+
+from openhands.events.event_cache import EventCache
+from openhands.events.event_store import EventStore
+from openhands.storage.compression import (
+    compress_text,
+    decompress_text,
+    decompress_value,
+    is_compressed,
+)
+from openhands.storage.local import LocalFileStore
+from openhands.storage.write_behind import WriteBehindFileStore
+
+
+def _large_event(i: int) -> str:
+    return json.dumps({'id': i, 'content': 'line of command output\n' * 5000})
+
+
+def test_small_text_is_stored_plain():
+    text = json.dumps({'id': 1, 'content': 'ok'})
+
+    assert compress_text(text, threshold=1024) == text
+    assert decompress_text(text) == text
+
+
+def test_large_text_round_trips():
+    text = _large_event(1)
+    stored = compress_text(text, threshold=1024)
+
+    assert is_compressed(stored)
+    assert len(stored) < len(text) / 10
+    assert decompress_text(stored) == text
+    assert decompress_value(json.loads(stored)) == json.loads(text)
+
+
+def test_unknown_codec_is_rejected():
+    with pytest.raises(ValueError):
+        compress_text(_large_event(1), codec='lz4', threshold=0)
+
+
+def test_file_stores_decompress_on_read(tmp_path):
+    text = _large_event(1)
+    stored = compress_text(text, threshold=1024)
+    file_store = LocalFileStore(str(tmp_path))
+    file_store.write('a.json', stored)
+
+    assert file_store.read('a.json') == text
+    assert file_store.read_bytes('a.json') == stored.encode('utf-8')
+    write_behind = WriteBehindFileStore(file_store)
+    write_behind.write('b.json', stored)
+    assert write_behind.read('b.json') == text
+    write_behind.close()
+
+
+def test_text_that_only_looks_like_an_envelope_is_read_as_is(tmp_path):
+    file_store = LocalFileStore(str(tmp_path))
+    for i, text in enumerate(
+        [
+            '{"compressed": true, "level": 3}',
+            '{"compressed": "zlib", "data": "not base64!"}',
+            '{"compressed": "zlib", "data": "aGVsbG8="}',
+            '{"compressed": "zlib", "data"',
+        ]
+    ):
+        file_store.write(f'{i}.json', text)
+        assert not is_compressed(text)
+        assert file_store.read(f'{i}.json') == text
+    assert decompress_value({'compressed': True, 'data': 'x'}) == {
+        'compressed': True,
+        'data': 'x',
+    }
+
+
+def test_event_store_reads_compressed_files_and_pages(tmp_path, raw_events):
+    file_store = LocalFileStore(str(tmp_path))
+    stored = [compress_text(_large_event(i), threshold=1024) for i in range(26)]
+    for i, contents in enumerate(stored):
+        file_store.write(f'sessions/abc/events/{i}.json', contents)
+    file_store.write(
+        'sessions/abc/event_cache/0-25.json', '[' + ', '.join(stored[:25]) + ']'
+    )
+    file_store.write('sessions/abc/events/26.json', json.dumps({'id': 26}))
+    store = EventStore('abc', file_store, None, event_cache=EventCache())
+
+    events = list(store.search_events())
+
+    assert [event['id'] for event in events] == list(range(27))
+    assert events[3] == json.loads(_large_event(3))
+    assert store.get_event(25) == json.loads(_large_event(25))
@@ -0,0 +1,138 @@
+import json
+import os
+import threading
+
+import pytest
+
+from openhands.storage.local import MMAP_THRESHOLD_BYTES, LocalFileStore
+
+
+def test_read_is_layered_on_read_bytes(tmp_path):
+    store = LocalFileStore(str(tmp_path))
+    store.write('a/b.json', '{"text": "café"}')
+
+    assert store.read_bytes('a/b.json') == '{"text": "café"}'.encode('utf-8')
+    assert store.read('a/b.json') == '{"text": "café"}'
+
+
+def test_read_view_of_small_and_large_files(tmp_path):
+    store = LocalFileStore(str(tmp_path))
+    large = json.dumps({'content': 'x' * MMAP_THRESHOLD_BYTES})
+    store.write('small.json', '{}')
+    store.write('large.json', large)
+
+    assert bytes(store.read_view('small.json')) == b'{}'
+    view = store.read_view('large.json')
+    assert view.readonly
+    assert json.loads(str(view, 'utf-8')) == json.loads(large)
+    assert bytes(view[2:9]) == b'content'
+
+
+def test_atomic_write_replaces_file_without_leftovers(tmp_path, monkeypatch):
+    store = LocalFileStore(str(tmp_path))
+    store.write('a/b.json', '{"v": 1}')
+    makedirs_calls = []
+    monkeypatch.setattr(
+        'openhands.storage.local.os.makedirs',
+        lambda *args, **kwargs: makedirs_calls.append(args),
+    )
+    store.write('a/b.json', '{"v": 2}')
+
+    assert store.read('a/b.json') == '{"v": 2}'
+    assert os.listdir(tmp_path / 'a') == ['b.json']
+    assert makedirs_calls == []
+
+
+def test_failed_atomic_write_keeps_previous_contents(tmp_path, monkeypatch):
+    store = LocalFileStore(str(tmp_path))
+    store.write('a/b.json', '{"v": 1}')
+
+    def fail(src, dst):
+        raise OSError('disk full')
+
+    monkeypatch.setattr('openhands.storage.local.os.replace', fail)
+    with pytest.raises(OSError):
+        store.write('a/b.json', '{"v": 2}')
+
+    assert store.read('a/b.json') == '{"v": 1}'
+    assert store.list('a') == ['a/b.json']
+
+
+def test_writes_are_fsynced_in_groups(tmp_path, monkeypatch):
+    synced = []
+    monkeypatch.setattr('openhands.storage.local.os.fsync', synced.append)
+    store = LocalFileStore(str(tmp_path), fsync_batch_size=3)
+
+    store.write('a/0.json', '0')
+    store.write('a/1.json', '1')
+    assert synced == []
+    store.write('a/2.json', '2')
+    # Three files and their directory.
+    assert len(synced) == 4
+
+
+def test_fsync_interval_flushes_in_background(tmp_path, monkeypatch):
+    synced = threading.Event()
+    monkeypatch.setattr('openhands.storage.local.os.fsync', lambda fd: synced.set())
+    store = LocalFileStore(str(tmp_path), fsync_interval=0.05)
+
+    store.write('a/0.json', '0')
+
+    assert synced.wait(timeout=5)
+
+
+def test_list_filters_by_prefix_and_id_range(tmp_path):
+    store = LocalFileStore(str(tmp_path))
+    for i in range(12):
+        store.write(f'events/{i}.json', '{}')
+    store.write('events/sub/x.json', '{}')
+
+    assert sorted(store.list('events', min_id=9)) == [
+        'events/10.json',
+        'events/11.json',
+        'events/9.json',
+    ]
+    assert sorted(store.list('events', min_id=2, max_id=3)) == [
+        'events/2.json',
+        'events/3.json',
+    ]
+    assert sorted(store.list('events', prefix='1')) == [
+        'events/1.json',
+        'events/10.json',
+        'events/11.json',
+    ]
+    assert 'events/sub/' in store.list('events')
+
+
+def test_listing_cache_follows_own_writes_and_deletes(tmp_path, monkeypatch):
+    store = LocalFileStore(str(tmp_path), listing_cache=True)
+    store.write('events/0.json', '{}')
+    assert store.list('events') == ['events/0.json']
+
+    scans = []
+    real_scandir = os.scandir
+    monkeypatch.setattr(
+        'openhands.storage.local.os.scandir',
+        lambda path: scans.append(path) or real_scandir(path),
+    )
+    store.write('events/1.json', '{}')
+    store.delete('events/0.json')
+    assert store.list('events/') == ['events/1.json']
+    assert scans == []
+
+    store.write('events/sub/2.json', '{}')
+    assert sorted(store.list('events')) == ['events/1.json', 'events/sub/']
+    store.delete('events/sub')
+    assert store.list('events') == ['events/1.json']
+
+
+def test_write_many_is_one_group_commit(tmp_path, monkeypatch):
+    synced = []
+    monkeypatch.setattr('openhands.storage.local.os.fsync', synced.append)
+    store = LocalFileStore(str(tmp_path), fsync_batch_size=2)
+
+    store.write_many([('a/0.json', '0'), ('a/1.json', '1'), ('b/2.json', b'2')])
+
+    assert store.read('b/2.json') == '2'
+    # All three files and both directories, in one flush.
+    assert len(synced) == 5
@@ -0,0 +1,160 @@
+import os
+
+from openhands.storage.local import LocalFileStore
+from openhands.storage.segmented_local import SegmentedLocalFileStore
+
+
+def test_event_writes_are_appended_to_segments(tmp_path):
+    store = SegmentedLocalFileStore(str(tmp_path))
+    for i in range(3):
+        store.write(f'sessions/abc/events/{i}.json', f'{{"id": {i}}}')
+
+    assert store.read('sessions/abc/events/1.json') == '{"id": 1}'
+    assert sorted(store.list('sessions/abc/events/')) == [
+        'sessions/abc/events/0.json',
+        'sessions/abc/events/1.json',
+        'sessions/abc/events/2.json',
+    ]
+    assert os.listdir(tmp_path / 'sessions' / 'abc' / 'events') == []
+
+
+def test_reads_existing_per_event_layout(tmp_path):
+    LocalFileStore(str(tmp_path)).write('sessions/abc/events/0.json', '{"id": 0}')
+    store = SegmentedLocalFileStore(str(tmp_path))
+    store.write('sessions/abc/events/1.json', '{"id": 1}')
+
+    assert store.read('sessions/abc/events/0.json') == '{"id": 0}'
+    assert store.read('sessions/abc/events/1.json') == '{"id": 1}'
+    assert sorted(store.list('sessions/abc/events')) == [
+        'sessions/abc/events/0.json',
+        'sessions/abc/events/1.json',
+    ]
+
+
+def test_segments_survive_reopen_and_rotation(tmp_path):
+    store = SegmentedLocalFileStore(str(tmp_path), segment_size=32)
+    for i in range(10):
+        store.write(f'sessions/abc/events/{i}.json', f'{{"id": {i}}}')
+    store.delete('sessions/abc/events/4.json')
+    store.close()
+
+    reopened = SegmentedLocalFileStore(str(tmp_path))
+    assert reopened.read('sessions/abc/events/9.json') == '{"id": 9}'
+    assert len(reopened.list('sessions/abc/events/')) == 9
+    assert len(os.listdir(tmp_path / 'sessions' / 'abc' / 'event_segments')) > 2
+
+
+def test_rotation_fsyncs_the_closed_segment(tmp_path, monkeypatch):
+    synced = []
+    real_fsync = os.fsync
+    monkeypatch.setattr(os, 'fsync', lambda fd: synced.append(fd) or real_fsync(fd))
+    store = SegmentedLocalFileStore(
+        str(tmp_path), segment_size=32, fsync_batch_size=1000
+    )
+    store.write('sessions/abc/events/0.json', '{"id": 0, "padding": "xxxxxxxx"}')
+    assert synced == []
+
+    store.write('sessions/abc/events/1.json', '{"id": 1}')
+    # The log and index of the first segment.
+    assert len(synced) == 2
+    store.close()
+
+
+def test_torn_tail_record_is_discarded(tmp_path):
+    store = SegmentedLocalFileStore(str(tmp_path))
+    store.write('sessions/abc/events/0.json', '{"id": 0}')
+    store.write('sessions/abc/events/1.json', '{"id": 1}')
+    store.close()
+    log_path = tmp_path / 'sessions' / 'abc' / 'event_segments' / '0.log'
+    with open(log_path, 'r+b') as f:
+        f.truncate(os.path.getsize(log_path) - 2)
+    os.remove(tmp_path / 'sessions' / 'abc' / 'event_segments' / '0.idx')
+
+    reopened = SegmentedLocalFileStore(str(tmp_path))
+    assert reopened.list('sessions/abc/events/') == ['sessions/abc/events/0.json']
+    reopened.write('sessions/abc/events/1.json', '{"id": 1}')
+    assert reopened.read('sessions/abc/events/1.json') == '{"id": 1}'
+
+
+def test_delete_conversation_drops_segments(tmp_path):
+    store = SegmentedLocalFileStore(str(tmp_path), fsync_batch_size=1)
+    store.write('sessions/abc/events/0.json', '{"id": 0}')
+    store.write('sessions/abc/metadata.json', '{}')
+    store.delete('sessions/abc/')
+
+    assert not os.path.exists(tmp_path / 'sessions' / 'abc')
+    store.write('sessions/abc/events/0.json', '{"id": 1}')
+    assert store.read('sessions/abc/events/0.json') == '{"id": 1}'
+
+
+def test_read_view_slices_segment(tmp_path):
+    store = SegmentedLocalFileStore(str(tmp_path))
+    store.write('sessions/abc/events/0.json', '{"id": 0}')
+    first = store.read_view('sessions/abc/events/0.json')
+    store.write('sessions/abc/events/1.json', '{"id": 1}')
+
+    assert bytes(first) == b'{"id": 0}'
+    assert bytes(store.read_view('sessions/abc/events/1.json')) == b'{"id": 1}'
+    assert store.read_bytes('sessions/abc/events/1.json') == b'{"id": 1}'
+    store.close()
+
+
+def test_write_many_mixes_segments_and_files(tmp_path):
+    store = SegmentedLocalFileStore(str(tmp_path))
+    store.write_many(
+        [
+            ('sessions/abc/events/0.json', '{"id": 0}'),
+            ('sessions/abc/events_manifest.json', '{"cur_id": 1}'),
+        ]
+    )
+
+    assert store.read('sessions/abc/events/0.json') == '{"id": 0}'
+    assert store.read('sessions/abc/events_manifest.json') == '{"cur_id": 1}'
+    assert os.listdir(tmp_path / 'sessions' / 'abc' / 'events') == []
+    store.close()
+
+
+def test_exists_checks_segments_and_files(tmp_path):
+    store = SegmentedLocalFileStore(str(tmp_path))
+    store.write('sessions/abc/events/0.json', '{"id": 0}')
+    store.write('sessions/abc/metadata.json', '{}')
+
+    assert store.exists('sessions/abc/events/0.json')
+    assert store.exists('sessions/abc/metadata.json')
+    assert not store.exists('sessions/abc/events/1.json')
+    assert not store.exists('sessions/abc')
+    store.close()
+
+
+def test_segments_are_removed_once_their_events_are_deleted(tmp_path):
+    store = SegmentedLocalFileStore(str(tmp_path), segment_size=32)
+    for i in range(6):
+        store.write(f'sessions/abc/events/{i}.json', f'{{"id": {i}}}')
+    segments_dir = tmp_path / 'sessions' / 'abc' / 'event_segments'
+    assert sorted(os.listdir(segments_dir))[:2] == ['0.idx', '0.log']
+
+    # Event 3 is in the second segment, which stays until 2 is deleted too.
+    for i in (0, 1, 3):
+        store.delete(f'sessions/abc/events/{i}.json')
+    assert '0.log' not in os.listdir(segments_dir)
+    assert '1.log' in os.listdir(segments_dir)
+    store.close()
+
+    reopened = SegmentedLocalFileStore(str(tmp_path))
+    assert sorted(reopened.list('sessions/abc/events/')) == [
+        'sessions/abc/events/2.json',
+        'sessions/abc/events/4.json',
+        'sessions/abc/events/5.json',
+    ]
+    assert reopened.read('sessions/abc/events/2.json') == '{"id": 2}'
+
+
+def test_least_recently_used_logs_are_closed(tmp_path):
+    store = SegmentedLocalFileStore(str(tmp_path), max_open_logs=2)
+    for sid in ('a', 'b', 'c'):
+        store.write(f'sessions/{sid}/events/0.json', f'{{"sid": "{sid}"}}')
+
+    assert list(store._logs) == ['sessions/b/', 'sessions/c/']
+    assert store.read('sessions/a/events/0.json') == '{"sid": "a"}'
+    assert list(store._logs) == ['sessions/c/', 'sessions/a/']
+    store.close()
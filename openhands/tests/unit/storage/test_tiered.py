@@ -0,0 +1,153 @@
+import json
+
+from openhands.events.event_store import EventStore
+from openhands.storage.compaction import compact_events
+from openhands.storage.local import LocalFileStore
+from openhands.storage.tiered import TieredFileStore, get_conversation_dir_of
+
+
+def _stores(tmp_path, **kwargs):
+    hot = LocalFileStore(str(tmp_path / 'hot'))
+    cold = LocalFileStore(str(tmp_path / 'cold'))
+    return hot, cold, TieredFileStore(hot, cold, migrate_interval=None, **kwargs)
+
+
+def _write_events(file_store, count, sid='abc'):
+    for i in range(count):
+        file_store.write(f'sessions/{sid}/events/{i}.json', json.dumps({'id': i}))
+
+
+def test_get_conversation_dir_of():
+    assert get_conversation_dir_of('sessions/abc/events/1.json') == 'sessions/abc/'
+    assert (
+        get_conversation_dir_of('/users/u1/conversations/abc/metadata.json')
+        == 'users/u1/conversations/abc/'
+    )
+    assert get_conversation_dir_of('users/u1/settings.json') is None
+    assert get_conversation_dir_of('sessions/') is None
+
+
+def test_conversations_are_written_hot_and_other_paths_cold(tmp_path):
+    hot, cold, store = _stores(tmp_path)
+    store.write('sessions/abc/events/0.json', '{}')
+    store.write('settings.json', '{}')
+
+    assert hot.list('sessions/abc/events') == ['sessions/abc/events/0.json']
+    assert cold.read('settings.json') == '{}'
+    assert not (tmp_path / 'cold' / 'sessions').exists()
+
+
+def test_idle_conversations_are_compacted_and_demoted(tmp_path):
+    hot, cold, store = _stores(tmp_path, idle_seconds=0)
+    _write_events(store, 30)
+
+    assert store.migrate_idle() == ['sessions/abc/']
+
+    assert not (tmp_path / 'hot' / 'sessions' / 'abc').exists()
+    assert sorted(cold.list('sessions/abc/events')) == [
+        f'sessions/abc/events/{i}.json' for i in range(25, 30)
+    ]
+    page = json.loads(cold.read('sessions/abc/event_cache/0-25.json'))
+    assert [e['id'] for e in page] == list(range(25))
+
+
+def test_access_promotes_a_cold_conversation(tmp_path, raw_events):
+    hot, cold, store = _stores(tmp_path, idle_seconds=0)
+    _write_events(store, 30)
+    store.migrate_idle()
+
+    event_store = EventStore('abc', store, None)
+    assert event_store.cur_id == 30
+    assert [e['id'] for e in event_store.search_events()] == list(range(30))
+    assert hot.read('sessions/abc/event_cache/0-25.json')
+
+    store.write('sessions/abc/events/30.json', json.dumps({'id': 30}))
+    assert store.list('sessions/') == ['sessions/abc/']
+
+
+def test_recent_conversations_stay_hot(tmp_path):
+    hot, cold, store = _stores(tmp_path, idle_seconds=3600)
+    _write_events(store, 3)
+
+    assert store.migrate_idle() == []
+    assert hot.read('sessions/abc/events/2.json')
+
+
+def test_conversations_left_hot_are_discovered(tmp_path):
+    hot = LocalFileStore(str(tmp_path / 'hot'))
+    _write_events(hot, 2)
+    cold = LocalFileStore(str(tmp_path / 'cold'))
+
+    store = TieredFileStore(hot, cold, idle_seconds=0, migrate_interval=None)
+    assert store.migrate_idle() == ['sessions/abc/']
+    assert cold.read('sessions/abc/events/1.json')
+
+
+def test_deletes_reach_both_tiers(tmp_path):
+    hot, cold, store = _stores(tmp_path, idle_seconds=0)
+    _write_events(store, 2)
+    store.migrate_idle()
+    store.read('sessions/abc/events/0.json')
+
+    store.delete('sessions/abc/events/0.json')
+    store.migrate_idle()
+    assert cold.list('sessions/abc/events') == ['sessions/abc/events/1.json']
+
+
+def test_compact_events_keeps_incomplete_pages(tmp_path):
+    file_store = LocalFileStore(str(tmp_path))
+    _write_events(file_store, 10)
+
+    assert compact_events(file_store, 'sessions/abc/', page_size=4) == 8
+    assert sorted(file_store.list('sessions/abc/event_cache')) == [
+        'sessions/abc/event_cache/0-4.json',
+        'sessions/abc/event_cache/4-8.json',
+    ]
+    assert EventStore('abc', file_store, None).cur_id == 10
+
+
+def test_deletes_call_the_on_delete_hook(tmp_path):
+    deleted = []
+    hot, cold, store = _stores(tmp_path, idle_seconds=0, on_delete=deleted.append)
+    _write_events(store, 2)
+    store.migrate_idle()
+    store.delete('sessions/abc/events/0.json')
+    assert deleted == []
+
+    store.delete('sessions/abc')
+    store.delete('sessions')
+    assert deleted == ['sessions/abc/', 'sessions/']
+
+
+def test_demotion_copies_in_batches(tmp_path, monkeypatch):
+    monkeypatch.setattr('openhands.storage.tiered.COPY_BATCH_BYTES', 30)
+    hot, cold, store = _stores(tmp_path, idle_seconds=0)
+    _write_events(store, 5)
+    batches = []
+    write_many = cold.write_many
+
+    def record(items):
+        batches.append(len(items))
+        write_many(items)
+
+    monkeypatch.setattr(cold, 'write_many', record)
+
+    assert store.migrate_idle() == ['sessions/abc/']
+    assert len(batches) > 1
+    assert sum(batches) == 5
+
+
+def test_conversation_used_during_demotion_stays_hot(tmp_path, monkeypatch):
+    hot, cold, store = _stores(tmp_path, idle_seconds=0)
+    _write_events(store, 2)
+    write_many = cold.write_many
+
+    def write_during_copy(items):
+        write_many(items)
+        store.write('sessions/abc/events/2.json', json.dumps({'id': 2}))
+
+    monkeypatch.setattr(cold, 'write_many', write_during_copy)
+
+    assert store.migrate_idle() == []
+    assert hot.read('sessions/abc/events/2.json')
+    assert EventStore('abc', store, None).cur_id == 3
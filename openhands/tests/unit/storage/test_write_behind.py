@@ -0,0 +1,147 @@
+import threading
+
+import pytest
+
+from openhands.storage.files import FileStore
+from openhands.storage.local import LocalFileStore
+from openhands.storage.write_behind import WriteBehindFileStore
+
+
+class _BlockingFileStore(FileStore):
+    def __init__(self):
+        self.files: dict[str, str | bytes] = {}
+        self.writes: list[str] = []
+        self.release = threading.Event()
+
+    def write(self, path: str, contents: str | bytes) -> None:
+        self.release.wait(timeout=5)
+        self.writes.append(path)
+        self.files[path] = contents
+
+    def read(self, path: str) -> str:
+        if path not in self.files:
+            raise FileNotFoundError(path)
+        return self.files[path]
+
+    def list(self, path: str) -> list[str]:
+        return [p for p in self.files if p.startswith(path)]
+
+    def delete(self, path: str) -> None:
+        self.files.pop(path, None)
+
+
+def test_pending_writes_are_readable_before_flush():
+    inner = _BlockingFileStore()
+    store = WriteBehindFileStore(inner)
+    store.write('a.json', '1')
+
+    assert store.read('a.json') == '1'
+    inner.release.set()
+    store.flush()
+    assert inner.files == {'a.json': '1'}
+    store.close()
+
+
+def test_repeated_writes_to_a_path_are_coalesced():
+    inner = _BlockingFileStore()
+    store = WriteBehindFileStore(inner)
+    store.write('first.json', '0')
+    for i in range(10):
+        store.write('manifest.json', str(i))
+
+    inner.release.set()
+    store.flush()
+    assert inner.files['manifest.json'] == '9'
+    assert inner.writes.count('manifest.json') <= 2
+    store.close()
+
+
+def test_full_queue_applies_backpressure():
+    inner = _BlockingFileStore()
+    store = WriteBehindFileStore(inner, max_pending_writes=1, max_batch_size=1)
+    store.write('a.json', '1')
+    store.write('b.json', '1')
+    blocked = threading.Thread(target=store.write, args=('c.json', '1'))
+    blocked.start()
+    blocked.join(timeout=0.2)
+
+    assert blocked.is_alive()
+    inner.release.set()
+    blocked.join(timeout=5)
+    store.close()
+    assert set(inner.files) == {'a.json', 'b.json', 'c.json'}
+
+
+def test_list_and_delete_see_flushed_writes(tmp_path):
+    store = WriteBehindFileStore(LocalFileStore(str(tmp_path)))
+    store.write('events/0.json', '{}')
+
+    assert store.list('events/') == ['events/0.json']
+    store.delete('events/0.json')
+    with pytest.raises(FileNotFoundError):
+        store.read('events/0.json')
+    store.close()
+
+
+def test_failed_writes_stay_pending_and_block_later_writes():
+    class _FailingFileStore(_BlockingFileStore):
+        def write(self, path: str, contents: str | bytes) -> None:
+            raise OSError('disk full')
+
+    store = WriteBehindFileStore(_FailingFileStore(), retry_backoff_seconds=0)
+    store.write('a.json', '1')
+
+    with pytest.raises(OSError):
+        store.flush()
+    assert store.read('a.json') == '1'
+    with pytest.raises(RuntimeError):
+        store.write('b.json', '2')
+    with pytest.raises(OSError):
+        store.close()
+
+
+def test_failed_writes_are_retried():
+    class _FlakyFileStore(_BlockingFileStore):
+        def __init__(self):
+            super().__init__()
+            self.failures = 5
+            self.release.set()
+
+        def write(self, path: str, contents: str | bytes) -> None:
+            if self.failures:
+                self.failures -= 1
+                raise OSError('timeout')
+            super().write(path, contents)
+
+    inner = _FlakyFileStore()
+    store = WriteBehindFileStore(inner, max_retries=2, retry_backoff_seconds=0)
+    store.write('a.json', '1')
+
+    # Three attempts in the background, then three more on flush.
+    store.flush()
+    assert inner.files == {'a.json': '1'}
+    store.write('b.json', '2')
+    store.close()
+    assert inner.files == {'a.json': '1', 'b.json': '2'}
+
+
+def test_background_writes_are_committed_in_batches():
+    class _RecordingFileStore(_BlockingFileStore):
+        def __init__(self):
+            super().__init__()
+            self.batches: list[list[str]] = []
+
+        def write_many(self, items):
+            items = list(items)
+            self.batches.append([path for path, _ in items])
+            super().write_many(items)
+
+    inner = _RecordingFileStore()
+    store = WriteBehindFileStore(inner)
+    store.write_many([('a', '1'), ('b', '2'), ('a', '3')])
+    inner.release.set()
+    store.flush()
+
+    assert inner.files == {'a': '3', 'b': '2'}
+    assert sum(len(batch) for batch in inner.batches) == len(inner.writes)
+    store.close()
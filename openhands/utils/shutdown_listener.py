@@ -2,12 +2,14 @@ import signal
 import threading
 from types import FrameType
 from typing import Callable
-from uuid import UUID
+from uuid import UUID, uuid4
 
 from uvicorn.server import HANDLED_SIGNALS
 
+from openhands.core.logger import openhands_logger as logger
+
 _should_exit = None
-_shutdown_listeners = dict[UUID, Callable] = {}
+_shutdown_listeners: dict[UUID, Callable] = {}
 
 def _register_signal_handler(sig: signal.Signals) -> None:
     original_handler = None
@@ -47,4 +49,16 @@ def _register_signal_handlers() -> None:
 
 def should_continue() -> bool:
     _register_signal_handlers()
-    return not _should_exit
\ No newline at end of file
+    return not _should_exit
+
+
+def add_shutdown_listener(callable: Callable) -> UUID:
+    # Listeners are only called from the signal handlers.
+    _register_signal_handlers()
+    id_ = uuid4()
+    _shutdown_listeners[id_] = callable
+    return id_
+
+
+def remove_shutdown_listener(id_: UUID) -> bool:
+    return _shutdown_listeners.pop(id_, None) is not None